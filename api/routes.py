@@ -1,23 +1,106 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+import io
+import json
+import asyncio
+import functools
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional
 from pydantic import BaseModel
-from services.scraper import AirQualityScraper
 from services.aws_service import AWSService
-from services.model_service import ModelService
+from services.collection_jobs import CollectionJob, CollectionJobManager
+from services.collection_scheduler import CollectionScheduler
+from services.compaction import CODECS, S3Storage, compact, compaction_lock, options_from_env
+from services.executor import run_blocking
+from services.feature_store import CONTEXT_FIELDS
+from services.history import FORMATS, HistoryScan, arrow_chunks, build_filter, ndjson_chunks, parse_list, resolve_columns, resolve_dates
+from services.partition_manifest import PartitionManifest
+from services.profiler import SamplingProfiler
+from services.response_cache import StatusCache
+from services.station_index import StationIndex
+from services.station_state import StationStateStore
+from services.model_service import ModelService, FEATURE_NAMES
 
 air_quality_router = APIRouter()
 
+# Mapeamento das predições para categorias
+CATEGORIES = {
+    0: {
+        "label": "Saudável",
+        "description": "Ar de boa qualidade. Seguro para atividades ao ar livre.",
+        "color": "success",
+        "recommendation": "Aproveite atividades ao ar livre normalmente."
+    },
+    1: {
+        "label": "Atenção",
+        "description": "Qualidade moderada. Grupos sensíveis devem limitar exposição prolongada.",
+        "color": "warning",
+        "recommendation": "Pessoas sensíveis devem considerar reduzir atividades intensas ao ar livre."
+    },
+    2: {
+        "label": "Perigoso",
+        "description": "Ar de qualidade ruim. Nocivo para todos.",
+        "color": "danger",
+        "recommendation": "Evite atividades ao ar livre. Mantenha janelas fechadas."
+    }
+}
+
+
+def _category_payload(prediction: int) -> Dict[str, Any]:
+    """Monta os campos de categoria de uma predição."""
+    result = CATEGORIES.get(prediction, CATEGORIES[1])
+    return {
+        "prediction": int(prediction),
+        "category": result["label"],
+        "description": result["description"],
+        "color": result["color"],
+        "recommendation": result["recommendation"]
+    }
+
 
 class PredictionInput(BaseModel):
-    pm25: float
-    pm10: float
-    no2: float
-    so2: float
-    co: float
-    temperature: float
-    pressure: float
-    humidity: float
-    wind: float
+    # Features ausentes são imputadas pelo feature store (ver ModelService.impute_features)
+    pm25: Optional[float] = None
+    pm10: Optional[float] = None
+    no2: Optional[float] = None
+    so2: Optional[float] = None
+    co: Optional[float] = None
+    temperature: Optional[float] = None
+    pressure: Optional[float] = None
+    humidity: Optional[float] = None
+    wind: Optional[float] = None
+
+    # Localização e AQI da leitura (opcionais), usados para escolher a estatística
+    station: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    country: Optional[str] = None
+    aqi: Optional[str] = None
+
+
+def _imputed_payload(row: np.ndarray, sources: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Valor e estatística de origem de cada feature imputada."""
+    return {
+        name: {"value": float(row[FEATURE_NAMES.index(name)]), "source": source}
+        for name, source in sources.items()
+    }
+
+
+def _impute_inputs(input_data: List[PredictionInput]):
+    """Monta a matriz de features brutas e imputa as ausentes (400 se não for possível)."""
+    X = np.array(
+        [[getattr(row, name) for name in FEATURE_NAMES] for row in input_data],
+        dtype=np.float64
+    )
+    contexts = [{field: getattr(row, field) for field in CONTEXT_FIELDS} for row in input_data]
+    try:
+        return ModelService().impute_features(X, contexts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @air_quality_router.post("/aws/configure", summary="Configurar credenciais AWS")
@@ -46,7 +129,7 @@ async def configure_aws(
             )
         
         aws_service = AWSService()
-        aws_service.configure(
+        await aws_service.configure_async(
             access_key=aws_access_key_id,
             secret_key=aws_secret_access_key,
             session_token=aws_session_token,
@@ -54,6 +137,10 @@ async def configure_aws(
             bucket=s3_bucket,
             prefix=s3_prefix
         )
+
+        # Novas credenciais: carregar o modelo em background, ignorando o backoff
+        asyncio.create_task(ModelService().load_model(force=True))
+        StatusCache().invalidate()
         
         return {
             "status": "success",
@@ -84,10 +171,18 @@ async def configure_aws(
 
 
 @air_quality_router.get("/aws/status", summary="Verificar status AWS")
-async def check_aws_status():
+async def check_aws_status(request: Request):
     """
     Verifica se as credenciais AWS estão configuradas.
+
+    O payload fica em cache por STATUS_CACHE_TTL segundos e é servido com
+    ETag/Cache-Control (304 quando não mudou).
     """
+    return await StatusCache().response(request, "aws", _aws_status)
+
+
+async def _aws_status() -> Dict[str, Any]:
+    """Status do AWS (apenas estado em memória, sem chamadas ao S3)."""
     try:
         aws_service = AWSService()
         
@@ -113,46 +208,273 @@ async def check_aws_status():
         }
 
 
-@air_quality_router.post("/stations/collect", summary="Coletar dados de estações")
-async def collect_station_data() -> Dict[str, Any]:
+@air_quality_router.post("/stations/collect", summary="Coletar dados de estações", status_code=202)
+async def collect_station_data(mode: str = "full") -> Dict[str, Any]:
+    """
+    Inicia a coleta de dados de todas as estações em background.
+
+    Retorna imediatamente o ID do job. Se já houver uma coleta em andamento,
+    a submissão é anexada a ela em vez de iniciar outra.
+
+    Com `mode=incremental`, apenas as estações com verificação vencida são
+    baixadas (requisições condicionais) e só as leituras alteradas são gravadas.
+    """
+    if mode not in CollectionJob.MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Modo de coleta inválido: {mode}. Use: {', '.join(CollectionJob.MODES)}"
+        )
+
+    manager = CollectionJobManager()
+    job, created = manager.submit(mode)
+
+    return {
+        "job_id": job.id,
+        "mode": job.mode,
+        "status": job.status,
+        "attached": not created,
+        "status_url": f"/api/stations/collect/{job.id}",
+        "events_url": f"/api/stations/collect/{job.id}/events"
+    }
+
+
+@air_quality_router.get("/stations/collect", summary="Listar coletas")
+async def list_collection_jobs() -> Dict[str, Any]:
     """
-    Coleta dados de todas as estações e salva no S3.
+    Lista as coletas recentes, da mais nova para a mais antiga.
     """
+    manager = CollectionJobManager()
+    return {"jobs": [job.to_dict() for job in manager.list_jobs()]}
+
+
+@air_quality_router.get("/stations/index", summary="Índice de estações em cache")
+async def station_index_status() -> Dict[str, Any]:
+    """
+    Estado do cache do índice de estações (tamanho, idade, TTL e contadores)
+    e resumo do estado da coleta incremental.
+    """
+    return {**StationIndex().get_status(), "incremental": StationStateStore().get_status()}
+
+
+@air_quality_router.get("/stations/schedule", summary="Agendador de coletas")
+async def collection_schedule_status() -> Dict[str, Any]:
+    """
+    Configuração e estatísticas do agendador de coletas periódicas.
+    """
+    return CollectionScheduler().get_status()
+
+
+def _get_collection_job(job_id: str):
+    job = CollectionJobManager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Coleta não encontrada")
+    return job
+
+
+@air_quality_router.get("/stations/collect/{job_id}", summary="Status de uma coleta")
+async def get_collection_job(job_id: str) -> Dict[str, Any]:
+    """
+    Retorna progresso, throughput e erros de uma coleta (polling).
+    """
+    return _get_collection_job(job_id).to_dict()
+
+
+@air_quality_router.get("/stations/collect/{job_id}/events", summary="Acompanhar coleta (SSE)")
+async def stream_collection_job(job_id: str, request: Request):
+    """
+    Transmite o progresso de uma coleta via Server-Sent Events.
+
+    Emite eventos `progress` a cada estação processada e um evento `done`
+    ao final da coleta.
+    """
+    job = _get_collection_job(job_id)
+
+    async def event_stream():
+        version = -1
+        while True:
+            if await request.is_disconnected():
+                break
+
+            if await job.wait_for_update(version, timeout=15):
+                version = job.version
+                event = "done" if job.done else "progress"
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.done:
+                    break
+            else:
+                # Mantém a conexão viva através de proxies
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _parse_date_param(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
     try:
-        scraper = AirQualityScraper()
-        results = await scraper.scrape_all_stations()
-        
-        if not results:
-            raise HTTPException(
-                status_code=404,
-                detail="Nenhuma estação encontrada"
-            )
-        
-        # Salvar no S3
-        try:
-            aws_service = AWSService()
-            s3_key = aws_service.save_to_s3(results)
-            return {
-                "status": "success",
-                "message": "Dados coletados e salvos com sucesso",
-                "total_stations": len(results),
-                "s3_key": s3_key
-            }
-        except Exception as e:
-            return {
-                "status": "partial_success",
-                "message": "Dados coletados mas não salvos no S3",
-                "total_stations": len(results),
-                "s3_error": str(e)
-            }
-    
-    except HTTPException:
-        raise
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data inválida em {name}: use o formato YYYY-MM-DD")
+
+
+@air_quality_router.get("/data/partitions", summary="Manifest das partições no S3")
+async def data_partitions(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Retorna, por partição `date=`, a quantidade de arquivos, bytes e linhas
+    (lidas dos footers Parquet). O manifest fica em cache por alguns minutos;
+    use `refresh=true` para relistar o bucket.
+    """
+    aws_service = AWSService()
+    if not aws_service.is_configured():
+        raise HTTPException(status_code=400, detail="Serviço AWS não está configurado")
+
+    start_date = _parse_date_param(start_date, "start_date")
+    end_date = _parse_date_param(end_date, "end_date")
+
+    try:
+        return await PartitionManifest().get(start_date, end_date, refresh=refresh)
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erro ao coletar dados: {str(e)}"
+        raise HTTPException(status_code=500, detail=f"Erro ao listar partições: {str(e)}")
+
+
+@air_quality_router.post("/data/compact", summary="Compactar arquivos pequenos no S3")
+async def compact_partitions(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    codec: Optional[str] = None,
+    include_today: bool = False,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Junta os arquivos pequenos de cada partição `date=` do intervalo em poucos
+    arquivos Parquet ordenados por estação e data (zstd ou snappy). A partição
+    de hoje é ignorada por padrão; `dry_run=true` apenas lista o que seria feito.
+    """
+    aws_service = AWSService()
+    if not aws_service.is_configured():
+        raise HTTPException(status_code=400, detail="Serviço AWS não está configurado")
+
+    start_date = _parse_date_param(start_date, "start_date")
+    end_date = _parse_date_param(end_date, "end_date")
+    options = options_from_env()
+    if codec is not None:
+        if codec not in CODECS:
+            raise HTTPException(status_code=400, detail=f"Compressão inválida: {codec}. Use: {', '.join(CODECS)}")
+        options["codec"] = codec
+
+    if not compaction_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Já existe uma compactação em andamento")
+
+    try:
+        storage = S3Storage(aws_service.s3_client, aws_service.bucket)
+        result = await run_blocking(
+            compact,
+            storage,
+            aws_service.prefix,
+            start_date=start_date,
+            end_date=end_date,
+            include_today=include_today,
+            dry_run=dry_run,
+            **options
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na compactação: {str(e)}")
+    finally:
+        compaction_lock.release()
+
+    if result["partitions_compacted"]:
+        PartitionManifest().invalidate()
+    return result
+
+
+async def _stream_blocking(chunks: Iterator[bytes]):
+    """Consome um gerador bloqueante no thread pool, um bloco por vez."""
+    try:
+        while True:
+            chunk = await run_blocking(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    except Exception as e:
+        # O status já foi enviado: a resposta termina truncada
+        print(f"⚠️ Erro durante a consulta histórica: {str(e)}")
+    finally:
+        try:
+            chunks.close()
+        except ValueError:
+            pass  # ainda em execução no thread pool (cliente desconectou)
+
+
+@air_quality_router.get("/history", summary="Consultar leituras históricas no S3")
+async def history(
+    station: Optional[str] = None,
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    columns: Optional[str] = None,
+    format: str = "ndjson",
+    limit: Optional[int] = None
+):
+    """
+    Lê as leituras gravadas nas partições `date=` do S3 como um fluxo.
+
+    - **station**, **city**, **country**: filtros (listas separadas por vírgula)
+    - **start_date**, **end_date**: intervalo (YYYY-MM-DD; padrão: últimos 7 dias)
+    - **columns**: colunas retornadas (padrão: todas)
+    - **format**: `ndjson` (uma linha JSON por leitura) ou `arrow` (Arrow IPC stream)
+    - **limit**: máximo de linhas (limitado por HISTORY_MAX_ROWS)
+
+    Só as partições do intervalo são listadas, só as colunas pedidas são
+    lidas e os row groups descartados pelas estatísticas não são baixados.
+    """
+    aws_service = AWSService()
+    if not aws_service.is_configured():
+        raise HTTPException(status_code=400, detail="Serviço AWS não está configurado")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: use {' ou '.join(FORMATS)}")
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit deve ser positivo")
+
+    start_date = _parse_date_param(start_date, "start_date")
+    end_date = _parse_date_param(end_date, "end_date")
+    try:
+        start_date, end_date = resolve_dates(
+            start_date,
+            end_date,
+            max_days=int(os.getenv("HISTORY_MAX_DAYS", "366"))
+        )
+        projected = resolve_columns(parse_list(columns))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    max_rows = int(os.getenv("HISTORY_MAX_ROWS", "1000000"))
+    expression = build_filter(start_date, end_date, parse_list(station), parse_list(city), parse_list(country))
+
+    try:
+        objects = await run_blocking(aws_service.list_objects, start_date, end_date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar partições: {str(e)}")
+
+    scan = HistoryScan(aws_service, objects, expression, projected, limit=min(limit or max_rows, max_rows))
+    if format == "arrow":
+        chunks = arrow_chunks(scan.batches(), scan.schema)
+    else:
+        chunks = ndjson_chunks(scan.batches())
+
+    return StreamingResponse(
+        _stream_blocking(chunks),
+        media_type=FORMATS[format],
+        headers={"X-History-Files": str(len(scan.files))}
+    )
 
 
 @air_quality_router.post("/predict", summary="Prever qualidade do ar")
@@ -165,89 +487,131 @@ async def predict_air_quality(input_data: PredictionInput):
     - 1: Atenção (requer cuidados para grupos sensíveis)
     - 2: Perigoso (nocivo para todos)
     """
+    # Obter os valores brutos (features ausentes são imputadas)
+    raw_features = {name: getattr(input_data, name) for name in FEATURE_NAMES}
+    X, sources = _impute_inputs([input_data])
+
     try:
         model_service = ModelService()
 
-        # Valores mínimos e máximos usados no treinamento
-        min_values = {
-            "pm25": 1, 
-            "pm10": 1, 
-            "no2": 0, 
-            "so2": 0, 
-            "co": 0,
-            "temperature": 1.5, 
-            "pressure": 991, 
-            "humidity": 22, 
-            "wind": 0
-        }
-
-        max_values = {
-            "pm25": 263.5, 
-            "pm10": 150, 
-            "no2": 22, 
-            "so2": 6, 
-            "co": 12,
-            "temperature": 37.5, 
-            "pressure": 1031, 
-            "humidity": 107, 
-            "wind": 8.5
-        }
-
-        # Obter os valores brutos
-        raw_features = {
-            "pm25": input_data.pm25,
-            "pm10": input_data.pm10,
-            "no2": input_data.no2,
-            "so2": input_data.so2,
-            "co": input_data.co,
-            "temperature": input_data.temperature,
-            "pressure": input_data.pressure,
-            "humidity": input_data.humidity,
-            "wind": input_data.wind
-        }
-
         # Aplicar Min-Max Scaling
-        scaled_features = [
-            (raw_features[key] - min_values[key]) / (max_values[key] - min_values[key])
-            for key in raw_features
-        ]
+        scaled_features = model_service.scale_features(X)[0].tolist()
 
         # Fazer predição
         prediction = await model_service.predict(scaled_features)
 
-        # Mapear predição para categoria
-        categories = {
-            0: {
-                "label": "Saudável",
-                "description": "Ar de boa qualidade. Seguro para atividades ao ar livre.",
-                "color": "success",
-                "recommendation": "Aproveite atividades ao ar livre normalmente."
-            },
-            1: {
-                "label": "Atenção",
-                "description": "Qualidade moderada. Grupos sensíveis devem limitar exposição prolongada.",
-                "color": "warning",
-                "recommendation": "Pessoas sensíveis devem considerar reduzir atividades intensas ao ar livre."
-            },
-            2: {
-                "label": "Perigoso",
-                "description": "Ar de qualidade ruim. Nocivo para todos.",
-                "color": "danger",
-                "recommendation": "Evite atividades ao ar livre. Mantenha janelas fechadas."
-            }
+        return {
+            **_category_payload(prediction),
+            "input_values": raw_features,  # valores originais (não normalizados)
+            "imputed": _imputed_payload(X[0], sources[0])
         }
 
-        result = categories.get(prediction, categories[1])
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao fazer predição: {str(e)}"
+        )
+
 
-        return {
-            "prediction": int(prediction),
-            "category": result["label"],
-            "description": result["description"],
-            "color": result["color"],
-            "recommendation": result["recommendation"],
-            "input_values": raw_features  # valores originais (não normalizados)
-        }
+async def _predict_rows(X: np.ndarray, sources: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    """Executa a predição em lote e monta a resposta por linha."""
+    model_service = ModelService()
+    predictions = await model_service.predict_batch(X)
+
+    classes, counts = np.unique(predictions, return_counts=True)
+    payloads = {prediction: _category_payload(prediction) for prediction in classes.tolist()}
+    rows = [
+        {"index": index, **payloads[prediction]}
+        for index, prediction in enumerate(predictions.tolist())
+    ]
+    for index, imputed in enumerate(sources or []):
+        if imputed:
+            rows[index]["imputed"] = _imputed_payload(X[index], imputed)
+
+    summary = {
+        payloads[prediction]["category"]: count
+        for prediction, count in zip(classes.tolist(), counts.tolist())
+    }
+
+    return {
+        "total": len(rows),
+        "summary": summary,
+        "predictions": rows
+    }
+
+
+@air_quality_router.post("/predict/batch", summary="Prever qualidade do ar em lote")
+async def predict_air_quality_batch(input_data: List[PredictionInput]):
+    """
+    Prediz a qualidade do ar para uma lista de leituras em uma única chamada.
+
+    As leituras são normalizadas de forma vetorizada e o modelo é chamado
+    uma vez por bloco de linhas. Cada item da resposta segue o mesmo
+    mapeamento de categorias de `/predict`.
+    """
+    if not input_data:
+        raise HTTPException(status_code=400, detail="Nenhuma leitura recebida")
+
+    X, sources = _impute_inputs(input_data)
+    try:
+        return await _predict_rows(X, sources)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao fazer predição: {str(e)}"
+        )
+
+
+def _read_parquet_upload(buffer: io.BytesIO) -> pd.DataFrame:
+    """Lê do Parquet apenas as features e as colunas de contexto presentes."""
+    names = set(pq.read_schema(buffer).names)
+    buffer.seek(0)
+    return pd.read_parquet(buffer, columns=[name for name in [*FEATURE_NAMES, *CONTEXT_FIELDS] if name in names])
 
+
+@air_quality_router.post("/predict/batch/upload", summary="Prever qualidade do ar a partir de arquivo")
+async def predict_air_quality_upload(file: UploadFile = File(...)):
+    """
+    Prediz a qualidade do ar para um arquivo CSV ou Parquet.
+
+    O arquivo deve conter as 9 colunas de features (pm25, pm10, no2, so2, co,
+    temperature, pressure, humidity, wind); valores ausentes são imputados
+    usando as colunas opcionais station, city, state, country e aqi.
+    Outras colunas são ignoradas.
+    """
+    content = await file.read()
+    filename = (file.filename or "").lower()
+    wanted = [*FEATURE_NAMES, *CONTEXT_FIELDS]
+
+    if filename.endswith(".parquet") or file.content_type == "application/vnd.apache.parquet":
+        reader = _read_parquet_upload
+    elif filename.endswith(".csv") or file.content_type in ("text/csv", "application/csv"):
+        reader = functools.partial(pd.read_csv, usecols=lambda column: column in wanted)
+    else:
+        raise HTTPException(status_code=400, detail="Formato não suportado. Envie um arquivo .csv ou .parquet")
+
+    try:
+        df = await run_blocking(reader, io.BytesIO(content))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erro ao ler arquivo: {str(e)}")
+
+    missing_columns = [name for name in FEATURE_NAMES if name not in df.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Colunas ausentes no arquivo: {', '.join(missing_columns)}")
+    if df.empty:
+        raise HTTPException(status_code=400, detail="Arquivo sem leituras")
+
+    X = df[FEATURE_NAMES].to_numpy(dtype=np.float64)
+    sources = None
+    if np.isnan(X).any():
+        contexts = df.reindex(columns=CONTEXT_FIELDS).to_dict("records")
+        try:
+            X, sources = ModelService().impute_features(X, contexts)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Arquivo contém valores ausentes nas features: {str(e)}")
+
+    try:
+        return await _predict_rows(X, sources)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -256,10 +620,18 @@ async def predict_air_quality(input_data: PredictionInput):
 
 
 @air_quality_router.get("/model/status", summary="Verificar status do modelo")
-async def check_model_status():
+async def check_model_status(request: Request):
     """
     Verifica se o modelo está carregado e pronto para predições.
+
+    O payload fica em cache por STATUS_CACHE_TTL segundos e é servido com
+    ETag/Cache-Control (304 quando não mudou). O status nunca dispara a
+    carga do modelo nem chamadas ao S3.
     """
+    return await StatusCache().response(request, "model", _model_status)
+
+
+async def _model_status() -> Dict[str, Any]:
     try:
         model_service = ModelService()
         status = await model_service.get_status()
@@ -269,4 +641,68 @@ async def check_model_status():
             "loaded": False,
             "status": "error",
             "message": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@air_quality_router.get("/model/batching", summary="Métricas do micro-batching")
+async def check_model_batching():
+    """
+    Retorna tamanho dos lotes e latências (p50/p99) do micro-batching de predições.
+    """
+    model_service = ModelService()
+    return model_service.get_batching_stats()
+
+
+@air_quality_router.get("/model/cache", summary="Métricas do cache de predições")
+async def check_prediction_cache():
+    """
+    Retorna tamanho, hits, misses, evictions e expirações do cache de predições.
+    """
+    return ModelService().prediction_cache.stats()
+
+
+@air_quality_router.get("/profiler", summary="Status do profiler por amostragem")
+async def profiler_status():
+    """
+    Retorna se o profiler está ligado, o intervalo e as amostras coletadas.
+    """
+    return SamplingProfiler().stats()
+
+
+@air_quality_router.post("/profiler/start", summary="Ligar o profiler por amostragem")
+async def start_profiler(interval_ms: Optional[float] = None, duration: float = 60):
+    """
+    Liga o profiler em tempo de execução, descartando as pilhas anteriores.
+
+    - **interval_ms**: intervalo entre amostras (padrão: PROFILER_INTERVAL_MS)
+    - **duration**: desliga sozinho após N segundos (0 = até /profiler/stop)
+    """
+    if interval_ms is not None and interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="interval_ms deve ser positivo")
+    if duration < 0:
+        raise HTTPException(status_code=400, detail="duration não pode ser negativo")
+
+    profiler = SamplingProfiler()
+    if not profiler.start(interval=interval_ms / 1000 if interval_ms else None, duration=duration):
+        raise HTTPException(status_code=409, detail="Profiler já está em execução")
+    return profiler.stats()
+
+
+@air_quality_router.post("/profiler/stop", summary="Desligar o profiler por amostragem")
+async def stop_profiler():
+    """
+    Desliga o profiler; as pilhas coletadas continuam disponíveis.
+    """
+    profiler = SamplingProfiler()
+    await run_blocking(profiler.stop)
+    return profiler.stats()
+
+
+@air_quality_router.get("/profiler/stacks", summary="Pilhas amostradas (formato collapsed)", response_class=PlainTextResponse)
+async def profiler_stacks():
+    """
+    Pilhas no formato collapsed (`thread;arquivo:função;... contagem`), para
+    flamegraph.pl ou speedscope.
+    """
+    return PlainTextResponse(SamplingProfiler().collapsed())
+
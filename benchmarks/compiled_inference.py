@@ -0,0 +1,132 @@
+"""
+Benchmark de latência do modelo compilado contra o `predict` do sklearn.
+
+Treina um modelo de teste e compara, sobre as mesmas features brutas:
+
+- sklearn: caminho antigo — `ModelService.scale_features` seguido do
+  `predict` do estimador (validação de entrada, joblib nas florestas);
+- compilado: `compile_model` com o Min-Max Scaling embutido — arrays de
+  nós percorridos em NumPy (árvores) ou uma multiplicação de matrizes
+  (modelos lineares).
+
+Mede p50/p99 de uma linha por chamada e a latência média por lote, e
+verifica que as classes previstas são idênticas em todas as medições.
+
+Uso:
+    python -m benchmarks.compiled_inference --model rf --trees 100 --batch-sizes 1,32,1000,10000
+"""
+import argparse
+import json
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from services.compiled_model import compile_model
+from services.model_service import FEATURE_MIN, FEATURE_NAMES, FEATURE_RANGE, ModelService
+
+
+def build_model(kind: str, rows: int, trees: int, depth: int):
+    rng = np.random.default_rng(42)
+    X = rng.random((rows, len(FEATURE_NAMES)))
+    y = np.digitize(X[:, 0] + X[:, 1] + 0.3 * rng.random(rows), [0.8, 1.4])
+    if kind == "linear":
+        return LogisticRegression(max_iter=1000).fit(X, y)
+    return RandomForestClassifier(n_estimators=trees, max_depth=depth or None, random_state=42).fit(X, y)
+
+
+def raw_features(rng, rows: int) -> np.ndarray:
+    """Features brutas dentro (e um pouco fora) da faixa do treinamento."""
+    return FEATURE_MIN + rng.uniform(-0.1, 1.1, (rows, len(FEATURE_NAMES))) * FEATURE_RANGE
+
+
+def sklearn_predict(model, X: np.ndarray) -> np.ndarray:
+    return model.predict(ModelService.scale_features(X))
+
+
+def time_calls(fn, batches) -> np.ndarray:
+    latencies = []
+    for X in batches:
+        started = time.perf_counter()
+        fn(X)
+        latencies.append(time.perf_counter() - started)
+    return np.asarray(latencies)
+
+
+def run_single(model, compiled, rng, requests: int) -> dict:
+    rows = [row.reshape(1, -1) for row in raw_features(rng, requests)]
+    results = {}
+    for name, fn in (("sklearn", lambda X: sklearn_predict(model, X)), ("compiled", compiled.predict)):
+        fn(rows[0])
+        latencies = time_calls(fn, rows)
+        results[name] = {
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 4)
+        }
+    results["speedup_p50"] = round(results["sklearn"]["p50_ms"] / results["compiled"]["p50_ms"], 1)
+    return results
+
+
+def run_batch(model, compiled, rng, size: int, repeat: int) -> dict:
+    batches = [raw_features(rng, size) for _ in range(repeat)]
+    for X in batches:
+        if not np.array_equal(compiled.predict(X), sklearn_predict(model, X)):
+            raise SystemExit(f"Predições divergentes no lote de {size} linhas")
+
+    result = {"rows": size}
+    for name, fn in (("sklearn", lambda X: sklearn_predict(model, X)), ("compiled", compiled.predict)):
+        mean = float(time_calls(fn, batches).mean())
+        result[name] = {"mean_ms": round(mean * 1000, 3), "rows_per_second": round(size / mean)}
+    result["speedup"] = round(result["sklearn"]["mean_ms"] / result["compiled"]["mean_ms"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=["rf", "linear"], default="rf", help="Tipo do modelo de teste")
+    parser.add_argument("--trees", type=int, default=100, help="Árvores (apenas --model rf)")
+    parser.add_argument("--depth", type=int, default=12, help="Profundidade máxima (0 = sem limite)")
+    parser.add_argument("--train-rows", type=int, default=20000, help="Linhas de treino")
+    parser.add_argument("--requests", type=int, default=2000, help="Chamadas de uma linha medidas")
+    parser.add_argument("--batch-sizes", default="32,1000,10000", help="Tamanhos de lote (separados por vírgula)")
+    parser.add_argument("--repeat", type=int, default=5, help="Lotes medidos por tamanho")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    model = build_model(args.model, args.train_rows, args.trees, args.depth)
+    started = time.perf_counter()
+    compiled = compile_model(model, FEATURE_MIN, FEATURE_RANGE)
+    compile_seconds = time.perf_counter() - started
+    if compiled is None:
+        raise SystemExit("Modelo não suportado pelo compilador")
+
+    rng = np.random.default_rng(7)
+    single = run_single(model, compiled, rng, args.requests)
+    batches = [
+        run_batch(model, compiled, rng, int(size), args.repeat)
+        for size in args.batch_sizes.split(",") if size.strip()
+    ]
+
+    print(f"modelo={args.model} compilado={compiled.kind} compilação+verificação={compile_seconds:.3f}s")
+    print(f"{'caminho':<10} {'1 linha p50':>12} {'p99':>10}")
+    for name in ("sklearn", "compiled"):
+        print(f"{name:<10} {single[name]['p50_ms']:>10.3f}ms {single[name]['p99_ms']:>8.3f}ms")
+    print(f"{'lote':>8} {'sklearn':>11} {'compilado':>11} {'speedup':>8}")
+    for result in batches:
+        print(
+            f"{result['rows']:>8} {result['sklearn']['mean_ms']:>9.2f}ms "
+            f"{result['compiled']['mean_ms']:>9.2f}ms {result['speedup']:>7.1f}x"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "benchmark": "compiled_inference",
+                "args": vars(args),
+                "compile_seconds": compile_seconds,
+                "single": single,
+                "batches": batches
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
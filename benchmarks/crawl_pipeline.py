@@ -0,0 +1,94 @@
+"""
+Benchmark do crawl com parse em pool de processos (modo pipeline).
+
+Sobe o servidor de fixtures local (`benchmarks/fixtures.py`) e coleta todas
+as estações com `AirQualityScraper.iter_stations`, variando o número de
+processos de parse (`SCRAPER_PARSE_WORKERS`):
+
+- 0: parse em uma thread do processo do event loop (um único núcleo, pelo GIL);
+- N: os downloads enfileiram o HTML bruto e N processos fazem o parse.
+
+Reporta estações/s, speedup sobre o modo sem processos e o maior atraso observado
+no event loop durante o crawl.
+
+Uso:
+    python -m benchmarks.crawl_pipeline --stations 500 --workers 0,1,2,4 --parser bs4
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from services.scraper import AirQualityScraper
+from benchmarks.fixtures import FixtureServer
+
+
+async def _monitor_lag(samples: list, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def crawl(world_url: str, args, workers: int) -> dict:
+    scraper = AirQualityScraper(
+        concurrency=args.concurrency,
+        rate_limit=0,
+        max_retries=0,
+        parser=args.parser,
+        parse_workers=workers
+    )
+    scraper.BASE_URL = world_url
+
+    lag: list = []
+    monitor = asyncio.create_task(_monitor_lag(lag))
+    failures = []
+    started = time.perf_counter()
+    stations = 0
+    async for _ in scraper.iter_stations(on_station=lambda name, error: error and failures.append(name)):
+        stations += 1
+    elapsed = time.perf_counter() - started
+    monitor.cancel()
+
+    return {
+        "parse_workers": workers,
+        "stations": stations,
+        "failed": len(failures),
+        "seconds": round(elapsed, 3),
+        "stations_per_second": round(stations / elapsed, 1),
+        "max_loop_lag_ms": round(max(lag, default=0.0) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=500, help="Estações no mapa de fixtures")
+    parser.add_argument("--workers", default="0,1,2,4", help="Processos de parse a comparar (lista)")
+    parser.add_argument("--parser", default="bs4", help="Motor de extração (auto, lxml, strainer, bs4)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Downloads simultâneos")
+    parser.add_argument("--latency", type=float, default=0.005, help="Latência simulada por resposta (s)")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    results = []
+    with FixtureServer(stations=args.stations, latency=args.latency) as server:
+        for workers in (int(w) for w in args.workers.split(",")):
+            results.append(asyncio.run(crawl(server.world_url, args, workers)))
+
+    reference = results[0]["stations_per_second"]
+    print(f"estações={args.stations} parser={args.parser} núcleos={os.cpu_count()} concorrência={args.concurrency}")
+    print(f"{'workers':>7} {'tempo':>8} {'estações/s':>11} {'speedup':>8} {'lag máx':>9}")
+    for result in results:
+        print(
+            f"{result['parse_workers']:>7} {result['seconds']:>7.2f}s {result['stations_per_second']:>11.1f} "
+            f"{result['stations_per_second'] / reference:>7.2f}x {result['max_loop_lag_ms']:>7.1f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "crawl_pipeline", "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
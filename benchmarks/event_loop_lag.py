@@ -0,0 +1,195 @@
+"""
+Benchmark de latência do event loop com predições e coletas concorrentes.
+
+Compara dois modos de execução:
+
+- inline: chamadas bloqueantes (boto3, joblib, sklearn) feitas direto na
+  coroutine, como as rotas faziam antes;
+- offloaded: as mesmas chamadas via wrappers awaitable dos serviços, que
+  usam o thread pool bloqueante compartilhado.
+
+Um cliente S3 falso com latência configurável substitui o boto3, e um
+RandomForest treinado com dados aleatórios substitui o modelo real.
+
+Uso:
+    python -m benchmarks.event_loop_lag --duration 5 --s3-latency 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import tempfile
+import time
+import joblib
+import numpy as np
+from pathlib import Path
+from botocore.exceptions import ClientError
+from sklearn.ensemble import RandomForestClassifier
+from services.aws_service import AWSService
+from services.model_service import ModelService, FEATURE_NAMES
+
+
+class FakeS3Client:
+    """Cliente S3 em memória que simula latência de rede com time.sleep."""
+
+    def __init__(self, model_bytes: bytes, latency: float):
+        self.model_bytes = model_bytes
+        self.latency = latency
+        self.uploaded_bytes = 0
+
+    def get_object(self, Bucket, Key, **kwargs):
+        time.sleep(self.latency)
+        if Key.endswith("manifest.json"):
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.model_bytes)}
+
+    def head_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        return {"ETag": '"benchmark"', "ContentLength": len(self.model_bytes)}
+
+    def download_file(self, Bucket, Key, Filename):
+        time.sleep(self.latency)
+        with open(Filename, "wb") as f:
+            f.write(self.model_bytes)
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        time.sleep(self.latency)
+        self.uploaded_bytes += len(fileobj.read())
+
+    def head_bucket(self, Bucket):
+        time.sleep(self.latency)
+
+
+def build_model(n_estimators: int) -> bytes:
+    rng = np.random.default_rng(42)
+    X = rng.random((5000, len(FEATURE_NAMES)))
+    y = rng.integers(0, 3, len(X))
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=14, random_state=42).fit(X, y)
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getvalue()
+
+
+def build_rows(n: int):
+    rng = np.random.default_rng(0)
+    return [
+        {"station": f"station-{i}", "country": "brazil", "state": "sp", "city": "sao-paulo",
+         **{name: float(value) for name, value in zip(FEATURE_NAMES, rng.random(len(FEATURE_NAMES)))},
+         "aqi": "Good"}
+        for i in range(n)
+    ]
+
+
+async def monitor_lag(stop: asyncio.Event, interval: float, samples: list):
+    """Mede quanto cada tick do event loop atrasa em relação ao esperado."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def prediction_worker(mode: str, stop: asyncio.Event, counter: list):
+    model_service = ModelService()
+    rng = np.random.default_rng()
+    while not stop.is_set():
+        features = rng.random(len(FEATURE_NAMES)).tolist()
+        if mode == "inline":
+            model_service._model.predict(np.array(features).reshape(1, -1))
+        else:
+            await model_service.predict(features)
+        counter[0] += 1
+        await asyncio.sleep(0)
+
+
+async def collection_worker(mode: str, stop: asyncio.Event, rows: list, counter: list):
+    aws_service = AWSService()
+    while not stop.is_set():
+        if mode == "inline":
+            aws_service.save_to_s3(rows)
+        else:
+            await aws_service.save_to_s3_async(rows)
+        counter[0] += 1
+        await asyncio.sleep(0)
+
+
+async def reload_worker(mode: str, stop: asyncio.Event, counter: list):
+    model_service = ModelService()
+    while not stop.is_set():
+        if mode == "inline":
+            # Caminho antigo: get_object + BytesIO + joblib.load direto na coroutine
+            response = AWSService().s3_client.get_object(Bucket="benchmark", Key=model_service.model_key)
+            joblib.load(io.BytesIO(response["Body"].read()))
+        else:
+            model_service._active = None
+            await model_service.load_model(force=True)
+        counter[0] += 1
+        await asyncio.sleep(0.5)
+
+
+async def run_mode(mode: str, args) -> dict:
+    stop = asyncio.Event()
+    lags, predictions, collections, reloads = [], [0], [0], [0]
+    rows = build_rows(args.rows)
+
+    tasks = [asyncio.create_task(monitor_lag(stop, args.tick, lags))]
+    tasks += [asyncio.create_task(prediction_worker(mode, stop, predictions)) for _ in range(args.predictors)]
+    tasks.append(asyncio.create_task(collection_worker(mode, stop, rows, collections)))
+    tasks.append(asyncio.create_task(reload_worker(mode, stop, reloads)))
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    lag_ms = np.array(lags) * 1000
+    return {
+        "mode": mode,
+        "lag_ms": {
+            "mean": round(float(lag_ms.mean()), 2),
+            "p50": round(float(np.percentile(lag_ms, 50)), 2),
+            "p99": round(float(np.percentile(lag_ms, 99)), 2),
+            "max": round(float(lag_ms.max()), 2)
+        },
+        "predictions_per_second": round(predictions[0] / args.duration, 1),
+        "collections": collections[0],
+        "model_reloads": reloads[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=5.0, help="Duração de cada modo (s)")
+    parser.add_argument("--s3-latency", type=float, default=0.2, help="Latência simulada do S3 (s)")
+    parser.add_argument("--predictors", type=int, default=8, help="Clientes de predição concorrentes")
+    parser.add_argument("--rows", type=int, default=5000, help="Estações por coleta")
+    parser.add_argument("--trees", type=int, default=100, help="Árvores do modelo de teste")
+    parser.add_argument("--tick", type=float, default=0.005, help="Intervalo do monitor de lag (s)")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    aws_service = AWSService()
+    aws_service.s3_client = FakeS3Client(build_model(args.trees), args.s3_latency)
+    aws_service.bucket = "benchmark"
+    aws_service._configured = True
+
+    model_service = ModelService()
+    model_service.cache_dir = Path(tempfile.mkdtemp(prefix="model-cache-"))
+    model_service._active = model_service._load_model_sync()
+
+    results = [asyncio.run(run_mode(mode, args)) for mode in ("inline", "offloaded")]
+
+    print(f"{'modo':<10} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'pred/s':>8} {'coletas':>8} {'reloads':>8}")
+    for result in results:
+        lag = result["lag_ms"]
+        print(
+            f"{result['mode']:<10} {lag['p50']:>7.1f}ms {lag['p99']:>7.1f}ms {lag['max']:>7.1f}ms "
+            f"{result['predictions_per_second']:>8.1f} {result['collections']:>8} {result['model_reloads']:>8}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "event_loop_lag", "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Páginas HTML sintéticas no formato do aqicn.org para os benchmarks offline.
+
+As páginas de estação imitam a estrutura real (cabeçalho, menus, scripts
+inline e a tabela `cur_*` no meio de bastante markup irrelevante), para que o
+custo de parse seja representativo. `FixtureServer` serve essas páginas
+em um servidor HTTP local para medir o crawl completo sem acessar a rede.
+`station_records` gera registros já coletados, no schema dos arquivos Parquet.
+"""
+import multiprocessing
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+from services.schema import MEASUREMENT_COLUMNS, STATION_SCHEMA
+
+BASE_HOST = "https://aqicn.org"
+
+_MEASUREMENT_IDS = ["cur_pm25", "cur_pm10", "cur_no2", "cur_so2", "cur_co", "cur_t", "cur_p", "cur_h", "cur_w"]
+_COUNTRIES = ["brazil", "chile", "india", "china", "usa", "germany", "japan", "mexico"]
+
+
+def station_urls(count: int, host: str = BASE_HOST) -> List[Tuple[str, str]]:
+    """Gera (nome, url) de `count` estações no formato /city/<país>/<estado>/<cidade>."""
+    rng = random.Random(7)
+    stations = []
+    for i in range(count):
+        country = rng.choice(_COUNTRIES)
+        url = f"{host}/city/{country}/state-{i % 37}/city-{i}/pt/"
+        stations.append((f"Estação {i}", url))
+    return stations
+
+
+def world_map_page(stations: List[Tuple[str, str]]) -> bytes:
+    """Página do mapa mundial com um link por estação e links de navegação."""
+    links = "\n".join(f'<li><a href="{url}">{name}</a></li>' for name, url in stations)
+    nav = "\n".join(f'<a href="{BASE_HOST}/here/{i}/">Link {i}</a>' for i in range(50))
+    return f"<html><head><title>World</title></head><body><nav>{nav}</nav><ul>{links}</ul></body></html>".encode()
+
+
+def _measurement_cell(rng: random.Random, element_id: str) -> str:
+    roll = rng.random()
+    if roll < 0.1:
+        value = "-"
+    elif roll < 0.2:
+        value = f"{rng.uniform(0, 100):.1f}".replace(".", ",")
+    else:
+        value = f"{rng.uniform(0, 300):.0f}"
+    return f'<tr><td class="specie">{element_id[4:]}</td><td id="{element_id}" class="tdcur"> {value} </td></tr>'
+
+
+def station_page(index: int, filler: int = 200) -> bytes:
+    """
+    Página de uma estação.
+
+    Args:
+        index: Semente da página (valores determinísticos)
+        filler: Quantidade de blocos de markup irrelevante ao redor da tabela
+    """
+    rng = random.Random(index)
+    rows = "\n".join(_measurement_cell(rng, element_id) for element_id in _MEASUREMENT_IDS if rng.random() > 0.05)
+    aqi = rng.choice(["Good", "Moderate", "Unhealthy for Sensitive Groups", "Unhealthy"])
+    noise = "\n".join(
+        f'<div class="card"><span class="label">item {i}</span><a href="/x/{i}">mais</a>'
+        f'<table><tr><td>{i}</td><td>{rng.random():.3f}</td></tr></table></div>'
+        for i in range(filler)
+    )
+    script = "<script>var mapData = " + "[" + ",".join(str(rng.random()) for _ in range(300)) + "];</script>"
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Air Quality</title>"
+        f"{script}</head><body><header>{noise[:len(noise) // 2]}</header>"
+        f'<div id="aqiwgt"><div class="aqivalue" title="{aqi}">{rng.randint(0, 300)}</div>'
+        f'<table id="citydivmain">{rows}</table></div>'
+        f"<footer>{noise[len(noise) // 2:]}</footer></body></html>"
+    ).encode()
+
+
+# Distribuição dos AQIs dos registros sintéticos (inclui os valores ausentes do site)
+_AQI_WEIGHTS = {
+    "Good": 0.30, "Moderate": 0.25, "Unhealthy for Sensitive Groups": 0.10, "Unhealthy": 0.10,
+    "Very Unhealthy": 0.05, "Hazardous": 0.03, "N/A": 0.08, "no data": 0.05, None: 0.04
+}
+
+
+def station_records(rows: int, stations: int = 200, seed: int = 7) -> pa.Table:
+    """
+    Registros coletados sintéticos no STATION_SCHEMA.
+
+    Cada estação tem uma leitura a cada 10 minutos, então (estação, data) é
+    único. Há três estações por cidade, quatro cidades por estado e cinco
+    estados por país. Cerca de 15% das medições são nulas e 3% negativas; nas
+    leituras 'Good', cada cidade tem um valor típico por medição, para que a
+    moda da cidade seja bem definida.
+
+    Args:
+        rows: Quantidade de registros
+        stations: Quantidade de estações
+        seed: Semente dos valores
+    """
+    rng = np.random.default_rng(seed)
+    station = np.arange(rows) % stations
+    city = station // 3
+    state = city // 4
+    country = state // 5
+
+    aqi_values = list(_AQI_WEIGHTS)
+    aqi = np.array(aqi_values, dtype=object)[rng.choice(len(aqi_values), rows, p=list(_AQI_WEIGHTS.values()))]
+
+    measurements = {}
+    for position, name in enumerate(MEASUREMENT_COLUMNS):
+        typical = (city * 31 + position * 17) % 150
+        values = np.where(
+            (aqi == "Good") & (rng.random(rows) < 0.6),
+            typical,
+            rng.integers(0, 300, rows)
+        ).astype(np.float32)
+        values[rng.random(rows) < 0.03] = -1.0
+        values[rng.random(rows) < 0.15] = np.nan
+        measurements[name] = pa.array(values, from_pandas=True)
+
+    def dictionary(codes: np.ndarray, labels: List[str]) -> pa.DictionaryArray:
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(labels))
+
+    dates = np.datetime64("2025-10-01T00:00:00") + (np.arange(rows) // stations) * np.timedelta64(10, "m")
+    columns = {
+        "date": pa.array(dates.astype("datetime64[us]")),
+        "station": dictionary(station, [f"Estação {i}" for i in range(stations)]),
+        "country": dictionary(country % len(_COUNTRIES), _COUNTRIES),
+        "state": dictionary(state, [f"state-{i}" for i in range(state.max() + 1)]),
+        "city": dictionary(city, [f"city-{i}" for i in range(city.max() + 1)]),
+        **measurements,
+        "aqi": pa.array(aqi, type=pa.string()).dictionary_encode().cast(STATION_SCHEMA.field("aqi").type)
+    }
+    return pa.table([columns[field.name] for field in STATION_SCHEMA], schema=STATION_SCHEMA)
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        if self.path.rstrip("/").endswith("/map/world/pt"):
+            body = server.world_page
+        else:
+            match = re.search(r"/city-(\d+)/", self.path)
+            if not match:
+                self.send_error(404)
+                return
+            body = server.station_pages[int(match.group(1)) % len(server.station_pages)]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(ready, stations: int, filler: int, latency: float, distinct: int):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+    server.daemon_threads = True
+    host = f"http://127.0.0.1:{server.server_address[1]}/aqicn"
+    server.world_page = world_map_page(station_urls(stations, host))
+    server.station_pages = [station_page(i, filler) for i in range(distinct)]
+    server.latency = latency
+    ready.put(host)
+    server.serve_forever()
+
+
+class FixtureServer:
+    """
+    Servidor HTTP local com o mapa mundial e as páginas de estação sintéticas.
+
+    Roda em um processo separado para não disputar o GIL com o crawler
+    medido. As URLs ficam sob `/aqicn/` para passar pelo filtro de links do
+    scraper.
+
+    Uso:
+        with FixtureServer(stations=300) as server:
+            scraper.BASE_URL = server.world_url
+    """
+
+    def __init__(self, stations: int = 300, filler: int = 200, latency: float = 0.0, distinct: int = 50):
+        """
+        Args:
+            stations: Estações listadas no mapa mundial
+            filler: Markup irrelevante por página (ver station_page)
+            latency: Atraso (segundos) de cada resposta, simulando a rede
+            distinct: Páginas de estação distintas (reutilizadas em ciclo)
+        """
+        self.args = (stations, filler, latency, distinct)
+        self.base_url: Optional[str] = None
+        self._process = None
+
+    @property
+    def world_url(self) -> str:
+        return f"{self.base_url}/map/world/pt"
+
+    def __enter__(self) -> "FixtureServer":
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self._process = context.Process(target=_serve, args=(ready, *self.args), daemon=True)
+        self._process.start()
+        self.base_url = ready.get(timeout=60)
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
@@ -0,0 +1,250 @@
+"""
+Benchmark e paridade da limpeza/imputação local (`services/imputation.py`).
+
+Sobre registros sintéticos (`benchmarks/fixtures.py`):
+
+- mede o motor vetorizado (limpeza, agregados e preenchimento) em linhas/s;
+- confere o resultado contra uma tradução literal do `aws_query.sql` em
+  Python puro (linha a linha, medição a medição) sobre as primeiras
+  `--reference-rows` linhas;
+- se o pyspark estiver instalado, executa o próprio `aws_query.sql` no Spark
+  local sobre as primeiras `--spark-rows` linhas, compara o tempo e confere a
+  paridade linha a linha (mesmas linhas e chaves, mesmas medições).
+
+Qualquer divergência, na referência ou no Spark, encerra com código de saída
+diferente de zero.
+
+O sorteio dos AQIs 'N/A' / 'no data' não é reproduzível entre Spark e numpy,
+então as comparações usam o AQI já limpo do lado de referência e conferem
+apenas o preenchimento das medições.
+
+Uso:
+    python -m benchmarks.imputation_pipeline --rows 1000000
+    python -m benchmarks.imputation_pipeline --rows 200000 --no-spark
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, defaultdict
+import numpy as np
+import pandas as pd
+from services.imputation import (
+    ELEVATED_AQI, GOOD_AQI, OUTPUT_COLUMNS, SEVERE_AQI, apply_stats, clean, compute_stats
+)
+from services.schema import MEASUREMENT_COLUMNS
+from benchmarks.fixtures import station_records
+
+SQL_PATH = os.path.join(os.path.dirname(__file__), "..", "services", "aws_query.sql")
+
+
+def _is_null(value) -> bool:
+    return value is None or value != value
+
+
+def reference_impute(cleaned: pd.DataFrame) -> pd.DataFrame:
+    """Tradução literal do SQL: agregados e COALESCE por medição, linha a linha."""
+    rows = cleaned.astype(object).to_dict("records")
+    result = [dict(row) for row in rows]
+
+    for feature in MEASUREMENT_COLUMNS:
+        state_max, country_values, city_counts, station_values, aqi_values = {}, defaultdict(list), defaultdict(Counter), defaultdict(list), defaultdict(list)
+        for row in rows:
+            value, aqi = row[feature], row["aqi"]
+            aqi_key = None if _is_null(aqi) else aqi
+            if not _is_null(value):
+                aqi_values[aqi_key].append(value)
+                if aqi in SEVERE_AQI and not _is_null(row["state"]):
+                    state_max[row["state"]] = max(state_max.get(row["state"], value), value)
+                if aqi in ELEVATED_AQI and not _is_null(row["country"]):
+                    country_values[row["country"]].append(value)
+                if not _is_null(row["station"]):
+                    station_values[row["station"]].append(value)
+            if aqi == GOOD_AQI and not _is_null(row["city"]):
+                city_counts[row["city"]][None if _is_null(value) else value] += 1
+
+        city_mode = {
+            city: min(counts.items(), key=lambda item: (-item[1], item[0] is None, item[0] or 0))[0]
+            for city, counts in city_counts.items()
+        }
+        medians = {key: float(np.median(values)) for key, values in aqi_values.items()}
+
+        for row, out in zip(rows, result):
+            if not _is_null(row[feature]):
+                continue
+            aqi = row["aqi"]
+            if aqi in SEVERE_AQI:
+                value = state_max.get(row["state"])
+            elif aqi in ELEVATED_AQI:
+                values = country_values.get(row["country"])
+                value = sum(values) / len(values) if values else None
+            elif aqi == GOOD_AQI:
+                value = city_mode.get(row["city"])
+            else:
+                values = station_values.get(row["station"])
+                value = sum(values) / len(values) if values else None
+            if _is_null(value):
+                value = medians.get(None if _is_null(aqi) else aqi)
+            out[feature] = value
+
+    return pd.DataFrame(result, columns=OUTPUT_COLUMNS)
+
+
+def compare(local: pd.DataFrame, reference: pd.DataFrame) -> int:
+    """Quantidade de linhas com alguma medição divergente (tolerância relativa 1e-6)."""
+    a = local[MEASUREMENT_COLUMNS].to_numpy(dtype=np.float64)
+    b = reference[MEASUREMENT_COLUMNS].to_numpy(dtype=np.float64)
+    equal = np.isclose(a, b, rtol=1e-6, equal_nan=True)
+    return int((~equal.all(axis=1)).sum())
+
+
+def compare_spark(raw: pd.DataFrame, spark_result: pd.DataFrame) -> int:
+    """
+    Linhas divergentes entre o motor local e o resultado do aws_query.sql no Spark.
+
+    Linhas a mais ou a menos, ou com chaves (data, estação e localização)
+    diferentes após ordenar por estação e data, contam todas como divergentes.
+    """
+    keys = ["date", "station", "country", "state", "city"]
+    if len(spark_result) != len(raw):
+        return max(len(spark_result), len(raw))
+
+    # Ordena pelos textos (as colunas locais são categóricas, com outra ordem)
+    def by_station(frame: pd.DataFrame) -> pd.DataFrame:
+        return frame.sort_values(["station", "date"], key=lambda column: column.astype(object)).reset_index(drop=True)
+
+    spark_result = by_station(spark_result)
+    base = by_station(clean(raw))
+    mismatched_keys = np.zeros(len(base), dtype=bool)
+    for key in keys:
+        local_key, spark_key = base[key].astype(object), spark_result[key].astype(object)
+        mismatched_keys |= ~((local_key == spark_key) | (local_key.isna() & spark_key.isna())).to_numpy()
+    if mismatched_keys.any():
+        return int(mismatched_keys.sum())
+
+    # Usa o AQI sorteado pelo Spark (rand(42) não é reproduzível no numpy)
+    base["aqi"] = spark_result["aqi"].to_numpy()
+    return compare(apply_stats(base, compute_stats(base)), spark_result)
+
+
+def run_local(raw: pd.DataFrame, repeat: int) -> tuple:
+    timings = {"clean": [], "stats": [], "apply": []}
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cleaned = clean(raw)
+        cleaned_at = time.perf_counter()
+        stats = compute_stats(cleaned)
+        stats_at = time.perf_counter()
+        result = apply_stats(cleaned, stats)
+        finished = time.perf_counter()
+        timings["clean"].append(cleaned_at - started)
+        timings["stats"].append(stats_at - cleaned_at)
+        timings["apply"].append(finished - stats_at)
+    return result, {step: min(values) for step, values in timings.items()}
+
+
+def run_spark(raw: pd.DataFrame, repeat: int) -> tuple:
+    """Executa o aws_query.sql no Spark local; retorna (resultado, segundos) ou None sem pyspark."""
+    try:
+        from pyspark.sql import SparkSession
+    except ImportError:
+        return None
+
+    with open(SQL_PATH, "r", encoding="utf-8") as f:
+        sql = f.read()
+
+    spark = (
+        SparkSession.builder.master("local[*]").appName("imputation-benchmark")
+        .config("spark.sql.session.timeZone", "UTC")
+        .getOrCreate()
+    )
+    try:
+        frame = raw.astype({name: object for name in ["station", "country", "state", "city", "aqi"]})
+        spark.createDataFrame(frame).createOrReplaceTempView("raw_data")
+        spark.sql(sql).count()  # aquecimento (JIT, planos)
+
+        timings, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = spark.sql(sql).toPandas()
+            timings.append(time.perf_counter() - started)
+        return result, min(timings)
+    finally:
+        spark.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Registros sintéticos")
+    parser.add_argument("--stations", type=int, default=2000, help="Estações distintas")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições (melhor tempo)")
+    parser.add_argument("--reference-rows", type=int, default=20000, help="Linhas conferidas contra a referência em Python")
+    parser.add_argument("--spark-rows", type=int, default=200000, help="Linhas conferidas contra o aws_query.sql no Spark")
+    parser.add_argument("--no-spark", action="store_true", help="Não executa o Spark mesmo se instalado")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    raw = station_records(args.rows, args.stations).to_pandas()
+    _, timings = run_local(raw, args.repeat)
+    local_seconds = sum(timings.values())
+
+    # Paridade com a tradução literal do SQL (sobre um recorte menor)
+    sample = raw.iloc[:args.reference_rows].reset_index(drop=True)
+    cleaned = clean(sample)
+    started = time.perf_counter()
+    reference = reference_impute(cleaned)
+    reference_seconds = time.perf_counter() - started
+    reference_mismatches = compare(apply_stats(cleaned, compute_stats(cleaned)), reference)
+
+    results = {
+        "rows": args.rows,
+        "local_seconds": round(local_seconds, 3),
+        "local_rows_per_second": round(args.rows / local_seconds),
+        "local_steps": {step: round(seconds, 3) for step, seconds in timings.items()},
+        "reference_rows": len(sample),
+        "reference_seconds": round(reference_seconds, 3),
+        "reference_mismatches": reference_mismatches,
+        "spark_rows": None,
+        "spark_seconds": None,
+        "spark_mismatches": None
+    }
+
+    spark_sample = raw.iloc[:args.spark_rows].reset_index(drop=True)
+    spark = None if args.no_spark else run_spark(spark_sample, args.repeat)
+    if spark is not None:
+        spark_result, spark_seconds = spark
+        _, spark_timings = run_local(spark_sample, args.repeat)
+        results["spark_rows"] = len(spark_sample)
+        results["spark_seconds"] = round(spark_seconds, 3)
+        results["spark_local_seconds"] = round(sum(spark_timings.values()), 3)
+        results["spark_mismatches"] = compare_spark(spark_sample, spark_result)
+
+    print(f"linhas={args.rows} estações={args.stations}")
+    print(
+        f"local:      {results['local_seconds']:.3f}s ({results['local_rows_per_second']} linhas/s) "
+        f"limpeza={timings['clean']:.3f}s agregados={timings['stats']:.3f}s preenchimento={timings['apply']:.3f}s"
+    )
+    print(
+        f"referência: {results['reference_seconds']:.3f}s para {len(sample)} linhas, "
+        f"divergências={reference_mismatches}"
+    )
+    if spark is None:
+        print("spark:      não executado (pyspark não instalado ou --no-spark)")
+    else:
+        print(
+            f"spark:      {results['spark_seconds']:.3f}s para {results['spark_rows']} linhas "
+            f"({results['spark_seconds'] / results['spark_local_seconds']:.1f}x o local), "
+            f"divergências={results['spark_mismatches']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "imputation_pipeline", "args": vars(args), "results": results}, f, indent=2)
+
+    if reference_mismatches or results["spark_mismatches"]:
+        raise SystemExit("❌ Resultado divergente da semântica do aws_query.sql")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark de cold start e memória (RSS/PSS) da carga do modelo.
+
+Compara dois caminhos de carga em processos separados, simulando workers
+do uvicorn que carregam o mesmo modelo ao mesmo tempo:
+
+- bytesio: caminho antigo — lê o artefato inteiro (comprimido) para um
+  BytesIO e faz o unpickle, mantendo duas cópias em memória durante a carga;
+- mmap: artefato no formato do cache local (sem compressão) carregado com
+  `joblib.load(..., mmap_mode='r')`; os arrays ficam no page cache e são
+  compartilhados entre os processos.
+
+O PSS (proportional set size) divide as páginas compartilhadas entre os
+processos que as usam, então a soma do PSS mostra a memória real ocupada
+pelos N workers.
+
+Observação: as árvores do sklearn copiam seus nós para memória própria no
+unpickle (Tree.__setstate__); modelos baseados em arrays (ex.: KNN, lineares)
+são os que mais se beneficiam do memory map.
+
+Uso:
+    python -m benchmarks.model_cold_start --model knn --workers 4
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from services.model_service import FEATURE_NAMES
+
+
+def _proc_memory_kb() -> dict:
+    """Lê RSS, pico de RSS e PSS do processo atual (Linux)."""
+    memory = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split()[:2]
+                memory[key.rstrip(":")] = int(value)
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["Pss"] = int(line.split()[1])
+    except FileNotFoundError:
+        memory["Pss"] = memory.get("VmRSS", 0)
+    return memory
+
+
+def run_child(path: str, mode: str, hold: float):
+    """Processo filho: carrega o modelo, faz uma predição e reporta tempo e memória."""
+    baseline = _proc_memory_kb()
+    started = time.perf_counter()
+
+    if mode == "bytesio":
+        with open(path, "rb") as f:
+            model = joblib.load(io.BytesIO(f.read()))
+    else:
+        model = joblib.load(path, mmap_mode="r")
+
+    model.predict(np.zeros((1, len(FEATURE_NAMES))))
+    load_seconds = time.perf_counter() - started
+
+    # Mantém o modelo vivo para que os workers coexistam ao medir o PSS
+    time.sleep(hold)
+    memory = _proc_memory_kb()
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "rss_mb": (memory["VmRSS"] - baseline["VmRSS"]) / 1024,
+        "peak_rss_mb": (memory["VmHWM"] - baseline["VmRSS"]) / 1024,
+        "pss_mb": (memory["Pss"] - baseline["Pss"]) / 1024
+    }))
+
+
+def build_model(kind: str, rows: int, trees: int):
+    rng = np.random.default_rng(42)
+    X = rng.random((rows, len(FEATURE_NAMES)))
+    y = rng.integers(0, 3, rows)
+    if kind == "knn":
+        return KNeighborsClassifier(algorithm="brute").fit(X, y)
+    return RandomForestClassifier(n_estimators=trees, random_state=42, n_jobs=-1).fit(X, y)
+
+
+def run_mode(path: str, mode: str, workers: int, hold: float) -> dict:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.model_cold_start", "--child", path, "--mode", mode, "--hold", str(hold)],
+            stdout=subprocess.PIPE,
+            text=True
+        )
+        for _ in range(workers)
+    ]
+    reports = [json.loads(process.communicate()[0]) for process in processes]
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "load_seconds_mean": round(float(np.mean([r["load_seconds"] for r in reports])), 3),
+        "rss_mb_per_worker": round(float(np.mean([r["rss_mb"] for r in reports])), 1),
+        "peak_rss_mb_per_worker": round(float(np.mean([r["peak_rss_mb"] for r in reports])), 1),
+        "pss_mb_total": round(float(np.sum([r["pss_mb"] for r in reports])), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=["rf", "knn"], default="knn", help="Tipo do modelo de teste")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas de treino (tamanho dos arrays)")
+    parser.add_argument("--trees", type=int, default=100, help="Árvores (apenas --model rf)")
+    parser.add_argument("--compress", type=int, default=3, help="Nível de compressão do artefato publicado")
+    parser.add_argument("--workers", type=int, default=4, help="Processos carregando o modelo ao mesmo tempo")
+    parser.add_argument("--hold", type=float, default=2.0, help="Tempo (s) que cada worker mantém o modelo")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.mode, args.hold)
+        return
+
+    model = build_model(args.model, args.rows, args.trees)
+    workdir = tempfile.mkdtemp(prefix="model-cold-start-")
+    published = os.path.join(workdir, "published.joblib")
+    mmap_artifact = os.path.join(workdir, "cached.mmap.joblib")
+    joblib.dump(model, published, compress=args.compress)
+    joblib.dump(model, mmap_artifact)
+    del model
+
+    # Aquece o page cache para comparar apenas o custo de carga
+    for path in (published, mmap_artifact):
+        with open(path, "rb") as f:
+            while f.read(1 << 24):
+                pass
+
+    results = [
+        run_mode(published, "bytesio", args.workers, args.hold),
+        run_mode(mmap_artifact, "mmap", args.workers, args.hold)
+    ]
+
+    print(f"modelo={args.model} artefato publicado={os.path.getsize(published) / 2**20:.1f}MB "
+          f"cache mmap={os.path.getsize(mmap_artifact) / 2**20:.1f}MB workers={args.workers}")
+    print(f"{'modo':<8} {'carga':>8} {'RSS/worker':>11} {'pico/worker':>12} {'PSS total':>10}")
+    for result in results:
+        print(
+            f"{result['mode']:<8} {result['load_seconds_mean']:>7.3f}s {result['rss_mb_per_worker']:>9.1f}MB "
+            f"{result['peak_rss_mb_per_worker']:>10.1f}MB {result['pss_mb_total']:>8.1f}MB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "model_cold_start", "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
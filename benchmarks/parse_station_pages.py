@@ -0,0 +1,99 @@
+"""
+Benchmark do parse das páginas de estação.
+
+Compara os motores de extração de `services/station_parser.py` sobre as
+mesmas páginas HTML e confere se todos produzem exatamente os mesmos
+registros que o parser original (BeautifulSoup completo):
+
+- bs4: árvore completa e um `find` por campo (caminho original);
+- strainer: BeautifulSoup limitado a <td>/<div> com SoupStrainer;
+- lxml: parser em C e um único XPath (se o lxml estiver instalado).
+
+Por padrão usa páginas sintéticas (`benchmarks/fixtures.py`); com
+`--pages-dir` usa páginas reais salvas (arquivos .html).
+
+Uso:
+    python -m benchmarks.parse_station_pages --pages 200
+    python -m benchmarks.parse_station_pages --pages-dir ./saved_pages
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import datetime
+from services.station_parser import ENGINES, LXML_AVAILABLE, parse_station_page
+from benchmarks.fixtures import station_page, station_urls
+
+
+def load_pages(args) -> list:
+    if args.pages_dir:
+        paths = sorted(glob.glob(os.path.join(args.pages_dir, "*.html")))
+        if not paths:
+            raise SystemExit(f"Nenhum arquivo .html em {args.pages_dir}")
+        pages = []
+        for path in paths:
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        return pages
+    return [station_page(i) for i in range(args.pages)]
+
+
+def run_engine(engine: str, pages: list, urls: list, repeat: int, date: datetime) -> tuple:
+    records = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        records = [
+            parse_station_page(name, url, content, date=date, engine=engine)
+            for content, (name, url) in zip(pages, urls)
+        ]
+    elapsed = time.perf_counter() - started
+    return records, elapsed / (repeat * len(pages)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="Páginas sintéticas")
+    parser.add_argument("--pages-dir", help="Diretório com páginas reais salvas (.html)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições por motor")
+    parser.add_argument("--output", help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    urls = station_urls(len(pages))
+    date = datetime(2025, 1, 1)
+    size_kb = sum(len(p) for p in pages) / len(pages) / 1024
+
+    engines = [engine for engine in reversed(ENGINES) if engine != "auto" and (engine != "lxml" or LXML_AVAILABLE)]
+    baseline, _ = run_engine("bs4", pages, urls, 1, date)
+
+    results = []
+    for engine in engines:
+        records, ms_per_page = run_engine(engine, pages, urls, args.repeat, date)
+        results.append({
+            "engine": engine,
+            "ms_per_page": round(ms_per_page, 3),
+            "pages_per_second": round(1000 / ms_per_page, 1),
+            "matches_bs4": records == baseline
+        })
+
+    # engines começa pelo bs4: speedup relativo ao parser original
+    reference = results[0]["ms_per_page"]
+    print(f"páginas={len(pages)} tamanho médio={size_kb:.1f}KB lxml={'sim' if LXML_AVAILABLE else 'não'}")
+    print(f"{'motor':<9} {'ms/página':>10} {'páginas/s':>10} {'speedup':>8} {'igual ao bs4':>13}")
+    for result in results:
+        print(
+            f"{result['engine']:<9} {result['ms_per_page']:>10.3f} {result['pages_per_second']:>10.1f} "
+            f"{reference / result['ms_per_page']:>7.1f}x {'sim' if result['matches_bs4'] else 'NÃO':>13}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "parse_station_pages", "args": vars(args), "results": results}, f, indent=2)
+
+    if not all(result["matches_bs4"] for result in results):
+        raise SystemExit("❌ Registros divergentes do parser original")
+
+
+if __name__ == "__main__":
+    main()
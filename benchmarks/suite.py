@@ -0,0 +1,421 @@
+"""
+Suíte offline de benchmarks e teste de carga dos caminhos críticos.
+
+Roda sem rede, com substitutos locais para as dependências externas:
+
+- aqicn.org: servidor de fixtures (`benchmarks/fixtures.py`) com o mapa
+  mundial e as páginas de estação, com latência configurável;
+- S3: moto em processo (padrão) ou um MinIO/S3 compatível via `--s3-endpoint`;
+- modelo: um RandomForest pequeno treinado na hora, publicado no S3 de
+  teste junto com um feature store construído a partir de registros
+  sintéticos, e carregado pelo `ModelService` como em produção.
+
+Etapas (`--only` seleciona um subconjunto):
+
+- crawl: estações/s coletadas com `AirQualityScraper.scrape_all_stations`;
+- upload: MB/s e linhas/s gravando registros sintéticos no sink Parquet
+  usado por `save_to_s3` (multipart upload);
+- predict: latência p50/p99 de `ModelService.predict` (entradas distintas);
+- api: requisições/s e latência p50/p99 de `POST /api/predict` em cada nível
+  de concorrência, via ASGI em processo (roteamento, validação, imputação,
+  cache e modelo, sem o custo de sockets), para três cenários: entradas
+  distintas, entradas repetidas (acertos no cache de predições) e entradas
+  com features ausentes (imputação pelo feature store).
+
+Os resultados são salvos em JSON (padrão: `benchmarks/results/<commit>.json`)
+e `--compare` mostra a variação de cada métrica contra um resultado anterior.
+
+Uso:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --only crawl,upload --stations 300 --latency 0.02
+    python -m benchmarks.suite --concurrency 1,8,32,64 --requests 2000
+    python -m benchmarks.suite --s3-endpoint http://localhost:9000 --bucket bench
+    python -m benchmarks.suite --compare benchmarks/results/abc1234.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List
+import boto3
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from benchmarks.fixtures import FixtureServer, station_records
+
+STEPS = ("crawl", "upload", "predict", "api")
+SCENARIOS = ("distinct", "repeated", "imputed")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+MODEL_KEY = "models/air_quality_model.joblib"
+FEATURE_STORE_KEY = "models/feature_stats.arrow"
+
+# Métricas comparadas entre execuções: True = maior é melhor
+METRIC_DIRECTIONS = {
+    "stations_per_second": True,
+    "mb_per_second": True,
+    "rows_per_second": True,
+    "requests_per_second": True,
+    "p50_ms": False,
+    "p99_ms": False
+}
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+def _git_commit() -> str:
+    """Commit atual (com sufixo -dirty se houver alterações), ou 'unknown'."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return f"{commit}-dirty" if dirty.strip() else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@contextmanager
+def s3_stand_in(args):
+    """Configura o AWSService contra o moto (padrão) ou um endpoint S3 local."""
+    from services.aws_service import AWSService
+
+    mock = None
+    if not args.s3_endpoint:
+        try:
+            from moto import mock_aws
+        except ImportError:
+            raise SystemExit(
+                "moto não está instalado: instale as dependências de benchmark "
+                "(pip install -r requirements-dev.txt) ou use um S3 real/MinIO com --s3-endpoint"
+            )
+        mock = mock_aws()
+        mock.start()
+
+    try:
+        access_key = os.getenv("AWS_ACCESS_KEY_ID", "minioadmin" if args.s3_endpoint else "bench")
+        secret_key = os.getenv("AWS_SECRET_ACCESS_KEY", "minioadmin" if args.s3_endpoint else "bench")
+        client = boto3.client(
+            "s3",
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name="us-east-1",
+            endpoint_url=args.s3_endpoint
+        )
+        existing = [bucket["Name"] for bucket in client.list_buckets().get("Buckets", [])]
+        if args.bucket not in existing:
+            client.create_bucket(Bucket=args.bucket)
+
+        AWSService().configure(
+            access_key=access_key,
+            secret_key=secret_key,
+            bucket=args.bucket,
+            prefix="bench",
+            endpoint_url=args.s3_endpoint
+        )
+        yield client
+    finally:
+        if mock is not None:
+            mock.stop()
+
+
+def publish_model_fixture(client, bucket: str, trees: int):
+    """Treina um modelo pequeno e publica modelo e feature store no S3 de teste."""
+    from services.feature_store import build_feature_store, serialize_feature_store
+    from services.imputation import clean
+    from services.schema import MEASUREMENT_COLUMNS
+
+    rng = np.random.default_rng(42)
+    X = rng.random((5000, len(MEASUREMENT_COLUMNS)))
+    y = np.digitize(X[:, 0] + X[:, 1], [0.7, 1.3])
+    model = RandomForestClassifier(n_estimators=trees, max_depth=12, random_state=42).fit(X, y)
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    client.put_object(Bucket=bucket, Key=MODEL_KEY, Body=buffer.getvalue())
+
+    cleaned = clean(station_records(50_000, stations=120).to_pandas())
+    client.put_object(Bucket=bucket, Key=FEATURE_STORE_KEY, Body=serialize_feature_store(build_feature_store(cleaned)))
+
+
+async def bench_crawl(args) -> Dict[str, Any]:
+    from services.scraper import AirQualityScraper
+
+    with FixtureServer(stations=args.stations, latency=args.latency) as server:
+        scraper = AirQualityScraper(concurrency=args.crawl_concurrency, rate_limit=0, max_retries=0)
+        scraper.BASE_URL = server.world_url
+        started = time.perf_counter()
+        records = await scraper.scrape_all_stations()
+        elapsed = time.perf_counter() - started
+
+    return {
+        "stations": len(records),
+        "latency_s": args.latency,
+        "concurrency": args.crawl_concurrency,
+        "seconds": round(elapsed, 3),
+        "stations_per_second": round(len(records) / elapsed, 1)
+    }
+
+
+def bench_upload(args) -> Dict[str, Any]:
+    from services.aws_service import AWSService
+
+    rows = station_records(args.upload_rows, stations=args.stations).to_pylist()
+    aws_service = AWSService()
+    timings, size = [], 0
+    for _ in range(args.repeat):
+        sink = aws_service.open_parquet_sink(roll_rows=0, roll_seconds=0)
+        started = time.perf_counter()
+        sink.write_rows(rows)
+        sink.close()
+        timings.append(time.perf_counter() - started)
+        size = sink.bytes_written
+
+    elapsed = min(timings)
+    return {
+        "rows": len(rows),
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size / elapsed / 1e6, 2),
+        "rows_per_second": round(len(rows) / elapsed)
+    }
+
+
+async def bench_predict(args) -> Dict[str, Any]:
+    from services.model_service import ModelService
+
+    model_service = ModelService()
+    rng = np.random.default_rng(1)
+    inputs = rng.random((args.requests, 9)).tolist()
+    await model_service.predict(inputs[0])  # aquecimento
+
+    samples = []
+    started = time.perf_counter()
+    for features in inputs:
+        began = time.perf_counter()
+        await model_service.predict(features)
+        samples.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - started
+
+    return {"calls": len(inputs), "calls_per_second": round(len(inputs) / elapsed, 1), **_percentiles(samples)}
+
+
+def _payloads(scenario: str, count: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    from services.schema import MEASUREMENT_COLUMNS
+
+    if scenario == "repeated":
+        pool = _payloads("distinct", 32, rng)
+        return [pool[i % len(pool)] for i in range(count)]
+
+    values = rng.random((count, len(MEASUREMENT_COLUMNS))) * 100
+    payloads = [dict(zip(MEASUREMENT_COLUMNS, row.tolist())) for row in values]
+    if scenario == "imputed":
+        for i, payload in enumerate(payloads):
+            for name in MEASUREMENT_COLUMNS[:3]:
+                del payload[name]
+            payload.update({"station": f"Estação {i % 120}", "aqi": ("Good", "Moderate", "Unhealthy")[i % 3]})
+    return payloads
+
+
+async def _load(client, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    queue = iter(payloads)
+    samples, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for payload in queue:
+            began = time.perf_counter()
+            response = await client.post("/api/predict", json=payload)
+            samples.append(time.perf_counter() - began)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        **_percentiles(samples)
+    }
+
+
+async def bench_api(args) -> Dict[str, List[Dict[str, Any]]]:
+    import httpx
+    from main import app
+
+    rng = np.random.default_rng(2)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/predict", json=_payloads("distinct", 1, rng)[0])  # aquecimento
+        for scenario in SCENARIOS:
+            results[scenario] = [
+                await _load(client, _payloads(scenario, args.requests, rng), concurrency)
+                for concurrency in args.concurrency
+            ]
+    return results
+
+
+async def run_model_steps(args, steps: List[str]) -> Dict[str, Any]:
+    from services.model_service import ModelService
+
+    results = {}
+    if not await ModelService().load_model(force=True):
+        raise SystemExit("❌ Modelo de teste não pôde ser carregado")
+    if "predict" in steps:
+        results["predict"] = await bench_predict(args)
+    if "api" in steps:
+        results["api"] = await bench_api(args)
+    await ModelService().stop_watcher()
+    return results
+
+
+def flatten_metrics(results: Dict[str, Any]) -> Dict[str, float]:
+    """Métricas comparáveis em um dicionário plano (ex.: api.distinct.c8.p99_ms)."""
+    flat = {}
+    for step, value in results.items():
+        if step == "api":
+            for scenario, levels in value.items():
+                for level in levels:
+                    for metric in METRIC_DIRECTIONS:
+                        if metric in level:
+                            flat[f"api.{scenario}.c{level['concurrency']}.{metric}"] = level[metric]
+        else:
+            for metric in METRIC_DIRECTIONS:
+                if metric in value:
+                    flat[f"{step}.{metric}"] = value[metric]
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Imprime a variação de cada métrica e retorna as que pioraram além do limite (%)."""
+    old, new = flatten_metrics(baseline["results"]), flatten_metrics(current["results"])
+    regressions = []
+    print(f"\ncomparação com {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        higher_is_better = METRIC_DIRECTIONS[name.rsplit(".", 1)[1]]
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  ⚠️ regressão"
+            regressions.append(name)
+        print(f"  {name:<42} {old[name]:>12} -> {new[name]:>12} ({change:+.1f}%){flag}")
+    return regressions
+
+
+def _print_results(results: Dict[str, Any]):
+    if "crawl" in results:
+        r = results["crawl"]
+        print(f"crawl:   {r['stations']} estações em {r['seconds']}s ({r['stations_per_second']} estações/s, latência {r['latency_s']}s)")
+    if "upload" in results:
+        r = results["upload"]
+        print(f"upload:  {r['rows']} linhas, {r['bytes'] / 1e6:.1f} MB em {r['seconds']}s ({r['mb_per_second']} MB/s, {r['rows_per_second']} linhas/s)")
+    if "predict" in results:
+        r = results["predict"]
+        print(f"predict: {r['calls_per_second']} chamadas/s p50={r['p50_ms']}ms p99={r['p99_ms']}ms")
+    for scenario, levels in results.get("api", {}).items():
+        for r in levels:
+            print(
+                f"api[{scenario:<8}] c={r['concurrency']:<3} {r['requests_per_second']:>8} req/s "
+                f"p50={r['p50_ms']}ms p99={r['p99_ms']}ms erros={r['errors']}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(STEPS), help=f"Etapas a executar ({', '.join(STEPS)})")
+    parser.add_argument("--stations", type=int, default=300, help="Estações no mapa de fixtures")
+    parser.add_argument("--latency", type=float, default=0.01, help="Latência simulada por resposta do aqicn (s)")
+    parser.add_argument("--crawl-concurrency", type=int, default=20, help="Downloads simultâneos no crawl")
+    parser.add_argument("--upload-rows", type=int, default=200_000, help="Linhas gravadas no upload")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições do upload (melhor tempo)")
+    parser.add_argument("--trees", type=int, default=50, help="Árvores do modelo de teste")
+    parser.add_argument("--requests", type=int, default=1000, help="Requisições por nível de concorrência")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="Níveis de concorrência do teste de carga (lista)")
+    parser.add_argument("--s3-endpoint", default=os.getenv("S3_ENDPOINT_URL"), help="Endpoint S3 local (ex.: MinIO); padrão: moto")
+    parser.add_argument("--bucket", default="bench", help="Bucket usado no S3 de teste")
+    parser.add_argument("--output", help="Arquivo JSON (padrão: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Resultado anterior (JSON) para comparar")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Piora (%%) considerada regressão")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com erro se houver regressão")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    steps = [step.strip() for step in args.only.split(",") if step.strip()]
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        parser.error(f"etapas desconhecidas: {', '.join(sorted(unknown))}")
+
+    # Estado local (índice de estações, cache do modelo) isolado da aplicação
+    workdir = tempfile.mkdtemp(prefix="airquality-bench-")
+    os.environ.update({
+        "STATION_INDEX_PATH": os.path.join(workdir, "station_index.json"),
+        "STATION_STATE_PATH": os.path.join(workdir, "station_state.json"),
+        "MODEL_CACHE_DIR": os.path.join(workdir, "models"),
+        "MODEL_WATCH_INTERVAL": "0",
+        "FEATURE_STORE_KEY": FEATURE_STORE_KEY
+    })
+    os.environ.pop("FEATURE_STORE_PATH", None)
+
+    results: Dict[str, Any] = {}
+    if "crawl" in steps:
+        results["crawl"] = asyncio.run(bench_crawl(args))
+
+    if {"upload", "predict", "api"} & set(steps):
+        with s3_stand_in(args) as client:
+            if "upload" in steps:
+                results["upload"] = bench_upload(args)
+            if {"predict", "api"} & set(steps):
+                publish_model_fixture(client, args.bucket, args.trees)
+                results.update(asyncio.run(run_model_steps(args, steps)))
+
+    report = {
+        "suite": "airquality",
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count()
+        },
+        "s3": args.s3_endpoint or "moto",
+        "args": vars(args),
+        "results": results
+    }
+
+    print(f"commit={report['commit']} núcleos={os.cpu_count()} s3={report['s3']}")
+    _print_results(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Resultados salvos em {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"❌ {len(regressions)} métrica(s) com regressão acima de {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
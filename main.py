@@ -1,19 +1,66 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from api.routes import air_quality_router
+from services.aws_service import AWSService
+from services.collection_jobs import CollectionJobManager
+from services.collection_scheduler import CollectionScheduler
+from services.executor import run_blocking, shutdown_blocking_executor
+from services.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from services.model_service import ModelService
+from services.response_cache import PageCache
 from pathlib import Path
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicialização e encerramento da aplicação.
+
+    As páginas HTML são renderizadas uma única vez e comprimidas. A
+    configuração inicial do AWS (leitura do .env + head_bucket) e a carga
+    do modelo são feitas no startup, no thread pool bloqueante, para que a
+    primeira requisição não pague o download do modelo; multipart uploads
+    abandonados por coletas interrompidas são abortados. O watcher de novas
+    versões do modelo e o agendador de coletas rodam em background até o
+    encerramento; no shutdown, a coleta em andamento é cancelada e o Parquet
+    parcial é finalizado no S3 antes de o thread pool ser encerrado.
+    """
+    model_service = ModelService()
+    scheduler = CollectionScheduler()
+
+    pages.prerender(*PAGES)
+    aws_service = await run_blocking(AWSService)
+    try:
+        await run_blocking(aws_service.abort_stale_uploads)
+    except Exception as e:
+        print(f"⚠️ Erro ao abortar multipart uploads abandonados: {str(e)}")
+    await model_service.load_model()
+    model_service.start_watcher()
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    await CollectionJobManager().shutdown()
+    await model_service.stop_watcher()
+    shutdown_blocking_executor(wait=False)
+
+
 app = FastAPI(
     title="Air Quality Predictor",
     description="Sistema Inteligente de Predição de Qualidade do Ar usando Machine Learning",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
+# Latência por rota (histogramas expostos em /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Configurar diretórios
 BASE_DIR = Path(__file__).resolve().parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+# Páginas pré-renderizadas (ETag, Last-Modified, gzip/brotli e 304)
+PAGES = ["index.html", "aws_form.html", "predict.html", "collect.html"]
+pages = PageCache(str(BASE_DIR / "templates"))
 
 # Montar arquivos estáticos (se houver CSS, JS, imagens)
 try:
@@ -30,7 +77,7 @@ async def index(request: Request):
     """
     Página inicial - Dashboard principal com navegação
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    return pages.response(request, "index.html")
 
 
 @app.get("/config", response_class=HTMLResponse, include_in_schema=False)
@@ -38,7 +85,7 @@ async def config_page(request: Request):
     """
     Página de configuração de credenciais AWS
     """
-    return templates.TemplateResponse("aws_form.html", {"request": request})
+    return pages.response(request, "aws_form.html")
 
 
 @app.get("/predict", response_class=HTMLResponse, include_in_schema=False)
@@ -46,7 +93,7 @@ async def predict_page(request: Request):
     """
     Página de predição de qualidade do ar
     """
-    return templates.TemplateResponse("predict.html", {"request": request})
+    return pages.response(request, "predict.html")
 
 
 @app.get("/collect", response_class=HTMLResponse, include_in_schema=False)
@@ -54,7 +101,15 @@ async def collect_page(request: Request):
     """
     Página de coleta de dados de estações
     """
-    return templates.TemplateResponse("collect.html", {"request": request})
+    return pages.response(request, "collect.html")
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Métricas no formato texto do Prometheus
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
-import io
 import os
-import pandas as pd
 import boto3
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from services.executor import run_blocking
+from services.metrics import instrument_s3_client
+from services.parquet_sink import ParquetStreamSink, MIN_PART_SIZE
 
 
 class AWSService:
@@ -37,6 +39,7 @@ class AWSService:
         region = os.getenv("AWS_REGION", "us-east-1")
         bucket = os.getenv("S3_BUCKET")
         prefix = os.getenv("S3_PREFIX", "raw")
+        endpoint_url = os.getenv("S3_ENDPOINT_URL")
         
         if access_key and secret_key and bucket:
             try:
@@ -46,7 +49,8 @@ class AWSService:
                     session_token=session_token,
                     region=region,
                     bucket=bucket,
-                    prefix=prefix
+                    prefix=prefix,
+                    endpoint_url=endpoint_url
                 )
             except Exception as e:
                 print(f"⚠️ Erro ao carregar credenciais do .env: {str(e)}")
@@ -58,7 +62,8 @@ class AWSService:
         session_token: Optional[str] = None,
         region: str = "us-east-1",
         bucket: str = None,
-        prefix: str = "raw"
+        prefix: str = "raw",
+        endpoint_url: Optional[str] = None
     ):
         """
         Configura as credenciais AWS.
@@ -70,17 +75,19 @@ class AWSService:
             region: Região AWS
             bucket: Nome do bucket S3
             prefix: Prefixo para os arquivos
+            endpoint_url: Endpoint S3 compatível (ex.: MinIO local); None usa a AWS
         """
         if not bucket:
             raise ValueError("Bucket S3 é obrigatório")
         
-        self.s3_client = boto3.client(
+        self.s3_client = instrument_s3_client(boto3.client(
             "s3",
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
             aws_session_token=session_token,
-            region_name=region
-        )
+            region_name=region,
+            endpoint_url=endpoint_url or None
+        ))
         
         self.bucket = bucket
         self.prefix = prefix
@@ -93,10 +100,89 @@ class AWSService:
         except Exception as e:
             raise ValueError(f"Erro ao validar bucket S3: {str(e)}")
     
+    async def configure_async(self, **kwargs):
+        """Versão awaitable de `configure`, executada no thread pool bloqueante."""
+        return await run_blocking(self.configure, **kwargs)
+
     def is_configured(self) -> bool:
         """Verifica se o serviço está configurado"""
         return self._configured and self.s3_client is not None
     
+    def open_parquet_sink(
+        self,
+        roll_rows: Optional[int] = None,
+        roll_seconds: Optional[float] = None
+    ) -> ParquetStreamSink:
+        """
+        Abre um sink de Parquet incremental para uma nova coleta.
+
+        Args:
+            roll_rows: Linhas por arquivo antes de iniciar um novo
+                (padrão: S3_SINK_ROLL_ROWS; 0 = sem limite)
+            roll_seconds: Intervalo máximo entre arquivos finalizados
+                (padrão: S3_SINK_ROLL_SECONDS; 0 = sem limite)
+
+        Returns:
+            Sink que grava record batches via multipart upload
+        """
+        if not self.is_configured():
+            raise ValueError("Serviço AWS não está configurado. Configure as credenciais primeiro.")
+
+        # Criar chave S3 com particionamento por data
+        now = datetime.utcnow()
+        date_str = now.strftime("%Y-%m-%d")
+        time_str = now.strftime("%H-%M-%S")
+
+        if roll_rows is None:
+            roll_rows = int(os.getenv("S3_SINK_ROLL_ROWS", "500"))
+        if roll_seconds is None:
+            roll_seconds = float(os.getenv("S3_SINK_ROLL_SECONDS", "60"))
+
+        return ParquetStreamSink(
+            self.s3_client,
+            self.bucket,
+            key_prefix=f"{self.prefix}/date={date_str}/aqi-data-{time_str}",
+            compression="snappy",
+            part_size=int(os.getenv("S3_SINK_PART_SIZE", str(MIN_PART_SIZE))),
+            roll_rows=roll_rows,
+            roll_seconds=roll_seconds
+        )
+
+    def abort_stale_uploads(self, max_age_hours: Optional[float] = None) -> int:
+        """
+        Aborta multipart uploads do prefixo deixados por coletas interrompidas.
+
+        Um processo encerrado no meio de um arquivo deixa o upload aberto, e
+        as partes já enviadas continuam cobradas sem aparecer na listagem.
+        Uploads mais recentes que o limite podem pertencer a uma coleta em
+        andamento em outro worker e são mantidos.
+
+        Args:
+            max_age_hours: Idade mínima do upload (padrão: S3_STALE_UPLOAD_HOURS)
+
+        Returns:
+            Número de uploads abortados
+        """
+        if not self.is_configured():
+            return 0
+
+        if max_age_hours is None:
+            max_age_hours = float(os.getenv("S3_STALE_UPLOAD_HOURS", "24"))
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+
+        aborted = 0
+        paginator = self.s3_client.get_paginator("list_multipart_uploads")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}/"):
+            for upload in page.get("Uploads", []):
+                if upload["Initiated"] >= cutoff:
+                    continue
+                self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=upload["Key"], UploadId=upload["UploadId"])
+                aborted += 1
+
+        if aborted:
+            print(f"✅ {aborted} multipart upload(s) abandonado(s) abortado(s) em s3://{self.bucket}/{self.prefix}/")
+        return aborted
+
     def save_to_s3(self, data: List[Dict[str, Any]]) -> str:
         """
         Salva dados como arquivo Parquet no S3.
@@ -112,58 +198,120 @@ class AWSService:
         
         if not data:
             raise ValueError("Nenhum dado recebido para salvar")
-        
-        # Converter para DataFrame
-        df = pd.DataFrame(data)
-        
-        if df.empty:
-            raise ValueError("DataFrame está vazio")
-        
-        # Garantir coluna de data
-        now = datetime.utcnow()
-        if 'date' not in df.columns:
-            df['date'] = now
-        
-        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Criar chave S3 com particionamento por data
-        date_str = now.strftime("%Y-%m-%d")
-        time_str = now.strftime("%H-%M-%S")
-        s3_key = f"{self.prefix}/date={date_str}/aqi-data-{time_str}.snappy.parquet"
-        
-        # Escrever Parquet em memória
-        buffer = io.BytesIO()
-        df.to_parquet(
-            buffer,
-            index=False,
-            engine="pyarrow",
-            compression="snappy"
-        )
-        buffer.seek(0)
-        
-        # Upload para S3
-        self.s3_client.upload_fileobj(buffer, self.bucket, s3_key)
-        print(f"✅ Arquivo salvo em s3://{self.bucket}/{s3_key}")
-        
-        return s3_key
+
+        sink = self.open_parquet_sink(roll_rows=0)
+        try:
+            sink.write_rows(data)
+        except Exception:
+            sink.abort()
+            raise
+
+        return sink.close()[0]
     
-    def list_files(self, max_keys: int = 100) -> List[str]:
+    async def save_to_s3_async(self, data: List[Dict[str, Any]]) -> str:
+        """Versão awaitable de `save_to_s3`, executada no thread pool bloqueante."""
+        return await run_blocking(self.save_to_s3, data)
+
+    def _partition_root(self) -> str:
+        return f"{self.prefix}/date="
+
+    def list_partitions(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
         """
-        Lista os arquivos no bucket S3.
-        
+        Lista as partições `date=YYYY-MM-DD` do prefixo, em ordem.
+
+        Usa Delimiter para receber apenas os prefixos das partições (até 1000
+        por requisição) e StartAfter para não percorrer as datas anteriores
+        ao intervalo.
+
         Args:
-            max_keys: Número máximo de chaves a retornar
-            
+            start_date: Primeira data (inclusive, YYYY-MM-DD)
+            end_date: Última data (inclusive, YYYY-MM-DD)
+
         Returns:
-            Lista de chaves S3
+            Datas das partições
         """
         if not self.is_configured():
             raise ValueError("Serviço AWS não está configurado")
-        
-        response = self.s3_client.list_objects_v2(
-            Bucket=self.bucket,
-            Prefix=self.prefix,
-            MaxKeys=max_keys
-        )
-        
-        return [obj['Key'] for obj in response.get('Contents', [])]
\ No newline at end of file
+
+        root = self._partition_root()
+        params = {"Bucket": self.bucket, "Prefix": root, "Delimiter": "/"}
+        if start_date:
+            params["StartAfter"] = f"{root}{start_date}"
+
+        dates = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(**params):
+            for common_prefix in page.get("CommonPrefixes", []):
+                date = common_prefix["Prefix"][len(root):].rstrip("/")
+                if end_date and date > end_date:
+                    return dates
+                dates.append(date)
+        return dates
+
+    def list_partition_objects(self, date: str) -> List[Dict[str, Any]]:
+        """
+        Lista todos os objetos de uma partição (paginado).
+
+        Args:
+            date: Data da partição (YYYY-MM-DD)
+
+        Returns:
+            Objetos com key, size, etag e last_modified
+        """
+        objects = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self._partition_root()}{date}/"):
+            for obj in page.get("Contents", []):
+                objects.append({
+                    "key": obj["Key"],
+                    "size": obj["Size"],
+                    "etag": obj["ETag"].strip('"'),
+                    "last_modified": obj["LastModified"]
+                })
+        return objects
+
+    def list_objects(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lista os objetos das partições do intervalo, em paralelo por partição.
+
+        O número de listagens simultâneas é definido por S3_LIST_CONCURRENCY.
+
+        Args:
+            start_date: Primeira data (inclusive, YYYY-MM-DD)
+            end_date: Última data (inclusive, YYYY-MM-DD)
+
+        Returns:
+            Objetos agrupados pela data da partição
+        """
+        dates = self.list_partitions(start_date, end_date)
+        if not dates:
+            return {}
+
+        workers = min(len(dates), int(os.getenv("S3_LIST_CONCURRENCY", "16")))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-list") as executor:
+            return dict(zip(dates, executor.map(self.list_partition_objects, dates)))
+
+    def list_files(
+        self,
+        max_keys: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> List[str]:
+        """
+        Lista os arquivos das partições `date=` do bucket S3.
+
+        Args:
+            max_keys: Número máximo de chaves a retornar (None = todas)
+            start_date: Primeira data (inclusive, YYYY-MM-DD)
+            end_date: Última data (inclusive, YYYY-MM-DD)
+
+        Returns:
+            Lista de chaves S3, ordenadas por partição
+        """
+        objects = self.list_objects(start_date, end_date)
+        keys = [obj["key"] for date in sorted(objects) for obj in objects[date]]
+        return keys[:max_keys] if max_keys else keys
+
+    async def list_files_async(self, max_keys: Optional[int] = None, **kwargs) -> List[str]:
+        """Versão awaitable de `list_files`, executada no thread pool bloqueante."""
+        return await run_blocking(self.list_files, max_keys, **kwargs)
@@ -0,0 +1,360 @@
+import os
+import asyncio
+import time
+import uuid
+from collections import deque
+from contextlib import aclosing
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+from services.scraper import AirQualityScraper
+from services.aws_service import AWSService
+from services.executor import run_blocking
+from services.partition_manifest import PartitionManifest
+from services.station_state import StationStateStore
+
+
+class CollectionJob:
+    """Estado e progresso de uma coleta de estações executada em background"""
+
+    MAX_ERRORS = 50
+    MODES = ("full", "incremental")
+
+    def __init__(self, mode: str = "full"):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.status = "pending"
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.total_stations: Optional[int] = None
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.last_station: Optional[str] = None
+        self.errors = deque(maxlen=self.MAX_ERRORS)
+        self.result: Dict[str, Any] = {}
+        self.version = 0
+        self._started_clock: Optional[float] = None
+        self._finished_clock: Optional[float] = None
+        self._updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        """Indica se a coleta já terminou (com ou sem sucesso)."""
+        return self.status in ("success", "partial_success", "failed")
+
+    def _notify(self):
+        """Sinaliza uma atualização para quem acompanha o job."""
+        self.version += 1
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    async def wait_for_update(self, version: int, timeout: float) -> bool:
+        """
+        Aguarda até que o job passe da versão informada.
+
+        Args:
+            version: Última versão vista pelo cliente
+            timeout: Tempo máximo de espera em segundos
+
+        Returns:
+            True se houve atualização, False em caso de timeout
+        """
+        if self.version > version:
+            return True
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def start(self):
+        self.status = "running"
+        self.started_at = datetime.utcnow()
+        self._started_clock = time.monotonic()
+        self._notify()
+
+    def set_total(self, total: int):
+        self.total_stations = total
+        self._notify()
+
+    def record_station(self, station_name: str, error: Optional[str] = None):
+        self.processed += 1
+        self.last_station = station_name
+        if error:
+            self.failed += 1
+            self.errors.append({"station": station_name, "error": error})
+        else:
+            self.succeeded += 1
+        self._notify()
+
+    def set_stage(self, status: str):
+        self.status = status
+        self._notify()
+
+    def finish(self, status: str, **result):
+        self.status = status
+        self.result = result
+        self.finished_at = datetime.utcnow()
+        self._finished_clock = time.monotonic()
+        self._notify()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa o estado do job para a API."""
+        elapsed = 0.0
+        if self._started_clock is not None:
+            elapsed = (self._finished_clock or time.monotonic()) - self._started_clock
+
+        progress = None
+        if self.total_stations:
+            progress = round(100 * self.processed / self.total_stations, 1)
+
+        return {
+            "job_id": self.id,
+            "mode": self.mode,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": round(elapsed, 2),
+            "total_stations": self.total_stations,
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "progress": progress,
+            "stations_per_second": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "last_station": self.last_station,
+            "errors": list(self.errors),
+            "result": self.result
+        }
+
+
+class CollectionJobManager:
+    """Gerencia jobs de coleta: apenas uma coleta executa por vez"""
+
+    _instance = None
+    MAX_HISTORY = 20
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self._jobs: Dict[str, CollectionJob] = {}
+            self._current: Optional[CollectionJob] = None
+            self._task: Optional[asyncio.Task] = None
+            self.initialized = True
+
+    def submit(self, mode: str = "full") -> Tuple[CollectionJob, bool]:
+        """
+        Inicia uma nova coleta em background ou retorna a que está em execução.
+
+        Args:
+            mode: "full" (todas as estações) ou "incremental" (apenas estações
+                vencidas, gravando só as leituras alteradas)
+
+        Returns:
+            Tupla (job, criado) — criado é False quando a submissão foi anexada ao job atual
+        """
+        if self._current is not None and not self._current.done:
+            return self._current, False
+
+        job = CollectionJob(mode)
+        self._jobs[job.id] = job
+        self._current = job
+        self._trim_history()
+        self._task = asyncio.create_task(self._run(job))
+        return job, True
+
+    def get(self, job_id: str) -> Optional[CollectionJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[CollectionJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    @property
+    def current(self) -> Optional[CollectionJob]:
+        return self._current
+
+    async def shutdown(self, timeout: Optional[float] = None):
+        """
+        Cancela a coleta em andamento e aguarda a gravação dos dados parciais.
+
+        Args:
+            timeout: Espera máxima em segundos (padrão: COLLECT_SHUTDOWN_TIMEOUT)
+        """
+        if self._task is None or self._task.done():
+            return
+
+        timeout = timeout if timeout is not None else float(os.getenv("COLLECT_SHUTDOWN_TIMEOUT", "30"))
+        self._task.cancel()
+        done, _ = await asyncio.wait({self._task}, timeout=timeout)
+        if not done:
+            print(f"⚠️ Coleta {self._current.id} não finalizou em {timeout:.0f}s")
+
+    def _trim_history(self):
+        """Descarta os jobs finalizados mais antigos."""
+        finished = [job for job in self.list_jobs() if job.done]
+        for job in finished[self.MAX_HISTORY:]:
+            del self._jobs[job.id]
+
+    async def _run(self, job: CollectionJob):
+        """
+        Executa um job garantindo que ele termine em um estado final.
+
+        Qualquer falha fora do crawl (abertura do sink, gravação final,
+        invalidação do manifest, um segundo cancelamento) marca o job como
+        `failed`; sem isso ele ficaria "running" e `submit` anexaria todas as
+        coletas seguintes a um job que nunca termina.
+        """
+        job.start()
+        try:
+            await self._collect(job)
+        except BaseException as e:
+            print(f"⚠️ Erro na coleta {job.id}: {str(e) or type(e).__name__}")
+            if not job.done:
+                job.finish("failed", message=f"Erro ao coletar dados: {str(e) or type(e).__name__}")
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if not job.done:
+                job.finish("failed", message="Coleta encerrada sem resultado")
+
+    async def _collect(self, job: CollectionJob):
+        """
+        Executa o scraping de um job gravando os registros no S3 durante o crawl.
+
+        Os registros são enviados ao sink de Parquet em lotes de
+        S3_SINK_BATCH_ROWS (ou a cada S3_SINK_ROLL_SECONDS), e o sink finaliza
+        os arquivos ao longo do crawl; se o crawl falhar no meio, o que já foi
+        coletado é finalizado e mantido no S3. Um cancelamento é propagado
+        depois que o job é finalizado.
+        """
+        aws_service = AWSService()
+        sink = None
+        s3_error = None
+        if aws_service.is_configured():
+            sink = aws_service.open_parquet_sink()
+        else:
+            s3_error = "Serviço AWS não está configurado. Configure as credenciais primeiro."
+
+        batch_rows = int(os.getenv("S3_SINK_BATCH_ROWS", "500"))
+        flush_seconds = float(os.getenv("S3_SINK_ROLL_SECONDS", "60"))
+        batch: List[Dict[str, Any]] = []
+        total = 0
+        flushed_at = time.monotonic()
+
+        async def flush():
+            nonlocal sink, s3_error, flushed_at
+            rows = batch[:]
+            batch.clear()
+            flushed_at = time.monotonic()
+            if sink is None or not rows:
+                return
+            try:
+                await run_blocking(sink.write_rows, rows)
+            except Exception as e:
+                # Falha no upload: o crawl continua, mas nada mais é gravado
+                s3_error = str(e)
+                failed_sink, sink = sink, None
+                try:
+                    await run_blocking(failed_sink.abort)
+                except Exception as abort_error:
+                    print(f"⚠️ Erro ao abortar upload da coleta {job.id}: {str(abort_error)}")
+
+        crawl_error = None
+        cancelled = False
+        scraper = AirQualityScraper()
+        try:
+            # aclosing: se o job for cancelado durante um flush, o gerador é
+            # fechado na hora e interrompe os downloads em andamento
+            async with aclosing(scraper.iter_stations(
+                on_links=job.set_total,
+                on_station=job.record_station,
+                incremental=job.mode == "incremental"
+            )) as records:
+                async for record in records:
+                    batch.append(record)
+                    total += 1
+                    if len(batch) >= batch_rows or (flush_seconds and time.monotonic() - flushed_at >= flush_seconds):
+                        await flush()
+        except Exception as e:
+            print(f"⚠️ Erro na coleta {job.id}: {str(e)}")
+            crawl_error = e
+        except asyncio.CancelledError:
+            # Desligamento da aplicação: interrompe o crawl, mas finaliza o que já foi coletado
+            print(f"⚠️ Coleta {job.id} cancelada, gravando dados parciais")
+            crawl_error = RuntimeError("coleta cancelada no desligamento da aplicação")
+            cancelled = True
+
+        # Finalizar os arquivos no S3, inclusive em coletas interrompidas
+        job.set_stage("uploading")
+        s3_keys: List[str] = []
+        await flush()
+        if sink is not None:
+            try:
+                s3_keys = await run_blocking(sink.close)
+            except Exception as e:
+                s3_error = str(e)
+
+        # As impressões digitais do modo incremental só são confirmadas com os
+        # registros no S3; sem isso a próxima coleta pularia leituras perdidas
+        if job.mode == "incremental":
+            state = StationStateStore()
+            if sink is not None and not s3_error:
+                state.commit()
+                await run_blocking(state.save, state.snapshot())
+            else:
+                state.discard()
+
+        if s3_keys:
+            try:
+                PartitionManifest().invalidate()
+            except Exception as e:
+                # Os dados já estão no S3: o manifest só expira pelo TTL
+                print(f"⚠️ Erro ao invalidar o manifest das partições: {str(e)}")
+
+        crawl_stats = scraper.crawl_stats
+        if total == 0 and job.mode == "incremental" and not crawl_error and crawl_stats.get("listed"):
+            job.finish(
+                "success",
+                message="Nenhuma leitura nova desde a última coleta",
+                total_stations=0,
+                crawl=crawl_stats
+            )
+        elif total == 0:
+            message = f"Erro ao coletar dados: {str(crawl_error)}" if crawl_error else "Nenhuma estação encontrada"
+            job.finish("failed", message=message, total_stations=0, crawl=crawl_stats)
+        elif s3_error:
+            job.finish(
+                "partial_success",
+                message="Dados coletados mas não salvos no S3",
+                total_stations=total,
+                s3_error=s3_error,
+                s3_keys=s3_keys,
+                crawl=crawl_stats
+            )
+        elif crawl_error:
+            job.finish(
+                "partial_success",
+                message=f"Coleta interrompida, dados parciais salvos: {str(crawl_error)}",
+                total_stations=total,
+                s3_key=s3_keys[0] if s3_keys else None,
+                s3_keys=s3_keys,
+                crawl=crawl_stats
+            )
+        else:
+            job.finish(
+                "success",
+                message="Dados coletados e salvos com sucesso",
+                total_stations=total,
+                s3_key=s3_keys[0] if s3_keys else None,
+                s3_keys=s3_keys,
+                crawl=crawl_stats
+            )
+
+        # O job já está finalizado; quem cancelou (shutdown) precisa ver o cancelamento
+        if cancelled:
+            raise asyncio.CancelledError()
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import random
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Optional
+from services.aws_service import AWSService
+from services.collection_jobs import CollectionJob, CollectionJobManager
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class CollectionScheduler:
+    """
+    Agendador de coletas periódicas executado dentro da aplicação.
+
+    As coletas são disparadas a cada COLLECT_INTERVAL segundos (0 desativa)
+    pelo CollectionJobManager, então nunca há duas coletas simultâneas: se uma
+    coleta manual estiver em andamento no horário agendado, o agendador apenas
+    aguarda o término dela. Cada disparo recebe um atraso aleatório de até
+    COLLECT_JITTER segundos.
+
+    Política de atraso (COLLECT_CATCH_UP), aplicada quando um ou mais horários
+    foram perdidos (coleta mais longa que o intervalo ou aplicação desligada):
+
+    - skip: descarta os horários perdidos e segue para o próximo horário da grade;
+    - once: executa uma única coleta imediatamente e recomeça a grade a partir dela.
+
+    O horário da última coleta é persistido em COLLECT_STATE_PATH para que a
+    política também valha após um restart.
+    """
+
+    _instance = None
+    CATCH_UP_POLICIES = ("skip", "once")
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CollectionScheduler, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.interval = float(os.getenv("COLLECT_INTERVAL", "0"))
+            self.jitter = float(os.getenv("COLLECT_JITTER", "30"))
+            self.mode = os.getenv("COLLECT_MODE", "incremental")
+            self.catch_up = os.getenv("COLLECT_CATCH_UP", "skip")
+            self.state_path = Path(os.getenv("COLLECT_STATE_PATH", ".cache/collection_scheduler.json"))
+            if self.mode not in CollectionJob.MODES:
+                raise ValueError(f"COLLECT_MODE inválido: {self.mode}")
+            if self.catch_up not in self.CATCH_UP_POLICIES:
+                raise ValueError(f"COLLECT_CATCH_UP inválido: {self.catch_up}")
+
+            self.runs = 0
+            self.attached = 0
+            self.missed = 0
+            self.skipped_unconfigured = 0
+            self.next_run_at: Optional[float] = None
+            self.last_scheduled_at: Optional[float] = self._load_last_run()
+            self.last_job: Optional[CollectionJob] = None
+            self._task: Optional[asyncio.Task] = None
+            self.initialized = True
+
+    def _load_last_run(self) -> Optional[float]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return float(json.load(f)["last_scheduled_at"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Estado do agendador ignorado: {str(e)}")
+            return None
+
+    def _save_last_run(self):
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump({"last_scheduled_at": self.last_scheduled_at}, f)
+        except OSError as e:
+            print(f"⚠️ Erro ao salvar estado do agendador: {str(e)}")
+
+    def _next_slot(self, now: float) -> float:
+        """
+        Calcula o próximo horário da grade a partir do último horário agendado.
+
+        Args:
+            now: Instante atual (epoch)
+
+        Returns:
+            Horário (epoch) do próximo disparo, antes do jitter
+        """
+        if self.last_scheduled_at is None:
+            return now
+
+        slot = self.last_scheduled_at + self.interval
+        if slot >= now:
+            return slot
+
+        missed = int((now - slot) // self.interval)
+        if self.catch_up == "once":
+            # Uma única coleta de recuperação agora; a grade recomeça a partir dela
+            self.missed += missed
+            return now
+
+        self.missed += missed + 1
+        return slot + (missed + 1) * self.interval
+
+    async def _wait_for(self, job: CollectionJob):
+        """Aguarda o término de um job de coleta."""
+        version = job.version
+        while not job.done:
+            await job.wait_for_update(version, timeout=30)
+            version = job.version
+
+    async def _loop(self):
+        while True:
+            slot = self._next_slot(time.time())
+            self.next_run_at = slot + random.uniform(0, self.jitter)
+            await asyncio.sleep(max(0.0, self.next_run_at - time.time()))
+            self.next_run_at = None
+
+            self.last_scheduled_at = slot
+            await asyncio.to_thread(self._save_last_run)
+
+            if not AWSService().is_configured():
+                self.skipped_unconfigured += 1
+                print("⚠️ Coleta agendada ignorada: AWS não configurado")
+                continue
+
+            job, created = CollectionJobManager().submit(self.mode)
+            if created:
+                self.runs += 1
+            else:
+                # Coleta manual em andamento: não inicia outra, apenas aguarda
+                self.attached += 1
+            self.last_job = job
+            print(f"✅ Coleta agendada {'iniciada' if created else 'anexada'}: {job.id}")
+
+            try:
+                await self._wait_for(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Erro ao acompanhar coleta agendada: {str(e)}")
+
+    def start(self):
+        """Inicia o agendador (COLLECT_INTERVAL=0 desativa)."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Para o agendador (a coleta em andamento é encerrada pelo CollectionJobManager)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.next_run_at = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Configuração e estatísticas do agendador."""
+        return {
+            "enabled": self.interval > 0,
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "jitter_seconds": self.jitter,
+            "mode": self.mode,
+            "catch_up": self.catch_up,
+            "next_run_at": _isoformat(self.next_run_at),
+            "last_scheduled_at": _isoformat(self.last_scheduled_at),
+            "runs": self.runs,
+            "attached_to_running": self.attached,
+            "missed_slots": self.missed,
+            "skipped_unconfigured": self.skipped_unconfigured,
+            "last_job": self.last_job.to_dict() if self.last_job else None
+        }
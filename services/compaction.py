@@ -0,0 +1,420 @@
+"""
+Compactação dos arquivos pequenos das partições `date=` dos dados coletados.
+
+Cada coleta grava um ou mais arquivos `aqi-data-HH-MM-SS*.snappy.parquet`;
+com coletas frequentes, uma partição acumula dezenas ou centenas de arquivos
+pequenos. A compactação lê os arquivos pequenos de cada dia, ordena as linhas
+por estação e data e regrava tudo em poucos arquivos com row groups de
+tamanho controlado (zstd ou snappy).
+
+A troca segue um protocolo de commit para que uma falha no meio não perca nem
+duplique dados:
+
+1. os arquivos novos são gravados com prefixo `_` (ignorados por Spark, pandas
+   e pyarrow.dataset) e o total de linhas é conferido;
+2. um marcador `_compaction-<id>.json` registra entradas e saídas;
+3. os arquivos novos são promovidos ao nome final e os originais são
+   removidos em uma única chamada de remoção em lote;
+4. o marcador é removido.
+
+Se o processo cair entre 2 e 4, a próxima execução encontra o marcador e
+conclui (ou desfaz) a troca antes de compactar.
+
+Uso (S3 / MinIO com as variáveis do .env; S3_ENDPOINT_URL para o MinIO):
+    python -m services.compaction --start-date 2025-10-01 --end-date 2025-10-07 --codec zstd
+
+Uso (diretório local com a mesma estrutura <prefixo>/date=YYYY-MM-DD/):
+    python -m services.compaction --local-dir ./data --prefix raw
+"""
+import io
+import os
+import json
+import uuid
+import argparse
+import threading
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from services.parquet_sink import S3MultipartWriter
+from services.partition_manifest import read_parquet_metadata
+from services.schema import STATION_SCHEMA, conform_table
+
+CODECS = ("zstd", "snappy")
+SORT_KEYS = [("station", "ascending"), ("date", "ascending")]
+
+# Impede duas compactações simultâneas no mesmo processo (ex.: via API)
+compaction_lock = threading.Lock()
+
+
+class S3Storage:
+    """Acesso às partições em um bucket S3 (ou compatível, como o MinIO)"""
+
+    def __init__(self, s3_client, bucket: str):
+        self.s3_client = s3_client
+        self.bucket = bucket
+
+    def list_partitions(self, prefix: str) -> List[str]:
+        root = f"{prefix}/date="
+        dates = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=root, Delimiter="/"):
+            for common_prefix in page.get("CommonPrefixes", []):
+                dates.append(common_prefix["Prefix"][len(root):].rstrip("/"))
+        return dates
+
+    def list(self, prefix: str) -> List[Dict[str, Any]]:
+        objects = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                objects.append({"key": obj["Key"], "size": obj["Size"]})
+        return objects
+
+    def read(self, key: str) -> bytes:
+        return self.s3_client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def open_output(self, key: str):
+        return S3MultipartWriter(self.s3_client, self.bucket, key)
+
+    def num_rows(self, key: str) -> int:
+        size = self.s3_client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        return read_parquet_metadata(self.s3_client, self.bucket, key, size).num_rows
+
+    def put(self, key: str, data: bytes):
+        self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def exists(self, key: str) -> bool:
+        response = self.s3_client.list_objects_v2(Bucket=self.bucket, Prefix=key, MaxKeys=1)
+        return any(obj["Key"] == key for obj in response.get("Contents", []))
+
+    def promote(self, source: str, target: str):
+        """Copia o arquivo temporário para o nome final (o temporário sai na remoção em lote)."""
+        self.s3_client.copy_object(
+            Bucket=self.bucket,
+            Key=target,
+            CopySource={"Bucket": self.bucket, "Key": source}
+        )
+
+    def delete(self, keys: List[str]):
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start:start + 1000]
+            self.s3_client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True}
+            )
+
+    def describe(self) -> str:
+        return f"s3://{self.bucket}"
+
+
+class LocalStorage:
+    """Acesso às partições em um diretório local com a mesma estrutura de chaves"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def list_partitions(self, prefix: str) -> List[str]:
+        directory = self._path(prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[len("date="):] for name in os.listdir(directory)
+            if name.startswith("date=") and os.path.isdir(os.path.join(directory, name))
+        )
+
+    def list(self, prefix: str) -> List[Dict[str, Any]]:
+        directory = self._path(prefix.rstrip("/"))
+        if not os.path.isdir(directory):
+            return []
+        return [
+            {"key": f"{prefix.rstrip('/')}/{name}", "size": os.path.getsize(os.path.join(directory, name))}
+            for name in sorted(os.listdir(directory))
+            if os.path.isfile(os.path.join(directory, name))
+        ]
+
+    def read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def open_output(self, key: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, "wb")
+
+    def num_rows(self, key: str) -> int:
+        return pq.read_metadata(self._path(key)).num_rows
+
+    def put(self, key: str, data: bytes):
+        with self.open_output(key) as f:
+            f.write(data)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def promote(self, source: str, target: str):
+        os.replace(self._path(source), self._path(target))
+
+    def delete(self, keys: List[str]):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def describe(self) -> str:
+        return self.root
+
+
+def _file_name(key: str) -> str:
+    return key.rsplit("/", 1)[-1]
+
+
+def _sort(table: pa.Table) -> pa.Table:
+    """Ordena por estação e data (colunas dictionary são ordenadas pelo valor decodificado)."""
+    keys = pa.table({
+        "station": table.column("station").cast(pa.string()),
+        "date": table.column("date")
+    })
+    return table.take(pc.sort_indices(keys, sort_keys=SORT_KEYS))
+
+
+def recover(storage, partition_prefix: str) -> int:
+    """
+    Conclui ou desfaz compactações interrompidas de uma partição.
+
+    Se todas as saídas foram gravadas (temporárias ou já promovidas), a troca
+    é concluída; caso contrário, as saídas parciais são descartadas e os
+    originais permanecem.
+
+    Returns:
+        Quantidade de compactações recuperadas
+    """
+    markers = [
+        obj["key"] for obj in storage.list(f"{partition_prefix}/")
+        if _file_name(obj["key"]).startswith("_compaction-") and obj["key"].endswith(".json")
+    ]
+    for marker in markers:
+        plan = json.loads(storage.read(marker))
+        complete = all(
+            storage.exists(output["final"]) or storage.exists(output["staging"])
+            for output in plan["outputs"]
+        )
+        if complete:
+            for output in plan["outputs"]:
+                if not storage.exists(output["final"]):
+                    storage.promote(output["staging"], output["final"])
+            storage.delete(plan["inputs"] + [output["staging"] for output in plan["outputs"]])
+            print(f"✅ Compactação {plan['id']} concluída na recuperação")
+        else:
+            storage.delete([output["staging"] for output in plan["outputs"]])
+            print(f"⚠️ Compactação {plan['id']} incompleta descartada; originais mantidos")
+        storage.delete([marker])
+    return len(markers)
+
+
+def compact_partition(
+    storage,
+    prefix: str,
+    date: str,
+    codec: str = "zstd",
+    small_file_bytes: int = 32 * 1024 * 1024,
+    target_file_bytes: int = 128 * 1024 * 1024,
+    row_group_rows: int = 100_000,
+    min_files: int = 2,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Compacta os arquivos pequenos de uma partição `date=`.
+
+    Args:
+        storage: S3Storage ou LocalStorage
+        prefix: Prefixo dos dados (ex.: 'raw')
+        date: Data da partição (YYYY-MM-DD)
+        codec: Compressão dos arquivos gerados (zstd ou snappy)
+        small_file_bytes: Arquivos menores que isso entram na compactação
+        target_file_bytes: Tamanho aproximado de cada arquivo gerado
+        row_group_rows: Linhas por row group
+        min_files: Mínimo de arquivos pequenos para compactar a partição
+        dry_run: Apenas reporta o que seria feito
+
+    Returns:
+        Resumo da partição (arquivos e bytes antes/depois, linhas)
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Compressão inválida: {codec}. Use: {', '.join(CODECS)}")
+
+    partition_prefix = f"{prefix}/date={date}"
+    recovered = 0 if dry_run else recover(storage, partition_prefix)
+
+    files = [
+        obj for obj in storage.list(f"{partition_prefix}/")
+        if obj["key"].endswith(".parquet") and not _file_name(obj["key"]).startswith(("_", "."))
+    ]
+    small = [obj for obj in files if obj["size"] < small_file_bytes]
+    summary = {
+        "date": date,
+        "files_before": len(files),
+        "small_files": len(small),
+        "bytes_in": sum(obj["size"] for obj in small),
+        "recovered": recovered,
+        "compacted": False
+    }
+    if len(small) < min_files:
+        return summary
+    if dry_run:
+        return {**summary, "dry_run": True}
+
+    tables = [conform_table(pq.read_table(io.BytesIO(storage.read(obj["key"])))) for obj in small]
+    table = _sort(pa.concat_tables(tables)).unify_dictionaries().combine_chunks()
+    rows = table.num_rows
+
+    # Linhas por arquivo estimadas pelo tamanho médio comprimido das entradas
+    bytes_per_row = max(summary["bytes_in"] / max(rows, 1), 1.0)
+    rows_per_file = max(row_group_rows, int(target_file_bytes / bytes_per_row))
+
+    run_id = f"{datetime.utcnow().strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    outputs = []
+    try:
+        for index, start in enumerate(range(0, max(rows, 1), rows_per_file)):
+            name = f"compacted-{run_id}-{index:04d}.{codec}.parquet"
+            output = {"staging": f"{partition_prefix}/_{name}", "final": f"{partition_prefix}/{name}"}
+            outputs.append(output)
+            with storage.open_output(output["staging"]) as f:
+                with pq.ParquetWriter(f, STATION_SCHEMA, compression=codec) as writer:
+                    writer.write_table(table.slice(start, rows_per_file), row_group_size=row_group_rows)
+
+        written = sum(storage.num_rows(output["staging"]) for output in outputs)
+        if written != rows:
+            raise RuntimeError(f"Compactação de {date} gravou {written} linhas, esperado {rows}")
+    except Exception:
+        # Nada foi trocado ainda: basta descartar as saídas temporárias
+        storage.delete([output["staging"] for output in outputs])
+        raise
+
+    # Commit: marcador -> promoção -> remoção em lote -> fim do marcador
+    marker = f"{partition_prefix}/_compaction-{run_id}.json"
+    inputs = [obj["key"] for obj in small]
+    storage.put(marker, json.dumps({"id": run_id, "inputs": inputs, "outputs": outputs}).encode("utf-8"))
+    for output in outputs:
+        storage.promote(output["staging"], output["final"])
+    storage.delete(inputs + [output["staging"] for output in outputs])
+    storage.delete([marker])
+
+    bytes_out = sum(obj["size"] for obj in storage.list(f"{partition_prefix}/") if obj["key"] in {o["final"] for o in outputs})
+    print(f"✅ Partição {date}: {len(small)} arquivos -> {len(outputs)} ({rows} linhas)")
+    return {
+        **summary,
+        "compacted": True,
+        "rows": rows,
+        "files_after": len(files) - len(small) + len(outputs),
+        "bytes_out": bytes_out,
+        "outputs": [output["final"] for output in outputs]
+    }
+
+
+def compact(
+    storage,
+    prefix: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    include_today: bool = False,
+    **options
+) -> Dict[str, Any]:
+    """
+    Compacta as partições do intervalo (bloqueante).
+
+    A partição do dia atual (UTC) é ignorada por padrão, pois ainda recebe
+    arquivos das coletas em andamento.
+
+    Args:
+        storage: S3Storage ou LocalStorage
+        prefix: Prefixo dos dados (ex.: 'raw')
+        start_date: Primeira data (inclusive, YYYY-MM-DD)
+        end_date: Última data (inclusive, YYYY-MM-DD)
+        include_today: Também compacta a partição de hoje
+        **options: Repassados para compact_partition
+
+    Returns:
+        Resumo por partição e totais
+    """
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    dates = [
+        date for date in storage.list_partitions(prefix)
+        if (not start_date or date >= start_date)
+        and (not end_date or date <= end_date)
+        and (include_today or date != today)
+    ]
+
+    partitions = [compact_partition(storage, prefix, date, **options) for date in dates]
+    compacted = [p for p in partitions if p["compacted"]]
+    return {
+        "storage": storage.describe(),
+        "prefix": prefix,
+        "partitions_scanned": len(partitions),
+        "partitions_compacted": len(compacted),
+        "files_removed": sum(p["small_files"] for p in compacted),
+        "files_written": sum(len(p["outputs"]) for p in compacted),
+        "bytes_in": sum(p["bytes_in"] for p in compacted),
+        "bytes_out": sum(p["bytes_out"] for p in compacted),
+        "partitions": partitions
+    }
+
+
+def options_from_env() -> Dict[str, Any]:
+    """Parâmetros de compactação definidos no ambiente."""
+    return {
+        "codec": os.getenv("COMPACTION_CODEC", "zstd"),
+        "small_file_bytes": int(os.getenv("COMPACTION_SMALL_FILE_MB", "32")) * 1024 * 1024,
+        "target_file_bytes": int(os.getenv("COMPACTION_TARGET_FILE_MB", "128")) * 1024 * 1024,
+        "row_group_rows": int(os.getenv("COMPACTION_ROW_GROUP_ROWS", "100000")),
+        "min_files": int(os.getenv("COMPACTION_MIN_FILES", "2"))
+    }
+
+
+def main():
+    """CLI: compacta as partições no S3/MinIO (credenciais do .env) ou em um diretório local."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start-date", help="Primeira data (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Última data (YYYY-MM-DD)")
+    parser.add_argument("--codec", choices=CODECS, help="Compressão dos arquivos gerados")
+    parser.add_argument("--local-dir", help="Compacta um diretório local em vez do S3")
+    parser.add_argument("--prefix", help="Prefixo dos dados (padrão: S3_PREFIX ou 'raw')")
+    parser.add_argument("--include-today", action="store_true", help="Inclui a partição de hoje")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas mostra o que seria compactado")
+    args = parser.parse_args()
+
+    options = options_from_env()
+    if args.codec:
+        options["codec"] = args.codec
+
+    if args.local_dir:
+        storage = LocalStorage(args.local_dir)
+        prefix = args.prefix or os.getenv("S3_PREFIX", "raw")
+    else:
+        from services.aws_service import AWSService
+
+        aws_service = AWSService()
+        if not aws_service.is_configured():
+            raise SystemExit("AWS não configurado: defina as variáveis no .env")
+        storage = S3Storage(aws_service.s3_client, aws_service.bucket)
+        prefix = args.prefix or aws_service.prefix
+
+    result = compact(
+        storage,
+        prefix,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        include_today=args.include_today,
+        dry_run=args.dry_run,
+        **options
+    )
+    print(json.dumps({key: value for key, value in result.items() if key != "partitions"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Any, Optional
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier, ExtraTreeClassifier
+
+# Acima de (linhas x árvores) caminhos, o percurso vetorizado em NumPy perde
+# para o `Tree.apply` em Cython (sem a validação do estimador)
+VECTOR_MAX_PATHS = 2048
+
+# Linhas de teste comparadas com o sklearn ao compilar
+VERIFY_ROWS = 2048
+
+
+class CompiledModel(ABC):
+    """
+    Estimador do sklearn convertido em arrays NumPy planos, com o Min-Max
+    Scaling do treinamento embutido.
+
+    `predict` recebe as features brutas e `predict_scaled` as já
+    normalizadas; ambos devolvem exatamente as classes do `predict` do
+    sklearn, seguindo a mesma ordem de operações em ponto flutuante. Entradas
+    com NaN/infinito vão para o estimador original, que aplica as próprias
+    regras (e erros) de validação.
+    """
+
+    kind = "sklearn"
+
+    def __init__(self, model: Any, feature_min: np.ndarray, feature_range: np.ndarray):
+        self.model = model
+        self.classes = np.asarray(model.classes_)
+        self.feature_min = np.asarray(feature_min, dtype=np.float64)
+        self.feature_range = np.asarray(feature_range, dtype=np.float64)
+        self.n_features = len(self.feature_min)
+
+    @classmethod
+    @abstractmethod
+    def supports(cls, model: Any) -> bool:
+        """Indica se o estimador pode ser compilado por esta classe."""
+
+    @abstractmethod
+    def _predict(self, X: np.ndarray) -> Optional[np.ndarray]:
+        """Predição compilada (None quando a entrada exige o caminho do sklearn)."""
+
+    def predict_scaled(self, X: np.ndarray) -> np.ndarray:
+        """
+        Prediz uma matriz de features já normalizadas.
+
+        Args:
+            X: Matriz (n, 9) normalizada
+
+        Returns:
+            Vetor de classes (n,)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            return self.model.predict(X)
+        predictions = self._predict(X)
+        return self.model.predict(X) if predictions is None else predictions
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Normaliza e prediz uma matriz de features brutas.
+
+        Args:
+            X: Matriz (n, 9) na ordem de FEATURE_NAMES
+
+        Returns:
+            Vetor de classes (n,)
+        """
+        return self.predict_scaled((np.asarray(X, dtype=np.float64) - self.feature_min) / self.feature_range)
+
+    def _probe(self) -> np.ndarray:
+        """Linhas normalizadas (inclusive fora de [0, 1]) usadas na verificação."""
+        rng = np.random.default_rng(0)
+        return rng.uniform(-0.25, 1.25, (VERIFY_ROWS, self.n_features))
+
+    def verify(self) -> bool:
+        """Compara as classes do modelo compilado com as do sklearn (linha a linha e em lote)."""
+        X = self._probe()
+        expected = self.model.predict(X)
+        if not np.array_equal(self.predict_scaled(X), expected):
+            return False
+        single = [self.predict_scaled(X[i:i + 1])[0] for i in range(min(64, len(X)))]
+        return np.array_equal(np.asarray(single), expected[:len(single)])
+
+
+class CompiledTrees(CompiledModel):
+    """
+    Árvore ou floresta (RandomForest/ExtraTrees) como arrays de nós concatenados.
+
+    Folhas apontam para si mesmas, então o percurso vetorizado avança todas
+    as (linha, árvore) por `max_depth` níveis sem desvios. Como no sklearn,
+    as features são convertidas para float32 antes da comparação com os
+    limiares (float64), e as probabilidades das folhas são somadas na ordem
+    das árvores e divididas pelo número de árvores.
+    """
+
+    kind = "trees"
+
+    def __init__(self, model: Any, feature_min: np.ndarray, feature_range: np.ndarray):
+        super().__init__(model, feature_min, feature_range)
+        self.forest = isinstance(model, (RandomForestClassifier, ExtraTreesClassifier))
+        self.trees = [estimator.tree_ for estimator in model.estimators_] if self.forest else [model.tree_]
+        n_classes = len(self.classes)
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in self.trees])
+        self.roots = offsets[:-1].astype(np.intp)
+        self.depth = max(tree.max_depth for tree in self.trees)
+
+        feature, threshold, left, right, values = [], [], [], [], []
+        for tree, offset in zip(self.trees, self.roots):
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, np.inf, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            values.append(tree.value[:, 0, :n_classes])
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.values = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+
+    @classmethod
+    def supports(cls, model: Any) -> bool:
+        if type(model) not in (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier, ExtraTreeClassifier):
+            return False
+        return getattr(model, "n_outputs_", None) == 1
+
+    def _traverse(self, X32: np.ndarray) -> np.ndarray:
+        """Folhas (n, árvores) pelo percurso vetorizado de todos os caminhos."""
+        n = len(X32)
+        X_flat = X32.astype(np.float64).ravel()
+        base = np.repeat(np.arange(n, dtype=np.intp) * self.n_features, len(self.roots))
+        nodes = np.tile(self.roots, n)
+        for _ in range(self.depth):
+            go_left = X_flat[base + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes.reshape(n, len(self.roots))
+
+    def _apply_sum(self, X32: np.ndarray) -> np.ndarray:
+        """Soma dos valores das folhas encontradas pelo `Tree.apply` de cada árvore."""
+        proba = np.zeros((len(X32), self.values.shape[1]), dtype=np.float64)
+        leaf_values = np.empty_like(proba)
+        for tree, offset in zip(self.trees, self.roots):
+            np.take(self.values[offset:offset + tree.node_count], tree.apply(X32), axis=0, out=leaf_values)
+            proba += leaf_values
+        return proba
+
+    def _predict(self, X: np.ndarray) -> Optional[np.ndarray]:
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        if not np.isfinite(X32).all():
+            return None
+        # Soma na ordem das árvores, como o acumulador do sklearn
+        if len(X32) * len(self.roots) <= VECTOR_MAX_PATHS:
+            proba = np.add.reduce(self.values[self._traverse(X32).T], axis=0)
+        else:
+            proba = self._apply_sum(X32)
+        if self.forest:
+            proba /= len(self.trees)
+        return self.classes.take(np.argmax(proba, axis=1), axis=0)
+
+    def _probe(self) -> np.ndarray:
+        # Além de linhas aleatórias, linhas com features exatamente nos
+        # limiares e nos float32 vizinhos, onde o arredondamento decide o lado
+        X = super()._probe()
+        internal = np.flatnonzero(np.isfinite(self.threshold))
+        if len(internal):
+            rng = np.random.default_rng(1)
+            picked = rng.choice(internal, size=min(len(X), len(internal)), replace=False)
+            thresholds = self.threshold[picked]
+            candidates = np.stack([
+                thresholds,
+                np.float32(thresholds).astype(np.float64),
+                np.nextafter(np.float32(thresholds), np.float32(np.inf)).astype(np.float64)
+            ], axis=1)
+            rows = np.arange(len(picked))
+            X[rows, self.feature[picked]] = candidates[rows, rows % 3]
+        return X
+
+
+class CompiledLinear(CompiledModel):
+    """
+    Classificador linear (LogisticRegression, LinearSVC, SGDClassifier, ...)
+    como uma multiplicação de matrizes seguida do intercepto.
+
+    Normalização e `X @ coef.T + intercept` rodam em sequência em uma única
+    chamada, com os mesmos arrays e a mesma ordem de operações do
+    `decision_function` do sklearn; os pesos não são pré-multiplicados pela
+    escala porque isso mudaria o arredondamento perto da fronteira de decisão.
+    """
+
+    kind = "linear"
+
+    def __init__(self, model: Any, feature_min: np.ndarray, feature_range: np.ndarray):
+        super().__init__(model, feature_min, feature_range)
+        self.coef_T = model.coef_.T if model.coef_.ndim == 2 else model.coef_
+        self.intercept = model.intercept_
+
+    @classmethod
+    def supports(cls, model: Any) -> bool:
+        coef = getattr(model, "coef_", None)
+        intercept = getattr(model, "intercept_", None)
+        if not (
+            isinstance(coef, np.ndarray)
+            and isinstance(intercept, np.ndarray)
+            and callable(getattr(model, "decision_function", None))
+            and hasattr(model, "classes_")
+        ):
+            return False
+
+        # Modelos com coef_ mas outro predict (ex.: SVC linear, RidgeClassifier)
+        # ficam no sklearn; sem o mixin privado disponível, a verificação na
+        # compilação decide
+        try:
+            from sklearn.linear_model._base import LinearClassifierMixin
+        except ImportError:
+            return True
+        return (
+            type(model).predict is LinearClassifierMixin.predict
+            and type(model).decision_function is LinearClassifierMixin.decision_function
+        )
+
+    def _predict(self, X: np.ndarray) -> Optional[np.ndarray]:
+        if not np.isfinite(X).all():
+            return None
+        scores = X @ self.coef_T + self.intercept
+        if scores.ndim > 1 and scores.shape[1] == 1:
+            scores = scores.reshape(-1)
+        indices = (scores > 0).astype(np.intp) if scores.ndim == 1 else np.argmax(scores, axis=1)
+        return self.classes.take(indices, axis=0)
+
+
+def compile_model(model: Any, feature_min: np.ndarray, feature_range: np.ndarray) -> Optional[CompiledModel]:
+    """
+    Compila o estimador, se o tipo for suportado e a verificação passar.
+
+    Args:
+        model: Estimador do sklearn carregado
+        feature_min: Mínimos do Min-Max Scaling (ordem de FEATURE_NAMES)
+        feature_range: Amplitudes (máximo - mínimo) do Min-Max Scaling
+
+    Returns:
+        Modelo compilado, ou None para usar o `predict` do sklearn
+    """
+    for compiled_class in (CompiledTrees, CompiledLinear):
+        if not compiled_class.supports(model):
+            continue
+        try:
+            compiled = compiled_class(model, feature_min, feature_range)
+            if compiled.verify():
+                return compiled
+            print(f"⚠️ Modelo compilado ({compiled.kind}) diverge do sklearn; usando o predict padrão")
+        except Exception as e:
+            print(f"⚠️ Erro ao compilar modelo: {str(e)}")
+        return None
+    return None
@@ -0,0 +1,49 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Thread pool compartilhado para trabalho bloqueante (boto3, joblib, sklearn).
+# É limitado para que picos de requisições não criem threads sem controle.
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """
+    Retorna o thread pool compartilhado para chamadas bloqueantes.
+
+    O tamanho é definido por BLOCKING_POOL_SIZE (padrão: 8 threads).
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "8")),
+            thread_name_prefix="blocking"
+        )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Executa uma função bloqueante no thread pool sem travar o event loop.
+
+    Args:
+        func: Função síncrona a executar
+        *args, **kwargs: Argumentos repassados para a função
+
+    Returns:
+        O retorno da função
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_blocking_executor(wait: bool = True):
+    """Encerra o thread pool (usado no shutdown da aplicação)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
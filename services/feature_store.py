@@ -0,0 +1,192 @@
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from services.imputation import ELEVATED_AQI, GOOD_AQI, SEVERE_AQI, ImputationStats, compute_stats
+from services.schema import MEASUREMENT_COLUMNS
+
+
+# Regra do aws_query.sql para cada grupo de AQI: (estatística, campo da localização)
+AQI_RULES = {
+    "severe": ("state_max", "state"),
+    "elevated": ("country_mean", "country"),
+    "good": ("city_mode", "city"),
+    "other": ("station_mean", "station")
+}
+
+# Fallback sem AQI (ou quando a regra do AQI não tem valor): da localização mais
+# específica para a mais ampla, terminando na mediana global
+LOCATION_FALLBACK = [
+    ("station_mean", "station"),
+    ("city_mean_all", "city"),
+    ("state_mean_all", "state"),
+    ("country_mean_all", "country")
+]
+
+CONTEXT_FIELDS = ["station", "city", "state", "country", "aqi"]
+
+
+_SEVERE = {value.lower() for value in SEVERE_AQI}
+_ELEVATED = {value.lower() for value in ELEVATED_AQI}
+
+
+def aqi_group(aqi: str) -> str:
+    """Grupo de AQI usado pela regra de preenchimento (sem diferença de caixa)."""
+    aqi = aqi.strip().lower()
+    if aqi in _SEVERE:
+        return "severe"
+    if aqi in _ELEVATED:
+        return "elevated"
+    if aqi == GOOD_AQI.lower():
+        return "good"
+    return "other"
+
+
+def normalize_key(value: Optional[str]) -> Optional[str]:
+    """Chave de busca (sem diferença de caixa e espaços nas pontas)."""
+    if value is None or value != value:
+        return None
+    key = str(value).strip().lower()
+    return key or None
+
+
+def build_feature_store(cleaned: pd.DataFrame, stats: Optional[ImputationStats] = None) -> pa.Table:
+    """
+    Monta a tabela de estatísticas publicada para a imputação online.
+
+    Além dos agregados do aws_query.sql (máximo do estado, média do país e moda
+    da cidade por grupo de AQI, média da estação e mediana por AQI), inclui
+    médias de cidade, estado e país sobre todas as leituras e a mediana global,
+    usadas quando a requisição não informa o AQI.
+
+    Args:
+        cleaned: Saída de `imputation.clean`
+        stats: Agregados já calculados (padrão: calculados aqui)
+
+    Returns:
+        Tabela Arrow com `stat`, `key` e `values` (lista fixa das nove medições)
+    """
+    stats = stats or compute_stats(cleaned)
+    tables = {
+        "state_max": stats.state_max,
+        "country_mean": stats.country_mean,
+        "city_mode": stats.city_mode,
+        "station_mean": stats.station_mean,
+        "aqi_median": stats.aqi_median,
+        "global_median": cleaned[MEASUREMENT_COLUMNS].median().to_frame("").T
+    }
+    for stat, field in LOCATION_FALLBACK[1:]:
+        tables[stat] = cleaned.groupby(field, observed=True)[MEASUREMENT_COLUMNS].mean()
+
+    stat_column, key_column, values = [], [], []
+    for stat, table in tables.items():
+        table = table.reindex(columns=MEASUREMENT_COLUMNS)
+        keys = [normalize_key(key) if stat != "global_median" else "" for key in table.index]
+        keep = [key is not None for key in keys]
+        stat_column += [stat] * sum(keep)
+        key_column += [key for key in keys if key is not None]
+        values.append(table.to_numpy(dtype=np.float64)[keep])
+
+    matrix = np.vstack(values)
+    return pa.table({
+        "stat": pa.array(stat_column).dictionary_encode(),
+        "key": pa.array(key_column, type=pa.string()),
+        "values": pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), len(MEASUREMENT_COLUMNS))
+    }).replace_schema_metadata({"built_at": datetime.utcnow().isoformat(), "rows": str(len(cleaned))})
+
+
+def serialize_feature_store(table: pa.Table) -> bytes:
+    """Arquivo Arrow IPC sem compressão (carregável via memory map)."""
+    sink = io.BytesIO()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class FeatureStore:
+    """
+    Estatísticas por localização/AQI para imputar features ausentes na predição.
+
+    O arquivo Arrow é aberto via memory map: a matriz de valores é uma view
+    NumPy sobre o arquivo, e um dicionário (estatística, chave) -> linha
+    garante buscas O(1) por requisição.
+    """
+
+    def __init__(self, path: str, etag: Optional[str] = None):
+        self.path = path
+        self.etag = etag
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        metadata = table.schema.metadata or {}
+        self.built_at = metadata.get(b"built_at", b"").decode() or None
+        self.source_rows = int(metadata.get(b"rows", b"0"))
+        self.loaded_at = datetime.utcnow()
+
+        values = table.column("values").combine_chunks()
+        self._values = values.values.to_numpy(zero_copy_only=True).reshape(-1, len(MEASUREMENT_COLUMNS))
+        stats = table.column("stat").to_pylist()
+        keys = table.column("key").to_pylist()
+        self._index: Dict[Tuple[str, str], int] = {(stat, key): row for row, (stat, key) in enumerate(zip(stats, keys))}
+        self.lookups = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _chain(self, context: Dict[str, Optional[str]]) -> List[Tuple[str, str]]:
+        """Sequência de (estatística, chave) consultada para uma leitura."""
+        keys = {field: normalize_key(context.get(field)) for field in CONTEXT_FIELDS}
+        chain = []
+        if keys["aqi"]:
+            stat, field = AQI_RULES[aqi_group(keys["aqi"])]
+            chain += [(stat, keys[field]), ("aqi_median", keys["aqi"])]
+        chain += [(stat, keys[field]) for stat, field in LOCATION_FALLBACK]
+        chain.append(("global_median", ""))
+        return [(stat, key) for stat, key in chain if key is not None]
+
+    def impute(self, row: np.ndarray, context: Dict[str, Optional[str]]) -> Tuple[np.ndarray, Dict[str, str]]:
+        """
+        Preenche as features ausentes (NaN) de uma leitura.
+
+        Com AQI informado segue a regra do aws_query.sql (e a mediana do AQI);
+        sem AQI, ou se a regra não tiver valor, usa a média da estação, cidade,
+        estado e país e, por fim, a mediana global.
+
+        Args:
+            row: Vetor (9,) na ordem de MEASUREMENT_COLUMNS
+            context: station, city, state, country e aqi da leitura (opcionais)
+
+        Returns:
+            Tupla (vetor preenchido, {feature: estatística usada})
+        """
+        row = np.array(row, dtype=np.float64)
+        sources: Dict[str, str] = {}
+        missing = np.isnan(row)
+        for stat, key in self._chain(context):
+            if not missing.any():
+                break
+            position = self._index.get((stat, key))
+            self.lookups += 1
+            if position is None:
+                self.misses += 1
+                continue
+            values = self._values[position]
+            fill = missing & ~np.isnan(values)
+            for index in np.flatnonzero(fill):
+                row[index] = values[index]
+                sources[MEASUREMENT_COLUMNS[index]] = stat
+            missing &= ~fill
+        return row, sources
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "etag": self.etag,
+            "entries": len(self._index),
+            "built_at": self.built_at,
+            "source_rows": self.source_rows,
+            "loaded_at": self.loaded_at.isoformat(),
+            "lookups": self.lookups,
+            "misses": self.misses
+        }
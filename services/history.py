@@ -0,0 +1,417 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from services.metrics import HISTORY_FOOTER_CACHE, HISTORY_ROWS
+from services.partition_manifest import FOOTER_READ_BYTES, PARQUET_MAGIC
+from services.schema import LOCATION_COLUMNS, MEASUREMENT_COLUMNS, STATION_COLUMNS, STATION_SCHEMA, conform_table
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+
+# Schema usado na leitura: localização e AQI como string. Com o tipo
+# dictionary no schema do dataset, o pyarrow não usa as estatísticas dos row
+# groups dessas colunas; como string, filtros por estação/cidade/país
+# descartam os row groups cujo intervalo [min, max] não contém o valor.
+SCAN_SCHEMA = pa.schema([
+    pa.field(field.name, pa.string()) if pa.types.is_dictionary(field.type) else field
+    for field in STATION_SCHEMA
+])
+
+
+class FooterCache:
+    """
+    Cache local dos footers Parquet (final de cada arquivo), por chave e ETag.
+
+    Mantém os bytes em memória (LRU limitado por HISTORY_FOOTER_CACHE_MB) e
+    em disco (HISTORY_FOOTER_CACHE_DIR), de modo que consultas repetidas e
+    reinícios da aplicação não baixam os footers de novo. Como o ETag faz
+    parte da chave, um arquivo reescrito nunca é servido com o footer antigo.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(FooterCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.directory = Path(os.getenv("HISTORY_FOOTER_CACHE_DIR", ".cache/footers"))
+            self.max_bytes = int(float(os.getenv("HISTORY_FOOTER_CACHE_MB", "64")) * 1024 * 1024)
+            self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+            self._bytes = 0
+            self._lock = threading.Lock()
+            self.hits = 0
+            self.misses = 0
+            self.initialized = True
+
+    def _prefix(self, key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _path(self, key: str, etag: str) -> Path:
+        return self.directory / f"{self._prefix(key)}-{etag}.footer"
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            tail = self._entries.get((key, etag))
+            if tail is not None:
+                self._entries.move_to_end((key, etag))
+        if tail is None:
+            try:
+                tail = self._path(key, etag).read_bytes()
+            except OSError:
+                self.misses += 1
+                HISTORY_FOOTER_CACHE.inc("miss")
+                return None
+            self._remember(key, etag, tail)
+        self.hits += 1
+        HISTORY_FOOTER_CACHE.inc("hit")
+        return tail
+
+    def _remember(self, key: str, etag: str, tail: bytes):
+        with self._lock:
+            previous = self._entries.pop((key, etag), None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[(key, etag)] = tail
+            self._bytes += len(tail)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def put(self, key: str, etag: str, tail: bytes):
+        """Guarda o footer em memória e em disco (escrita atômica, descartando ETags antigos)."""
+        self._remember(key, etag, tail)
+        path = self._path(key, etag)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for stale in self.directory.glob(f"{self._prefix(key)}-*.footer"):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(tail)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Erro ao salvar footer em cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class S3RangeFile(io.RawIOBase):
+    """
+    Arquivo somente leitura sobre um objeto do S3, lido sob demanda com GET + Range.
+
+    Leituras dentro do final do arquivo são servidas pelo FooterCache; o
+    restante (column chunks dos row groups selecionados) vem do S3. Usa o
+    cliente do AWSService, então as chamadas aparecem nas métricas do S3.
+    """
+
+    def __init__(self, s3_client, bucket: str, obj: Dict[str, Any], footer_cache: Optional[FooterCache] = None):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = obj["key"]
+        self.etag = obj["etag"]
+        self.size = obj["size"]
+        self.footer_cache = footer_cache
+        self._position = 0
+        self._tail: Optional[bytes] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(0, offset)
+        return self._position
+
+    def _get_range(self, start: int, end: int) -> bytes:
+        """Bytes [start, end) do objeto."""
+        if start >= end:
+            return b""
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end - 1}")
+        return response["Body"].read()
+
+    def tail(self) -> bytes:
+        """
+        Final do arquivo com o footer completo (cache ou S3).
+
+        Uma requisição busca os últimos FOOTER_READ_BYTES (o mesmo trecho que
+        o leitor Parquet pede ao abrir o arquivo); se o footer for maior, uma
+        segunda busca exatamente o tamanho indicado no arquivo.
+        """
+        if self._tail is not None:
+            return self._tail
+        cached = self.footer_cache.get(self.key, self.etag) if self.footer_cache else None
+        if cached is not None:
+            self._tail = cached
+            return cached
+
+        tail = self._get_range(self.size - min(self.size, FOOTER_READ_BYTES), self.size)
+        if tail[-4:] != PARQUET_MAGIC:
+            raise ValueError(f"{self.key} não é um arquivo Parquet")
+        footer_length = int.from_bytes(tail[-8:-4], "little") + 8
+        if footer_length > len(tail):
+            tail = self._get_range(self.size - footer_length, self.size)
+
+        self._tail = tail
+        if self.footer_cache:
+            self.footer_cache.put(self.key, self.etag, tail)
+        return tail
+
+    def metadata(self) -> pq.FileMetaData:
+        tail = self.tail()
+        footer_length = int.from_bytes(tail[-8:-4], "little") + 8
+        return pq.read_metadata(pa.BufferReader(tail[-footer_length:]))
+
+    def read(self, size: int = -1) -> bytes:
+        start = self._position
+        end = self.size if size is None or size < 0 else min(self.size, start + size)
+        tail = self.tail()
+        tail_start = self.size - len(tail)
+        if start >= tail_start:
+            data = tail[start - tail_start:end - tail_start]
+        else:
+            data = self._get_range(start, end)
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """Lista separada por vírgulas (vazia se None)."""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def resolve_dates(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    default_days: int = 7,
+    max_days: int = 366
+) -> Tuple[str, str]:
+    """
+    Valida o intervalo de datas da consulta.
+
+    Sem datas, usa os últimos `default_days` dias até hoje (UTC).
+
+    Raises:
+        ValueError: Datas inválidas, invertidas ou intervalo maior que `max_days`
+    """
+    end = date.fromisoformat(end_date) if end_date else datetime.utcnow().date()
+    start = date.fromisoformat(start_date) if start_date else end - timedelta(days=default_days - 1)
+    if start > end:
+        raise ValueError("start_date deve ser anterior ou igual a end_date")
+    if (end - start).days + 1 > max_days:
+        raise ValueError(f"Intervalo máximo de {max_days} dias")
+    return start.isoformat(), end.isoformat()
+
+
+def build_filter(
+    start_date: str,
+    end_date: str,
+    stations: Optional[List[str]] = None,
+    cities: Optional[List[str]] = None,
+    countries: Optional[List[str]] = None
+) -> ds.Expression:
+    """Filtro da consulta: intervalo de `date` e listas de estação, cidade e país."""
+    start = pa.scalar(datetime.fromisoformat(start_date), pa.timestamp("us"))
+    end = pa.scalar(datetime.fromisoformat(end_date) + timedelta(days=1), pa.timestamp("us"))
+    expression = (pc.field("date") >= start) & (pc.field("date") < end)
+    for column, values in (("station", stations), ("city", cities), ("country", countries)):
+        if values:
+            condition = pc.field(column) == values[0] if len(values) == 1 else pc.field(column).isin(values)
+            expression = expression & condition
+    return expression
+
+
+def resolve_columns(columns: Optional[List[str]]) -> List[str]:
+    """
+    Colunas projetadas, na ordem do schema.
+
+    Raises:
+        ValueError: Coluna desconhecida
+    """
+    if not columns:
+        return list(STATION_COLUMNS)
+    unknown = [name for name in columns if name not in STATION_COLUMNS]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}")
+    return [name for name in STATION_COLUMNS if name in columns]
+
+
+def _is_scannable(schema: pa.Schema) -> bool:
+    """Arquivo no layout atual (legíveis pelo dataset) ou antigo (medições como texto)."""
+    for field in schema:
+        if field.name in MEASUREMENT_COLUMNS and not (pa.types.is_floating(field.type) or pa.types.is_integer(field.type)):
+            return False
+        if field.name == "date" and not pa.types.is_timestamp(field.type):
+            return False
+        if field.name in LOCATION_COLUMNS + ["aqi"]:
+            value_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+            if not (pa.types.is_string(value_type) or pa.types.is_large_string(value_type)):
+                return False
+    return True
+
+
+class HistoryScan:
+    """
+    Leitura das partições `date=` do intervalo como um fluxo de record batches.
+
+    - poda de partições: só as partições do intervalo são listadas
+      (`AWSService.list_objects`, com StartAfter);
+    - projeção: apenas as colunas pedidas (e as usadas no filtro) são lidas;
+    - pushdown: os row groups cujas estatísticas não atendem ao filtro são
+      descartados antes de baixar os column chunks;
+    - arquivos antigos (medições como texto) são lidos inteiros, convertidos
+      com `conform_table` e filtrados em memória.
+    """
+
+    def __init__(
+        self,
+        aws_service,
+        objects: Dict[str, List[Dict[str, Any]]],
+        expression: ds.Expression,
+        columns: List[str],
+        limit: Optional[int] = None,
+        batch_rows: Optional[int] = None
+    ):
+        self.aws_service = aws_service
+        self.expression = expression
+        self.columns = columns
+        self.limit = limit
+        self.batch_rows = batch_rows or int(os.getenv("HISTORY_BATCH_ROWS", "65536"))
+        self.schema = pa.schema([SCAN_SCHEMA.field(name) for name in columns])
+        # Arquivos de staging/marcadores da compactação começam com "_"
+        self.files = [
+            obj
+            for day in sorted(objects)
+            for obj in objects[day]
+            if obj["key"].endswith(".parquet") and not os.path.basename(obj["key"]).startswith("_")
+        ]
+        self.rows = 0
+        self.legacy_files = 0
+
+    def _open(self, obj: Dict[str, Any]) -> S3RangeFile:
+        return S3RangeFile(self.aws_service.s3_client, self.aws_service.bucket, obj, FooterCache())
+
+    def _legacy_batches(self, source: S3RangeFile) -> Iterator[pa.RecordBatch]:
+        table = conform_table(pq.read_table(pa.PythonFile(source, mode="r"))).cast(SCAN_SCHEMA)
+        table = table.filter(self.expression).select(self.columns)
+        yield from table.to_batches(max_chunksize=self.batch_rows)
+
+    def _scanner_batches(self, sources: List[S3RangeFile]) -> Iterator[pa.RecordBatch]:
+        file_format = ds.ParquetFileFormat()
+        fragments = [file_format.make_fragment(pa.PythonFile(source, mode="r")) for source in sources]
+        dataset = ds.FileSystemDataset(fragments, schema=SCAN_SCHEMA, format=file_format)
+        yield from dataset.to_batches(
+            columns=self.columns,
+            filter=self.expression,
+            batch_size=self.batch_rows,
+            use_threads=True
+        )
+
+    def _inspect(self, obj: Dict[str, Any]) -> Tuple[S3RangeFile, bool]:
+        """Abre o arquivo e lê o footer (cache ou S3) para saber se é escaneável."""
+        source = self._open(obj)
+        return source, _is_scannable(source.metadata().schema.to_arrow_schema())
+
+    def _all_batches(self) -> Iterator[pa.RecordBatch]:
+        if not self.files:
+            return
+        # Os footers são buscados em paralelo (como no manifest das partições)
+        # e consumidos na ordem dos arquivos: o primeiro grupo começa a ser
+        # lido assim que seus footers chegam, enquanto os demais continuam
+        workers = min(len(self.files), int(os.getenv("S3_LIST_CONCURRENCY", "16")))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-footer")
+        try:
+            # Arquivos consecutivos no layout atual são lidos por um único scanner;
+            # arquivos antigos interrompem o grupo para manter a ordem das partições
+            group: List[S3RangeFile] = []
+            for source, scannable in executor.map(self._inspect, self.files):
+                if scannable:
+                    group.append(source)
+                    continue
+                if group:
+                    yield from self._scanner_batches(group)
+                    group = []
+                self.legacy_files += 1
+                yield from self._legacy_batches(source)
+            if group:
+                yield from self._scanner_batches(group)
+        finally:
+            # Consulta encerrada antes do fim (limit, cliente desconectou)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def batches(self) -> Iterator[pa.RecordBatch]:
+        """Record batches do resultado (bloqueante), respeitando `limit`."""
+        for batch in self._all_batches():
+            if batch.num_rows == 0:
+                continue
+            if self.limit is not None and self.rows + batch.num_rows >= self.limit:
+                batch = batch.slice(0, self.limit - self.rows)
+                self.rows += batch.num_rows
+                HISTORY_ROWS.inc(amount=batch.num_rows)
+                if batch.num_rows:
+                    yield batch
+                return
+            self.rows += batch.num_rows
+            HISTORY_ROWS.inc(amount=batch.num_rows)
+            yield batch
+
+
+def ndjson_chunks(batches: Iterator[pa.RecordBatch]) -> Iterator[bytes]:
+    """Uma linha JSON por registro (datas em ISO 8601, ausentes como null)."""
+    for batch in batches:
+        text = batch.to_pandas().to_json(orient="records", lines=True, date_format="iso")
+        yield (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+def arrow_chunks(batches: Iterator[pa.RecordBatch], schema: pa.Schema) -> Iterator[bytes]:
+    """Formato de streaming do Arrow IPC: schema seguido de um bloco por batch."""
+    sink = io.BytesIO()
+
+    def flush() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield flush()
+        for batch in batches:
+            writer.write_batch(batch)
+            yield flush()
+    yield flush()
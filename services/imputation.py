@@ -0,0 +1,298 @@
+"""
+Limpeza e imputação dos dados coletados, em um único nó, com pandas/numpy.
+
+Implementa a mesma semântica de `services/aws_query.sql` (Spark):
+
+1. AQI: 'N/A' vira 'Unhealthy' (75%) ou 'Unhealthy for Sensitive Groups';
+   'no data' vira 'Very Unhealthy' (50%) ou 'Hazardous' (sorteio com semente 42);
+2. medições negativas viram nulas;
+3. medições nulas são preenchidas conforme o AQI da linha:
+   - 'Hazardous' / 'Very Unhealthy': máximo do estado (entre linhas desses AQIs);
+   - 'Moderate' / 'Unhealthy for Sensitive Groups' / 'Unhealthy': média do país
+     (entre linhas desses AQIs);
+   - 'Good': moda da cidade (entre linhas 'Good'; nulo conta como valor);
+   - demais (inclusive AQI nulo): média da estação;
+4. o que continuar nulo recebe a mediana do AQI (PERCENTILE_CONT(0.5)).
+
+Diferente do SQL, que repete um CTE com janelas aninhadas por medição, cada
+tabela de agregados é calculada uma única vez para as nove medições (um
+groupby por tabela; a moda usa um único groupby sobre o formato longo) e o
+preenchimento é feito com operações vetorizadas sobre a matriz de medições.
+
+Diferenças conhecidas em relação ao Spark:
+- o sorteio do AQI usa numpy com a mesma semente, então a sequência de
+  números aleatórios não é a mesma do rand(42) do Spark;
+- empates na moda são resolvidos pelo menor valor (no Spark a escolha é
+  arbitrária).
+
+Uso (S3 com as variáveis do .env ou diretório local <prefixo>/date=YYYY-MM-DD/):
+    python -m services.imputation --start-date 2025-10-01 --output cleaned.parquet
+    python -m services.imputation --local-dir ./data --prefix raw --output cleaned.parquet
+
+Com `--publish-stats`, os agregados também são publicados como feature store
+(`services/feature_store.py`) para a imputação online em /api/predict.
+"""
+import io
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from services.compaction import LocalStorage, S3Storage
+from services.schema import LOCATION_COLUMNS, MEASUREMENT_COLUMNS, conform_table
+
+# Grupos de AQI usados para escolher a regra de preenchimento
+SEVERE_AQI = ["Hazardous", "Very Unhealthy"]
+ELEVATED_AQI = ["Moderate", "Unhealthy for Sensitive Groups", "Unhealthy"]
+GOOD_AQI = "Good"
+
+OUTPUT_COLUMNS = ["date", *LOCATION_COLUMNS, "aqi", *MEASUREMENT_COLUMNS]
+
+
+class ImputationStats(NamedTuple):
+    """Tabelas de agregados usadas no preenchimento (índice = chave, colunas = medições)"""
+    state_max: pd.DataFrame
+    country_mean: pd.DataFrame
+    city_mode: pd.DataFrame
+    station_mean: pd.DataFrame
+    aqi_median: pd.DataFrame
+
+
+def clean(df: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """
+    Substitui AQIs ausentes por categorias sorteadas e anula medições negativas.
+
+    Args:
+        df: Registros brutos (colunas de STATION_COLUMNS)
+        seed: Semente do sorteio dos AQIs 'N/A' / 'no data'
+
+    Returns:
+        DataFrame com OUTPUT_COLUMNS e medições em float64
+    """
+    aqi = df["aqi"].astype(object).to_numpy()
+    draw = np.random.default_rng(seed).random(len(df))
+    aqi = np.where(
+        aqi == "N/A",
+        np.where(draw <= 0.75, "Unhealthy", "Unhealthy for Sensitive Groups"),
+        np.where(aqi == "no data", np.where(draw <= 0.5, "Very Unhealthy", "Hazardous"), aqi)
+    )
+
+    values = df[MEASUREMENT_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    values = np.where(values < 0, np.nan, values)
+
+    cleaned = df[["date", *LOCATION_COLUMNS]].reset_index(drop=True)
+    cleaned["aqi"] = pd.Categorical(aqi)
+    cleaned[MEASUREMENT_COLUMNS] = values
+    return cleaned
+
+
+def _group_table(frame: pd.DataFrame, key: str, how: str) -> pd.DataFrame:
+    table = frame.groupby(key, observed=True, sort=False)[MEASUREMENT_COLUMNS].agg(how)
+    table.index = table.index.astype(object)
+    return table
+
+
+def _city_mode(good: pd.DataFrame) -> pd.DataFrame:
+    """Moda por cidade das nove medições em um único groupby (nulo conta como valor)."""
+    good = good[good["city"].notna()]
+    long = good[["city", *MEASUREMENT_COLUMNS]].melt(id_vars="city", var_name="feature", value_name="value")
+    counts = long.groupby(["city", "feature", "value"], dropna=False, observed=True).size().reset_index(name="count")
+    counts = counts.sort_values(
+        ["city", "feature", "count", "value"],
+        ascending=[True, True, False, True],
+        na_position="last"
+    )
+    modes = counts.drop_duplicates(["city", "feature"]).pivot(index="city", columns="feature", values="value")
+    modes = modes.reindex(columns=MEASUREMENT_COLUMNS).astype(np.float64)
+    modes.index = modes.index.astype(object)
+    return modes
+
+
+def compute_stats(cleaned: pd.DataFrame) -> ImputationStats:
+    """
+    Calcula as tabelas de agregados do preenchimento (cada uma uma única vez).
+
+    Args:
+        cleaned: Saída de `clean`
+
+    Returns:
+        ImputationStats com máximo por estado, média por país, moda por cidade,
+        média por estação e mediana por AQI
+    """
+    aqi = cleaned["aqi"]
+    aqi_median = cleaned.groupby("aqi", dropna=False, observed=True, sort=False)[MEASUREMENT_COLUMNS].median()
+    aqi_median.index = aqi_median.index.astype(object)
+    return ImputationStats(
+        state_max=_group_table(cleaned[aqi.isin(SEVERE_AQI)], "state", "max"),
+        country_mean=_group_table(cleaned[aqi.isin(ELEVATED_AQI)], "country", "mean"),
+        city_mode=_city_mode(cleaned[aqi == GOOD_AQI]),
+        station_mean=_group_table(cleaned, "station", "mean"),
+        aqi_median=aqi_median
+    )
+
+
+def _lookup(table: pd.DataFrame, keys: pd.Series) -> np.ndarray:
+    """Valores de `table` para cada linha (NaN quando a chave não existe ou é nula)."""
+    # A última linha (NaN) é a posição -1 devolvida para chaves ausentes
+    values = np.vstack([
+        table.reindex(columns=MEASUREMENT_COLUMNS).to_numpy(dtype=np.float64),
+        np.full((1, len(MEASUREMENT_COLUMNS)), np.nan)
+    ])
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        # Resolve só as categorias distintas e expande pelos códigos (código -1 = chave nula)
+        categories = np.append(keys.cat.categories.to_numpy(dtype=object), np.nan)
+        positions = table.index.get_indexer(categories)
+        return values[positions[keys.cat.codes.to_numpy()]]
+    return values[table.index.get_indexer(keys.astype(object).to_numpy())]
+
+
+def apply_stats(cleaned: pd.DataFrame, stats: ImputationStats) -> pd.DataFrame:
+    """
+    Preenche as medições nulas com os agregados.
+
+    Args:
+        cleaned: Saída de `clean`
+        stats: Agregados de `compute_stats`
+
+    Returns:
+        DataFrame com OUTPUT_COLUMNS, na ordem das linhas de entrada
+    """
+    aqi = cleaned["aqi"]
+    fallback = np.select(
+        [
+            aqi.isin(SEVERE_AQI).to_numpy()[:, None],
+            aqi.isin(ELEVATED_AQI).to_numpy()[:, None],
+            (aqi == GOOD_AQI).to_numpy()[:, None]
+        ],
+        [
+            _lookup(stats.state_max, cleaned["state"]),
+            _lookup(stats.country_mean, cleaned["country"]),
+            _lookup(stats.city_mode, cleaned["city"])
+        ],
+        default=_lookup(stats.station_mean, cleaned["station"])
+    )
+
+    values = cleaned[MEASUREMENT_COLUMNS].to_numpy(dtype=np.float64)
+    values = np.where(np.isnan(values), fallback, values)
+    values = np.where(np.isnan(values), _lookup(stats.aqi_median, aqi), values)
+
+    result = cleaned[["date", *LOCATION_COLUMNS, "aqi"]].copy()
+    result[MEASUREMENT_COLUMNS] = values
+    return result
+
+
+def run_pipeline(df: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """
+    Executa limpeza e imputação completas (equivalente a `aws_query.sql`).
+
+    Args:
+        df: Registros brutos
+        seed: Semente do sorteio dos AQIs ausentes
+
+    Returns:
+        DataFrame limpo e imputado
+    """
+    cleaned = clean(df, seed)
+    return apply_stats(cleaned, compute_stats(cleaned))
+
+
+def load_records(
+    storage,
+    prefix: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Lê os arquivos Parquet das partições do intervalo em um único DataFrame.
+
+    Args:
+        storage: S3Storage ou LocalStorage
+        prefix: Prefixo dos dados (ex.: 'raw')
+        start_date: Primeira data (inclusive, YYYY-MM-DD)
+        end_date: Última data (inclusive, YYYY-MM-DD)
+
+    Returns:
+        Registros no schema atual (arquivos antigos são convertidos)
+    """
+    keys = [
+        obj["key"]
+        for date in storage.list_partitions(prefix)
+        if (not start_date or date >= start_date) and (not end_date or date <= end_date)
+        for obj in storage.list(f"{prefix}/date={date}/")
+        if obj["key"].endswith(".parquet") and not obj["key"].rsplit("/", 1)[-1].startswith(("_", "."))
+    ]
+    if not keys:
+        raise ValueError("Nenhum arquivo Parquet encontrado no intervalo")
+
+    def read(key: str) -> pa.Table:
+        return conform_table(pq.read_table(io.BytesIO(storage.read(key))))
+
+    workers = min(len(keys), int(os.getenv("S3_LIST_CONCURRENCY", "16")))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parquet-read") as executor:
+        tables = list(executor.map(read, keys))
+    return pa.concat_tables(tables).to_pandas()
+
+
+def main():
+    """CLI: limpa e imputa os dados do S3 (credenciais do .env) ou de um diretório local."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start-date", help="Primeira data (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Última data (YYYY-MM-DD)")
+    parser.add_argument("--local-dir", help="Lê de um diretório local em vez do S3")
+    parser.add_argument("--prefix", help="Prefixo dos dados (padrão: S3_PREFIX ou 'raw')")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do sorteio dos AQIs ausentes")
+    parser.add_argument("--output", help="Arquivo Parquet de saída")
+    parser.add_argument("--stats-output", help="Grava o feature store (Arrow) neste arquivo")
+    parser.add_argument("--publish-stats", action="store_true", help="Publica o feature store no S3 (FEATURE_STORE_KEY)")
+    args = parser.parse_args()
+    if not (args.output or args.stats_output or args.publish_stats):
+        parser.error("informe --output, --stats-output ou --publish-stats")
+
+    if args.local_dir:
+        storage = LocalStorage(args.local_dir)
+        prefix = args.prefix or os.getenv("S3_PREFIX", "raw")
+    else:
+        from services.aws_service import AWSService
+
+        aws_service = AWSService()
+        if not aws_service.is_configured():
+            raise SystemExit("AWS não configurado: defina as variáveis no .env")
+        storage = S3Storage(aws_service.s3_client, aws_service.bucket)
+        prefix = args.prefix or aws_service.prefix
+
+    started = time.perf_counter()
+    df = load_records(storage, prefix, args.start_date, args.end_date)
+    loaded = time.perf_counter()
+    cleaned = clean(df, seed=args.seed)
+    stats = compute_stats(cleaned)
+    result = apply_stats(cleaned, stats)
+    finished = time.perf_counter()
+    print(f"✅ {len(result)} linhas processadas (leitura {loaded - started:.2f}s, imputação {finished - loaded:.2f}s)")
+
+    if args.output:
+        pq.write_table(pa.Table.from_pandas(result, preserve_index=False), args.output, compression="zstd")
+        print(f"✅ Dados imputados gravados em {args.output}")
+
+    if args.stats_output or args.publish_stats:
+        from services.feature_store import build_feature_store, serialize_feature_store
+
+        data = serialize_feature_store(build_feature_store(cleaned, stats))
+        if args.stats_output:
+            with open(args.stats_output, "wb") as f:
+                f.write(data)
+            print(f"✅ Feature store gravado em {args.stats_output} ({len(data)} bytes)")
+        if args.publish_stats:
+            key = os.getenv("FEATURE_STORE_KEY", "models/feature_stats.arrow")
+            if isinstance(storage, S3Storage):
+                storage.put(key, data)
+            else:
+                LocalStorage(args.local_dir).put(key, data)
+            print(f"✅ Feature store publicado em {storage.describe()}/{key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import bisect
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Buckets padrão (segundos): de 1ms a 30s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_PATH_PARAM = re.compile(r"{(\w+)(?::\w+)?}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base das métricas: nome, ajuda, rótulos e um lock para os incrementos."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotônico, com um valor por combinação de rótulos."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        if not registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Histograma com buckets fixos.
+
+    Cada observação custa uma busca binária nos limites e um incremento sob
+    lock; os buckets cumulativos do formato Prometheus só são montados na
+    renderização.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por rótulos: [contagem por bucket (+Inf no fim), soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        if not registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        lines = self._header()
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Métrica lida no momento da coleta (ex.: contadores que os serviços já mantêm).
+
+    `callback` retorna um número ou um dicionário {tupla de rótulos: valor}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Any],
+        labelnames: Iterable[str] = (),
+        type: str = "gauge"
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class MetricsRegistry:
+    """
+    Registro das métricas expostas em `/metrics` (formato texto do Prometheus).
+
+    Com METRICS_ENABLED=false as observações viram no-op e `/metrics` só
+    expõe as métricas lidas na coleta.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Any],
+        labelnames: Iterable[str] = (),
+        type: str = "gauge"
+    ) -> CallbackMetric:
+        """Registra (ou substitui) uma métrica lida na coleta."""
+        metric = CallbackMetric(name, documentation, callback, labelnames, type)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# HTTP
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Duração das requisições HTTP por rota", ("method", "route", "status")
+)
+
+# Scraper
+SCRAPER_FETCH_SECONDS = registry.histogram(
+    "scraper_fetch_seconds", "Tempo de download de uma página de estação (com retries)", ("result",)
+)
+SCRAPER_PARSE_SECONDS = registry.histogram(
+    "scraper_parse_seconds", "Tempo de parse de uma página de estação", ("mode",)
+)
+SCRAPER_FAILURES = registry.counter(
+    "scraper_station_failures_total", "Estações com falha por etapa e tipo de erro", ("stage", "error")
+)
+SCRAPER_RETRIES = registry.counter("scraper_retries_total", "Novas tentativas de download após falha transitória")
+
+# S3
+S3_REQUEST_SECONDS = registry.histogram(
+    "s3_request_duration_seconds", "Latência das chamadas ao S3 por operação", ("operation", "status")
+)
+S3_BYTES = registry.counter(
+    "s3_bytes_total", "Bytes enviados/recebidos nas chamadas ao S3", ("operation", "direction")
+)
+
+# Modelo
+MODEL_LOAD_SECONDS = registry.histogram(
+    "model_load_duration_seconds", "Tempo de carga (download + unpickle) de uma versão do modelo",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+MODEL_LOAD_FAILURES = registry.counter("model_load_failures_total", "Falhas ao carregar o modelo")
+MODEL_INFERENCE_SECONDS = registry.histogram(
+    "model_inference_duration_seconds", "Tempo de inferência por chamada ao modelo", ("mode",)
+)
+MODEL_BATCH_SIZE = registry.histogram(
+    "model_batch_size", "Linhas por chamada ao modelo", ("mode",), buckets=SIZE_BUCKETS
+)
+
+# Consultas históricas
+HISTORY_FOOTER_CACHE = registry.counter(
+    "history_footer_cache_total", "Consultas ao cache de footers Parquet por resultado", ("result",)
+)
+HISTORY_ROWS = registry.counter("history_rows_total", "Linhas retornadas por /api/history")
+
+
+def _body_size(body: Any) -> int:
+    """Tamanho do corpo de uma requisição do botocore (bytes ou arquivo)."""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    try:
+        return len(body)
+    except TypeError:
+        pass
+    try:
+        position = body.tell()
+        end = body.seek(0, os.SEEK_END)
+        body.seek(position)
+        return end - position
+    except (AttributeError, OSError):
+        return 0
+
+
+def _s3_before_call(model, params, context, **kwargs):
+    context["metrics_started"] = time.perf_counter()
+    context["metrics_sent"] = _body_size(params.get("body"))
+
+
+def _s3_after_call(http_response, model, context, **kwargs):
+    started = context.get("metrics_started")
+    if started is None:
+        return
+    S3_REQUEST_SECONDS.observe(time.perf_counter() - started, model.name, str(http_response.status_code))
+    if context.get("metrics_sent"):
+        S3_BYTES.inc(model.name, "sent", amount=context["metrics_sent"])
+    if model.http.get("method") != "HEAD":
+        received = int(http_response.headers.get("content-length") or 0)
+        if received:
+            S3_BYTES.inc(model.name, "received", amount=received)
+
+
+def _s3_after_call_error(model, context, **kwargs):
+    started = context.get("metrics_started")
+    if started is not None:
+        S3_REQUEST_SECONDS.observe(time.perf_counter() - started, model.name, "error")
+
+
+def instrument_s3_client(client):
+    """
+    Registra hooks do botocore que medem latência e bytes de cada chamada.
+
+    Todos os serviços que usam o cliente do AWSService (sink de Parquet,
+    registry do modelo, compactação, manifest) passam a ser medidos sem
+    alterar as chamadas.
+    """
+    events = client.meta.events
+    events.register("before-call.s3", _s3_before_call, unique_id="metrics-before-call")
+    events.register("after-call.s3", _s3_after_call, unique_id="metrics-after-call")
+    events.register("after-call-error.s3", _s3_after_call_error, unique_id="metrics-after-call-error")
+    return client
+
+
+def route_template(scope: Dict[str, Any]) -> Optional[str]:
+    """
+    Template completo da rota atendida (ex.: /api/stations/collect/{job_id}).
+
+    Routers incluídos com prefixo podem expor só o caminho relativo em
+    `scope["route"]`; o prefixo é recuperado comparando o caminho da rota,
+    preenchido com os parâmetros, com o final do caminho da requisição.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return None
+    params = scope.get("path_params") or {}
+    rendered = _PATH_PARAM.sub(lambda match: str(params.get(match.group(1), match.group(0))), template)
+    path = scope.get("path", "")
+    if rendered and path.endswith(rendered) and path != rendered:
+        return path[:-len(rendered)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a duração de cada requisição HTTP.
+
+    O rótulo `route` usa o template da rota (ex.: /api/stations/collect/{job_id}),
+    não a URL, para manter a cardinalidade limitada; requisições sem rota
+    correspondente ficam como "unmatched". Implementado direto sobre ASGI
+    (sem BaseHTTPMiddleware) para não bufferizar respostas em streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                route_template(scope) or "unmatched",
+                str(status)
+            )
@@ -0,0 +1,170 @@
+import os
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, Any, NamedTuple, Optional
+from botocore.exceptions import ClientError
+
+
+class ModelTarget(NamedTuple):
+    """Versão de modelo resolvida no registry"""
+    version: str
+    key: str
+    etag: str
+    size: int
+
+
+class ModelRegistry:
+    """
+    Registry de modelos versionados no S3.
+
+    Estrutura esperada no bucket:
+
+        models/
+        ├── manifest.json
+        ├── <versão>/air_quality_model.joblib
+        └── air_quality_model.joblib        (legado, usado se não houver manifest)
+
+    O manifest indica a versão ativa:
+
+        {"active": "v2", "versions": {"v2": {"key": "models/v2/air_quality_model.joblib", ...}}}
+    """
+
+    LEGACY_VERSION = "legacy"
+
+    def __init__(self, prefix: str = "models", legacy_key: str = "models/air_quality_model.joblib"):
+        self.prefix = prefix.rstrip("/")
+        self.manifest_key = f"{self.prefix}/manifest.json"
+        self.legacy_key = legacy_key
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_etag: Optional[str] = None
+
+    @staticmethod
+    def _error_code(error: ClientError) -> str:
+        return str(error.response.get("Error", {}).get("Code", ""))
+
+    def get_manifest(self, s3_client, bucket: str) -> Optional[Dict[str, Any]]:
+        """
+        Lê o manifest do S3 com requisição condicional (If-None-Match).
+
+        Returns:
+            Conteúdo do manifest ou None se ele não existir
+        """
+        params = {"Bucket": bucket, "Key": self.manifest_key}
+        if self._manifest_etag:
+            params["IfNoneMatch"] = self._manifest_etag
+
+        try:
+            response = s3_client.get_object(**params)
+        except ClientError as e:
+            code = self._error_code(e)
+            if code in ("304", "NotModified"):
+                return self._manifest
+            if code in ("NoSuchKey", "404"):
+                self._manifest, self._manifest_etag = None, None
+                return None
+            raise
+
+        self._manifest = json.loads(response["Body"].read())
+        self._manifest_etag = response.get("ETag")
+        return self._manifest
+
+    def resolve(self, s3_client, bucket: str) -> ModelTarget:
+        """
+        Resolve a versão ativa do modelo (manifest ou chave legada).
+
+        Returns:
+            ModelTarget com versão, chave, ETag e tamanho do artefato
+        """
+        manifest = self.get_manifest(s3_client, bucket)
+
+        if manifest and manifest.get("active"):
+            version = manifest["active"]
+            entry = manifest.get("versions", {}).get(version)
+            if not entry:
+                raise ValueError(f"Versão ativa '{version}' não encontrada no manifest")
+            key = entry["key"]
+        else:
+            version, key = self.LEGACY_VERSION, self.legacy_key
+
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        return ModelTarget(
+            version=version,
+            key=key,
+            etag=head["ETag"].strip('"'),
+            size=int(head.get("ContentLength", 0))
+        )
+
+    def publish(
+        self,
+        s3_client,
+        bucket: str,
+        model_path: str,
+        version: str,
+        activate: bool = True,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Publica um novo artefato versionado e atualiza o manifest.
+
+        O artefato é enviado antes do manifest, de modo que os watchers nunca
+        enxergam uma versão ativa que ainda não existe no bucket.
+
+        Args:
+            s3_client: Cliente boto3 do S3
+            bucket: Bucket do registry
+            model_path: Caminho local do arquivo .joblib
+            version: Identificador da versão
+            activate: Se True, torna a versão ativa
+            metadata: Metadados extras (métricas, dataset, etc.)
+
+        Returns:
+            Manifest atualizado
+        """
+        key = f"{self.prefix}/{version}/{os.path.basename(self.legacy_key)}"
+        s3_client.upload_file(model_path, bucket, key)
+
+        manifest = self.get_manifest(s3_client, bucket) or {"versions": {}}
+        manifest.setdefault("versions", {})[version] = {
+            "key": key,
+            "created_at": datetime.utcnow().isoformat(),
+            **(metadata or {})
+        }
+        if activate:
+            manifest["active"] = version
+
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=self.manifest_key,
+            Body=json.dumps(manifest, indent=2).encode("utf-8"),
+            ContentType="application/json"
+        )
+        print(f"✅ Modelo {version} publicado em s3://{bucket}/{key}")
+        return manifest
+
+
+def main():
+    """CLI: publica um modelo no registry usando as credenciais do .env."""
+    from services.aws_service import AWSService
+
+    parser = argparse.ArgumentParser(description="Publica um modelo versionado no registry do S3")
+    parser.add_argument("model_path", help="Arquivo .joblib do modelo")
+    parser.add_argument("--version", required=True, help="Identificador da versão (ex.: 2025-10-07)")
+    parser.add_argument("--no-activate", action="store_true", help="Publica sem tornar a versão ativa")
+    args = parser.parse_args()
+
+    aws_service = AWSService()
+    if not aws_service.is_configured():
+        raise SystemExit("AWS não configurado: defina as variáveis no .env")
+
+    ModelRegistry().publish(
+        aws_service.s3_client,
+        aws_service.bucket,
+        args.model_path,
+        args.version,
+        activate=not args.no_activate
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,412 @@
-import io
+import os
+import time
+import asyncio
 import joblib
 import numpy as np
-from typing import List, Dict, Any
+from collections import deque, Counter, OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple
+from botocore.exceptions import ClientError
 from services.aws_service import AWSService
+from services.compiled_model import CompiledModel, compile_model
+from services.executor import get_blocking_executor, run_blocking
+from services.feature_store import FeatureStore
+from services.metrics import (
+    MODEL_BATCH_SIZE, MODEL_INFERENCE_SECONDS, MODEL_LOAD_FAILURES, MODEL_LOAD_SECONDS, registry as metrics_registry
+)
+from services.model_registry import ModelRegistry, ModelTarget
+
+
+# Ordem das features esperada pelo modelo
+FEATURE_NAMES = [
+    "pm25", "pm10", "no2", "so2", "co",
+    "temperature", "pressure", "humidity", "wind"
+]
+
+# Valores mínimos e máximos usados no treinamento
+MIN_VALUES = {
+    "pm25": 1,
+    "pm10": 1,
+    "no2": 0,
+    "so2": 0,
+    "co": 0,
+    "temperature": 1.5,
+    "pressure": 991,
+    "humidity": 22,
+    "wind": 0
+}
+
+MAX_VALUES = {
+    "pm25": 263.5,
+    "pm10": 150,
+    "no2": 22,
+    "so2": 6,
+    "co": 12,
+    "temperature": 37.5,
+    "pressure": 1031,
+    "humidity": 107,
+    "wind": 8.5
+}
+
+# Vetores pré-calculados para o Min-Max Scaling vetorizado
+FEATURE_MIN = np.array([MIN_VALUES[name] for name in FEATURE_NAMES], dtype=np.float64)
+FEATURE_RANGE = np.array([MAX_VALUES[name] for name in FEATURE_NAMES], dtype=np.float64) - FEATURE_MIN
+
+
+class PredictionBatcher:
+    """
+    Agrupa chamadas concorrentes de predição em lotes (micro-batching).
+
+    Cada chamada entra em uma fila com o modelo que deve atendê-la; um
+    worker descarrega a fila quando ela atinge `max_batch_size` itens ou
+    quando o item mais antigo espera `max_wait_us` microssegundos, executando
+    uma predição vetorizada por modelo em um thread pool e resolvendo o
+    future de cada chamador. Durante um hot reload, linhas enfileiradas antes
+    e depois da troca são previstas pelos respectivos modelos.
+    """
+
+    LATENCY_WINDOW = 1000
+
+    def __init__(
+        self,
+        predict_fn: Callable[[Any, np.ndarray], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_us: int = 2000,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1_000_000
+        self._executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Métricas
+        self.batches = 0
+        self.requests = 0
+        self.errors = 0
+        self._batch_sizes = Counter()
+        self._batch_latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._request_latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    def _ensure_worker(self):
+        """Inicia o worker no event loop atual (recriando-o se o loop mudou)."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, features: np.ndarray, model: Any) -> int:
+        """
+        Enfileira uma linha de features normalizadas e aguarda sua predição.
+
+        Args:
+            features: Vetor (9,) já normalizado
+            model: Modelo repassado ao `predict_fn` (o ativo no momento da chamada)
+
+        Returns:
+            Predição da linha
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((features, model, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[np.ndarray, Any, asyncio.Future, float]]:
+        """Aguarda o primeiro item e acumula outros até o tamanho ou tempo máximo."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Loop do worker: coleta um lote e o prediz agrupado por modelo."""
+        while True:
+            batch = await self._collect_batch()
+            groups: Dict[int, List[Tuple[np.ndarray, Any, asyncio.Future, float]]] = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+            for group in groups.values():
+                await self._predict_group(group)
+
+    async def _predict_group(self, batch: List[Tuple[np.ndarray, Any, asyncio.Future, float]]):
+        """Prediz em thread as linhas de um mesmo modelo e resolve os futures."""
+        X = np.vstack([features for features, _, _, _ in batch])
+        model = batch[0][1]
+
+        started = time.perf_counter()
+        try:
+            executor = self._executor or get_blocking_executor()
+            predictions = await self._loop.run_in_executor(executor, self.predict_fn, model, X)
+        except Exception as e:
+            self.errors += 1
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        MODEL_INFERENCE_SECONDS.observe(finished - started, "micro_batch")
+        MODEL_BATCH_SIZE.observe(len(batch), "micro_batch")
+        self.batches += 1
+        self.requests += len(batch)
+        self._batch_sizes[len(batch)] += 1
+        self._batch_latencies.append(finished - started)
+
+        for (_, _, future, enqueued), prediction in zip(batch, predictions):
+            self._request_latencies.append(finished - enqueued)
+            if not future.done():
+                future.set_result(int(prediction))
+
+    @staticmethod
+    def _percentiles_ms(samples) -> Dict[str, Optional[float]]:
+        if not samples:
+            return {"p50": None, "p99": None}
+        p50, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 99]) * 1000
+        return {"p50": round(float(p50), 3), "p99": round(float(p99), 3)}
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de tamanho e latência dos lotes para ajuste de p99 x throughput."""
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_us": int(self.max_wait * 1_000_000),
+            "batches": self.batches,
+            "requests": self.requests,
+            "errors": self.errors,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            "batch_latency_ms": self._percentiles_ms(self._batch_latencies),
+            "request_latency_ms": self._percentiles_ms(self._request_latencies)
+        }
+
+
+class PredictionCache:
+    """
+    Cache LRU com TTL das predições de uma única linha.
+
+    A chave é o vetor de features normalizado, quantizado em passos de
+    `quantum` (leituras que diferem menos que isso compartilham a entrada),
+    junto com a versão e o ETag do modelo ativo. Entradas expiram após
+    `ttl` segundos e, acima de `max_size`, a menos usada recentemente é
+    descartada. O cache é limpo quando um novo modelo é ativado.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0, quantum: float = 1e-6):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.quantum = quantum
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, int]]" = OrderedDict()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key(self, model_version: str, features: np.ndarray) -> Tuple[str, bytes]:
+        """Chave do cache: versão do modelo + vetor quantizado."""
+        quantized = np.rint(np.asarray(features, dtype=np.float64) / self.quantum).astype(np.int64)
+        return model_version, quantized.tobytes()
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, prediction = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return prediction
+
+    def put(self, key: Tuple[str, bytes], prediction: int):
+        self._entries[key] = (time.monotonic() + self.ttl, prediction)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Descarta todas as entradas (ex.: após a troca do modelo)."""
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "quantum": self.quantum,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+def estimate_model_memory(obj: Any, _seen: Optional[Dict[int, Any]] = None) -> int:
+    """
+    Estima a memória ocupada pelos arrays NumPy de um modelo.
+
+    Percorre atributos, listas, dicionários e o estado serializável
+    (`__getstate__`) de objetos como as árvores do sklearn.
+    """
+    # Os objetos visitados são mantidos vivos para que ids de estados
+    # temporários (__getstate__) não sejam reaproveitados durante a varredura
+    seen = _seen if _seen is not None else {}
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        total = obj.nbytes
+        if obj.dtype == object:
+            total += sum(estimate_model_memory(item, seen) for item in obj.ravel())
+        return total
+    if isinstance(obj, dict):
+        return sum(estimate_model_memory(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_model_memory(item, seen) for item in obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return 0
+
+    state = None
+    if hasattr(obj, "__dict__"):
+        state = vars(obj)
+    elif hasattr(obj, "__getstate__"):
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            state = None
+    if isinstance(state, dict):
+        return estimate_model_memory(state, seen)
+    return 0
+
+
+def paths_in_use(directory: Path) -> Set[Path]:
+    """
+    Arquivos do diretório abertos ou mapeados em memória por algum processo.
+
+    Lê /proc/<pid>/fd e /proc/<pid>/maps (Linux); processos de outros
+    usuários são ignorados. Em outros sistemas retorna um conjunto vazio.
+    """
+    directory = directory.resolve()
+    in_use: Set[Path] = set()
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return in_use
+
+    for pid_dir in proc.iterdir():
+        if not pid_dir.name.isdigit():
+            continue
+        targets = []
+        try:
+            fds = list((pid_dir / "fd").iterdir())
+        except OSError:
+            fds = []
+        for fd in fds:
+            # Descritores podem fechar entre a listagem e a leitura
+            try:
+                targets.append(os.readlink(fd))
+            except OSError:
+                continue
+        try:
+            with open(pid_dir / "maps") as f:
+                for line in f:
+                    fields = line.split(maxsplit=5)
+                    if len(fields) == 6:
+                        targets.append(fields[5].strip())
+        except OSError:
+            pass
+        in_use.update(Path(target) for target in targets if Path(target).parent == directory)
+    return in_use
+
+
+class LoadedModel:
+    """Modelo carregado e seus metadados, trocado atomicamente no hot reload"""
+
+    def __init__(
+        self,
+        model: Any,
+        target: ModelTarget,
+        load_seconds: float,
+        path: Optional[Path] = None,
+        mmap: bool = False,
+        compiled: Optional[CompiledModel] = None
+    ):
+        self.model = model
+        self.compiled = compiled
+        self.path = path
+        self.mmap = mmap
+        self.version = target.version
+        self.key = target.key
+        self.etag = target.etag
+        self.artifact_bytes = target.size
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.utcnow()
+        self.memory_bytes = estimate_model_memory((model, compiled))
+
+    def predict_scaled(self, X: np.ndarray) -> np.ndarray:
+        """Prediz features normalizadas pelo modelo compilado (ou pelo `predict` do sklearn)."""
+        if self.compiled is not None:
+            return self.compiled.predict_scaled(X)
+        return self.model.predict(X)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "model_path": self.key,
+            "model_etag": self.etag,
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_seconds": round(self.load_seconds, 3),
+            "mmap": self.mmap,
+            "compiled": self.compiled.kind if self.compiled else None,
+            "artifact_bytes": self.artifact_bytes,
+            "memory_bytes": self.memory_bytes
+        }
 
 
 class ModelService:
     """Serviço para gerenciar predições do modelo de ML"""
     
     _instance = None
-    _model = None
-    _model_loaded = False
     
     def __new__(cls):
         if cls._instance is None:
@@ -20,44 +416,413 @@ class ModelService:
     def __init__(self):
         if not hasattr(self, 'initialized'):
             self.model_key = "models/air_quality_model.joblib"
+            self.registry = ModelRegistry(legacy_key=self.model_key)
+            self._active: Optional[LoadedModel] = None
+            self.cache_dir = Path(os.getenv("MODEL_CACHE_DIR", ".cache/models"))
+            self.mmap_enabled = os.getenv("MODEL_MMAP", "true").lower() in ("1", "true", "yes")
+            self.compile_enabled = os.getenv("MODEL_COMPILE", "true").lower() in ("1", "true", "yes")
+            self.retry_backoff = float(os.getenv("MODEL_RETRY_BACKOFF", "5"))
+            self.retry_backoff_max = float(os.getenv("MODEL_RETRY_BACKOFF_MAX", "300"))
+            self.watch_interval = float(os.getenv("MODEL_WATCH_INTERVAL", "60"))
+            self._load_lock: Optional[asyncio.Lock] = None
+            self._load_failures = 0
+            self._retry_at = 0.0
+            self._last_error: Optional[str] = None
+            self._last_check: Optional[datetime] = None
+            self._reloads = 0
+            self._watcher: Optional[asyncio.Task] = None
+            self.batching_enabled = os.getenv("MODEL_BATCHING", "false").lower() in ("1", "true", "yes")
+            self._batcher: Optional[PredictionBatcher] = None
+            self.prediction_cache = PredictionCache(
+                max_size=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+                ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")),
+                quantum=float(os.getenv("PREDICTION_CACHE_QUANTUM", "1e-6"))
+            )
+            self.feature_store_key = os.getenv("FEATURE_STORE_KEY", "models/feature_stats.arrow")
+            self.feature_store_path = os.getenv("FEATURE_STORE_PATH")
+            self.feature_store: Optional[FeatureStore] = None
+            self._feature_store_error: Optional[str] = None
+            self._register_metrics()
             self.initialized = True
+
+    def _register_metrics(self):
+        """Expõe em /metrics os contadores que o serviço já mantém (lidos na coleta)."""
+        cache = self.prediction_cache
+        metrics_registry.callback("model_loaded", "1 se há um modelo ativo", lambda: int(self._active is not None))
+        metrics_registry.callback("model_reloads_total", "Trocas de versão do modelo", lambda: self._reloads, type="counter")
+        metrics_registry.callback(
+            "prediction_cache_events_total",
+            "Eventos do cache de predições",
+            lambda: {
+                ("hit",): cache.hits,
+                ("miss",): cache.misses,
+                ("eviction",): cache.evictions,
+                ("expiration",): cache.expirations
+            },
+            labelnames=("event",),
+            type="counter"
+        )
+        metrics_registry.callback("prediction_cache_size", "Entradas no cache de predições", lambda: len(cache._entries))
+        metrics_registry.callback(
+            "feature_store_lookups_total",
+            "Buscas no feature store por resultado",
+            lambda: self.feature_store and {
+                ("hit",): self.feature_store.lookups - self.feature_store.misses,
+                ("miss",): self.feature_store.misses
+            },
+            labelnames=("result",),
+            type="counter"
+        )
+
+    @property
+    def _model_loaded(self) -> bool:
+        return self._active is not None
+
+    @property
+    def _model(self):
+        return self._active.model if self._active else None
+
+    def _get_batcher(self) -> PredictionBatcher:
+        """Cria sob demanda o micro-batcher configurado por variáveis de ambiente."""
+        if self._batcher is None:
+            self._batcher = PredictionBatcher(
+                predict_fn=lambda model, X: model.predict_scaled(X),
+                max_batch_size=int(os.getenv("MODEL_BATCH_MAX_SIZE", "32")),
+                max_wait_us=int(os.getenv("MODEL_BATCH_MAX_WAIT_US", "2000"))
+            )
+        return self._batcher
+
+    def _resolve_target(self) -> ModelTarget:
+        """Consulta o registry para descobrir a versão ativa (bloqueante)."""
+        aws_service = AWSService()
+
+        if not aws_service.is_configured():
+            raise ValueError("AWS não configurado")
+
+        return self.registry.resolve(aws_service.s3_client, aws_service.bucket)
     
-    async def load_model(self) -> bool:
+    def _load_model_sync(self, target: Optional[ModelTarget] = None) -> LoadedModel:
         """
-        Carrega o modelo do S3.
-        
+        Carrega uma versão do modelo usando o cache local em disco (bloqueante).
+
+        O arquivo em cache é chaveado pela versão e pelo ETag do S3: se o
+        objeto não mudou, o download é evitado. Com MODEL_MMAP habilitado, o
+        artefato é regravado uma única vez sem compressão e carregado com
+        `mmap_mode='r'`, de modo que os arrays NumPy do modelo ficam no page
+        cache e são compartilhados entre os workers do uvicorn. Com
+        MODEL_COMPILE habilitado, o estimador também é compilado para arrays
+        planos (`compile_model`), fora do caminho das requisições.
+
+        Args:
+            target: Versão a carregar (padrão: versão ativa no registry)
+
+        Returns:
+            Modelo carregado com seus metadados
+        """
+        started = time.perf_counter()
+        target = target or self._resolve_target()
+        cache_path = self._cache_path(target)
+
+        if cache_path.exists():
+            print(f"✅ Modelo encontrado no cache local: {cache_path}")
+        else:
+            self._download_artifact(target, cache_path)
+
+        # Carregar modelo
+        if self.mmap_enabled:
+            model = joblib.load(cache_path, mmap_mode="r")
+        else:
+            model = joblib.load(cache_path)
+
+        compiled = compile_model(model, FEATURE_MIN, FEATURE_RANGE) if self.compile_enabled else None
+
+        return LoadedModel(
+            model,
+            target,
+            time.perf_counter() - started,
+            path=cache_path,
+            mmap=self.mmap_enabled,
+            compiled=compiled
+        )
+
+    def _cache_path(self, target: ModelTarget) -> Path:
+        """Caminho do artefato no cache local para uma versão do modelo."""
+        suffix = ".mmap.joblib" if self.mmap_enabled else ".joblib"
+        return self.cache_dir / f"{Path(target.key).stem}-{target.version}-{target.etag}{suffix}"
+
+    def _download_artifact(self, target: ModelTarget, cache_path: Path):
+        """
+        Baixa o artefato do S3 direto para o disco (sem cópia extra em memória).
+
+        Os arquivos temporários levam o PID no nome e são publicados com
+        os.replace, então workers concorrentes nunca leem um artefato parcial.
+        """
+        aws_service = AWSService()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+
+        aws_service.s3_client.download_file(aws_service.bucket, target.key, str(tmp_path))
+
+        if self.mmap_enabled:
+            # O artefato publicado pode estar comprimido: regravá-lo sem
+            # compressão permite carregar os arrays via memory map
+            raw_path = tmp_path
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.mmap.tmp")
+            joblib.dump(joblib.load(raw_path), tmp_path)
+            raw_path.unlink(missing_ok=True)
+
+        os.replace(tmp_path, cache_path)
+
+    def _cleanup_cache(self):
+        """
+        Remove do cache local as versões antigas do modelo ativo.
+
+        O diretório é compartilhado pelos workers do uvicorn, então só são
+        removidos artefatos do mesmo modelo gravados antes do ativo (um
+        worker pode ter baixado uma versão mais nova) e que nenhum processo
+        esteja lendo ou mantenha mapeados em memória.
+        """
+        active = self._active
+        if active is None or active.path is None or not self.cache_dir.exists():
+            return
+        try:
+            active_mtime = active.path.stat().st_mtime
+        except OSError:
+            return
+
+        in_use = paths_in_use(self.cache_dir)
+        for path in self.cache_dir.glob(f"{Path(active.key).stem}-*.joblib"):
+            if path == active.path or path.resolve() in in_use:
+                continue
+            try:
+                if path.stat().st_mtime >= active_mtime:
+                    continue
+            except OSError:
+                continue
+            path.unlink(missing_ok=True)
+
+    def _get_load_lock(self) -> asyncio.Lock:
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        return self._load_lock
+
+    def _retry_in(self) -> float:
+        """Segundos restantes até que uma nova tentativa de carga seja permitida."""
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def _activate(self, loaded: LoadedModel):
+        """Troca o modelo ativo em uma única atribuição (requisições em andamento mantêm o anterior)."""
+        previous = self._active
+        self._active = loaded
+        self._load_failures = 0
+        self._retry_at = 0.0
+        self._last_error = None
+        if previous is not None:
+            self._reloads += 1
+        MODEL_LOAD_SECONDS.observe(loaded.load_seconds)
+        self.prediction_cache.clear()
+        print(f"✅ Modelo {loaded.version} carregado do S3: {loaded.key}")
+        self._cleanup_cache()
+
+    def _record_failure(self, error: Exception):
+        """Registra a falha e agenda a próxima tentativa (negative caching com backoff)."""
+        self._load_failures += 1
+        self._last_error = str(error)
+        MODEL_LOAD_FAILURES.inc()
+
+        delay = min(
+            self.retry_backoff * (2 ** (self._load_failures - 1)),
+            self.retry_backoff_max
+        )
+        self._retry_at = time.monotonic() + delay
+
+        print(f"⚠️ Erro ao carregar modelo (nova tentativa em {delay:.0f}s): {str(error)}")
+
+    async def load_model(self, force: bool = False) -> bool:
+        """
+        Carrega o modelo do S3 (ou do cache local em disco).
+
+        Chamadas concorrentes compartilham a mesma carga (single-flight). Após
+        uma falha, novas tentativas só acontecem depois de um backoff
+        exponencial, a menos que `force` seja True.
+
+        Args:
+            force: Ignora o backoff de falhas anteriores
+
         Returns:
             True se carregado com sucesso, False caso contrário
         """
         if self._model_loaded:
             return True
-        
-        try:
-            aws_service = AWSService()
-            
-            if not aws_service.is_configured():
-                raise ValueError("AWS não configurado")
-            
-            # Download do modelo do S3
-            response = aws_service.s3_client.get_object(
-                Bucket=aws_service.bucket,
-                Key=self.model_key
-            )
-            
-            model_bytes = response['Body'].read()
-            model_buffer = io.BytesIO(model_bytes)
-            
-            # Carregar modelo
-            self._model = joblib.load(model_buffer)
-            self._model_loaded = True
-            
-            print(f"✅ Modelo carregado do S3: {self.model_key}")
+
+        if not force and self._retry_in() > 0:
+            return False
+
+        async with self._get_load_lock():
+            # Outra chamada pode ter concluído (ou falhado) a carga enquanto esperávamos
+            if self._model_loaded:
+                return True
+            if not force and self._retry_in() > 0:
+                return False
+
+            try:
+                # Download e unpickle são bloqueantes: executados no thread pool
+                self._activate(await run_blocking(self._load_model_sync))
+                loaded = True
+            except Exception as e:
+                self._record_failure(e)
+                loaded = False
+
+        await self.refresh_feature_store()
+        return loaded
+
+    def _refresh_feature_store_sync(self) -> bool:
+        """
+        Carrega o feature store se ele mudou (bloqueante).
+
+        Com FEATURE_STORE_PATH o arquivo local é usado diretamente; caso
+        contrário, o objeto FEATURE_STORE_KEY é baixado para o cache local
+        (chaveado pelo ETag, então só é baixado quando muda).
+
+        Returns:
+            True se uma nova versão foi carregada
+        """
+        if self.feature_store_path:
+            path = Path(self.feature_store_path)
+            if not path.exists():
+                return False
+            version = str(path.stat().st_mtime_ns)
+            if self.feature_store is not None and self.feature_store.etag == version:
+                return False
+            self.feature_store = FeatureStore(str(path), etag=version)
+            print(f"✅ Feature store carregado: {path} ({len(self.feature_store)} entradas)")
             return True
-            
+
+        aws_service = AWSService()
+        if not aws_service.is_configured():
+            return False
+        try:
+            head = aws_service.s3_client.head_object(Bucket=aws_service.bucket, Key=self.feature_store_key)
+        except ClientError as e:
+            if str(e.response.get("Error", {}).get("Code", "")) in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+        etag = head["ETag"].strip('"')
+        if self.feature_store is not None and self.feature_store.etag == etag:
+            return False
+
+        cache_path = self.cache_dir / f"feature_stats-{etag}.arrow"
+        if not cache_path.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            aws_service.s3_client.download_file(aws_service.bucket, self.feature_store_key, str(tmp_path))
+            os.replace(tmp_path, cache_path)
+
+        self.feature_store = FeatureStore(str(cache_path), etag=etag)
+        for path in self.cache_dir.glob("feature_stats-*.arrow"):
+            if path != cache_path:
+                path.unlink(missing_ok=True)
+        print(f"✅ Feature store carregado do S3: {self.feature_store_key} ({len(self.feature_store)} entradas)")
+        return True
+
+    async def refresh_feature_store(self) -> bool:
+        """Recarrega o feature store no thread pool; falhas mantêm a versão anterior."""
+        try:
+            changed = await run_blocking(self._refresh_feature_store_sync)
+            self._feature_store_error = None
+            return changed
         except Exception as e:
-            print(f"⚠️ Erro ao carregar modelo: {str(e)}")
-            self._model_loaded = False
+            self._feature_store_error = str(e)
+            print(f"⚠️ Erro ao carregar feature store: {str(e)}")
             return False
+
+    def impute_features(
+        self,
+        X: np.ndarray,
+        contexts: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[np.ndarray, List[Dict[str, str]]]:
+        """
+        Preenche features ausentes (NaN) com o feature store.
+
+        Args:
+            X: Matriz (n, 9) de features brutas, com NaN nas ausentes
+            contexts: station, city, state, country e aqi de cada linha (opcionais)
+
+        Returns:
+            Tupla (matriz preenchida, {feature: estatística usada} por linha)
+
+        Raises:
+            ValueError: Se houver features ausentes que não puderam ser imputadas
+        """
+        X = np.array(X, dtype=np.float64)
+        sources: List[Dict[str, str]] = [{} for _ in range(len(X))]
+        missing_rows = np.flatnonzero(np.isnan(X).any(axis=1))
+        if len(missing_rows) == 0:
+            return X, sources
+
+        store = self.feature_store
+        if store is None:
+            raise ValueError("Features ausentes e nenhum feature store carregado para imputação")
+
+        for row in missing_rows:
+            context = contexts[row] if contexts else {}
+            X[row], sources[row] = store.impute(X[row], context)
+            if np.isnan(X[row]).any():
+                names = [FEATURE_NAMES[i] for i in np.flatnonzero(np.isnan(X[row]))]
+                raise ValueError(f"Sem estatística para imputar {', '.join(names)} (linha {int(row)})")
+        return X, sources
+
+    async def check_for_update(self) -> bool:
+        """
+        Verifica no registry se há uma nova versão e faz o hot reload.
+
+        O novo modelo é carregado no thread pool, fora do caminho das
+        requisições, e só então substitui o ativo.
+
+        Returns:
+            True se uma nova versão foi ativada
+        """
+        async with self._get_load_lock():
+            self._last_check = datetime.utcnow()
+            target = await run_blocking(self._resolve_target)
+
+            active = self._active
+            if active is not None and (active.version, active.etag) == (target.version, target.etag):
+                return False
+
+            try:
+                self._activate(await run_blocking(self._load_model_sync, target))
+                return True
+            except Exception as e:
+                self._record_failure(e)
+                return False
+
+    async def _watch(self):
+        """Loop do watcher: verifica periodicamente o registry."""
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            if not AWSService().is_configured():
+                continue
+            try:
+                await self.check_for_update()
+            except Exception as e:
+                print(f"⚠️ Erro ao verificar nova versão do modelo: {str(e)}")
+            await self.refresh_feature_store()
+
+    def start_watcher(self):
+        """Inicia o watcher de novas versões (MODEL_WATCH_INTERVAL=0 desativa)."""
+        if self.watch_interval > 0 and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
     
     async def predict(self, features: List[float]) -> int:
         """
@@ -79,14 +844,99 @@ class ModelService:
         if len(features) != 9:
             raise ValueError(f"Esperado 9 features, recebido {len(features)}")
         
-        # Converter para array numpy e reshape
-        X = np.array(features).reshape(1, -1)
-        
-        # Fazer predição
-        prediction = self._model.predict(X)
-        
-        return int(prediction[0])
+        # Leituras repetidas para a mesma versão do modelo saem do cache
+        cache = self.prediction_cache
+        active = self._active
+        if cache.enabled:
+            cache_key = cache.key(f"{active.version}:{active.etag}", features)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Com micro-batching, a linha é agrupada com outras chamadas concorrentes,
+        # mas prevista pelo mesmo modelo usado na chave do cache
+        if self.batching_enabled:
+            prediction = await self._get_batcher().submit(np.asarray(features, dtype=np.float64), active)
+        else:
+            # Converter para array numpy e reshape
+            X = np.array(features).reshape(1, -1)
+
+            # Fazer predição (sklearn é bloqueante: executado no thread pool)
+            started = time.perf_counter()
+            prediction = int((await run_blocking(active.predict_scaled, X))[0])
+            MODEL_INFERENCE_SECONDS.observe(time.perf_counter() - started, "single")
+
+        if cache.enabled:
+            cache.put(cache_key, prediction)
+        return prediction
     
+    @staticmethod
+    def scale_features(X: np.ndarray) -> np.ndarray:
+        """
+        Aplica o Min-Max Scaling do treinamento a uma matriz de features brutas.
+
+        Args:
+            X: Matriz (n, 9) com as features na ordem de FEATURE_NAMES
+
+        Returns:
+            Matriz (n, 9) normalizada
+        """
+        return (X - FEATURE_MIN) / FEATURE_RANGE
+
+    async def predict_batch(self, X: np.ndarray, chunk_size: int = None) -> np.ndarray:
+        """
+        Realiza predições para uma matriz de features brutas (não normalizadas).
+
+        A normalização é feita de uma vez sobre a matriz inteira e o modelo é
+        chamado uma única vez por bloco de linhas.
+
+        Args:
+            X: Matriz (n, 9) com as features na ordem de FEATURE_NAMES
+            chunk_size: Número máximo de linhas por chamada ao modelo
+
+        Returns:
+            Vetor de predições (n,) com 0 (Saudável), 1 (Atenção) ou 2 (Perigoso)
+        """
+        if not self._model_loaded:
+            loaded = await self.load_model()
+            if not loaded:
+                raise ValueError("Modelo não pôde ser carregado")
+
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_NAMES):
+            raise ValueError(f"Esperado matriz (n, {len(FEATURE_NAMES)}), recebido {X.shape}")
+
+        chunk_size = chunk_size or int(os.getenv("MODEL_BATCH_CHUNK_SIZE", "10000"))
+        return await run_blocking(self._predict_chunks, self._active, X, chunk_size)
+
+    def _predict_chunks(self, active: LoadedModel, X: np.ndarray, chunk_size: int) -> np.ndarray:
+        """
+        Normaliza e prediz a matriz bloco a bloco (bloqueante).
+
+        O modelo compilado normaliza cada bloco na própria chamada; sem ele,
+        a matriz inteira é normalizada antes do `predict` do sklearn.
+        """
+        compiled = active.compiled
+        X_input = X if compiled is not None else self.scale_features(X)
+
+        predictions = []
+        for start in range(0, len(X_input), chunk_size):
+            chunk = X_input[start:start + chunk_size]
+            started = time.perf_counter()
+            predictions.append(compiled.predict(chunk) if compiled is not None else active.model.predict(chunk))
+            MODEL_INFERENCE_SECONDS.observe(time.perf_counter() - started, "batch")
+            MODEL_BATCH_SIZE.observe(len(chunk), "batch")
+
+        if not predictions:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(predictions).astype(np.int64)
+
+    def get_batching_stats(self) -> Dict[str, Any]:
+        """Retorna as métricas do micro-batcher (ou apenas se está habilitado)."""
+        if self._batcher is None:
+            return {"enabled": self.batching_enabled}
+        return self._batcher.stats()
+
     async def get_status(self) -> Dict[str, Any]:
         """
         Retorna status do modelo.
@@ -94,21 +944,32 @@ class ModelService:
         Returns:
             Dicionário com informações do status
         """
-        if not self._model_loaded:
-            await self.load_model()
-        
+        # O status nunca dispara a carga do modelo: ela acontece no startup
+        # (lifespan) ou na primeira predição, respeitando o backoff de falhas
+        active = self._active
         return {
-            "loaded": self._model_loaded,
-            "status": "ready" if self._model_loaded else "not_loaded",
-            "model_path": self.model_key,
-            "features_expected": 9,
-            "feature_names": [
-                "pm25", "pm10", "no2", "so2", "co", 
-                "temperature", "pressure", "humidity", "wind"
-            ],
+            "loaded": active is not None,
+            "status": "ready" if active is not None else "not_loaded",
+            "model_path": active.key if active else self.model_key,
+            **(active.to_dict() if active else {}),
+            "reloads": self._reloads,
+            "last_check": self._last_check.isoformat() if self._last_check else None,
+            "watch_interval_seconds": self.watch_interval,
+            "last_error": self._last_error,
+            "retry_in_seconds": round(self._retry_in(), 1) if active is None else None,
+            "features_expected": len(FEATURE_NAMES),
+            "feature_names": FEATURE_NAMES,
+            "batching": self.get_batching_stats(),
+            "prediction_cache": self.prediction_cache.stats(),
+            "feature_store": {
+                "loaded": self.feature_store is not None,
+                "source": self.feature_store_path or self.feature_store_key,
+                **(self.feature_store.to_dict() if self.feature_store else {}),
+                "last_error": self._feature_store_error
+            },
             "output_classes": {
                 "0": "Saudável",
                 "1": "Atenção",
                 "2": "Perigoso"
             }
-        }
\ No newline at end of file
+        }
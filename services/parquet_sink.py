@@ -0,0 +1,215 @@
+import io
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from services.schema import STATION_SCHEMA, normalize_record
+
+
+# Tamanho mínimo de uma parte de multipart upload no S3 (exceto a última)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Arquivo somente-escrita que envia os bytes ao S3 via multipart upload.
+
+    Os bytes ficam em um buffer até atingirem `part_size`; cada parte cheia é
+    enviada imediatamente, então a memória usada fica limitada a uma parte.
+    Se o arquivo for fechado antes da primeira parte, um único put_object é usado.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, part_size: int = MIN_PART_SIZE):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict[str, Any]] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("Arquivo já foi fechado")
+
+        self._buffer += data
+        self.bytes_written += len(data)
+
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+
+        return len(data)
+
+    @property
+    def parts_uploaded(self) -> int:
+        return len(self._parts)
+
+    def _upload_part(self, body: bytes):
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+            self._upload_id = response["UploadId"]
+
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+    def close(self):
+        """Envia o restante do buffer e conclui o upload."""
+        if self.closed:
+            return
+
+        try:
+            if self._upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts}
+                )
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+    def abort(self):
+        """Descarta o upload (nenhum objeto é criado no S3)."""
+        if self._upload_id is not None:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        self._buffer = bytearray()
+        super().close()
+
+
+class ParquetStreamSink:
+    """
+    Grava registros de estação em Parquet no S3 de forma incremental.
+
+    Cada lote recebido vira uma record batch do Arrow, gravada por um
+    `pyarrow.parquet.ParquetWriter` diretamente em um multipart upload. Ao
+    atingir `roll_rows` linhas, ou `roll_seconds` segundos desde o último
+    arquivo finalizado, o arquivo atual é finalizado (e fica visível no S3) e
+    um novo é iniciado, para que uma falha no meio da coleta não perca o que
+    já foi gravado.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        key_prefix: str,
+        schema: pa.Schema = STATION_SCHEMA,
+        compression: str = "snappy",
+        part_size: int = MIN_PART_SIZE,
+        roll_rows: int = 0,
+        roll_seconds: float = 0
+    ):
+        """
+        Args:
+            s3_client: Cliente boto3 do S3
+            bucket: Bucket de destino
+            key_prefix: Chave sem extensão (ex.: 'raw/date=2025-10-07/aqi-data-12-00-00')
+            schema: Schema Arrow dos registros
+            compression: Codec do Parquet
+            part_size: Tamanho das partes do multipart upload (mínimo 5 MB)
+            roll_rows: Linhas por arquivo antes de iniciar um novo (0 = sem limite)
+            roll_seconds: Intervalo máximo entre arquivos finalizados (0 = sem limite)
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key_prefix = key_prefix
+        self.schema = schema
+        self.compression = compression
+        self.part_size = part_size
+        self.roll_rows = roll_rows
+        self.roll_seconds = roll_seconds
+        self.default_date = datetime.utcnow()
+        self.keys: List[str] = []
+        self.rows_written = 0
+        self.bytes_written = 0
+        self._file: Optional[S3MultipartWriter] = None
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._file_rows = 0
+        self._rolled_at = time.monotonic()
+
+    def _next_key(self) -> str:
+        suffix = f"-{len(self.keys):04d}" if self.keys else ""
+        return f"{self.key_prefix}{suffix}.{self.compression}.parquet"
+
+    def _open(self):
+        key = self._next_key()
+        self._file = S3MultipartWriter(self.s3_client, self.bucket, key, self.part_size)
+        self._writer = pq.ParquetWriter(self._file, self.schema, compression=self.compression)
+        self._file_rows = 0
+        self.keys.append(key)
+
+    def _finalize(self):
+        """Grava o footer do Parquet e conclui o upload do arquivo atual."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._file.close()
+        self.bytes_written += self._file.bytes_written
+        print(f"✅ Arquivo salvo em s3://{self.bucket}/{self._file.key}")
+        self._writer, self._file = None, None
+        self._rolled_at = time.monotonic()
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        """
+        Grava um lote de registros como uma record batch (bloqueante).
+
+        Args:
+            rows: Registros produzidos pelo scraper
+        """
+        if not rows:
+            return
+
+        if self._writer is None:
+            self._open()
+
+        batch = pa.RecordBatch.from_pylist(
+            [normalize_record(row, self.default_date) for row in rows],
+            schema=self.schema
+        )
+        self._writer.write_batch(batch)
+        self.rows_written += len(rows)
+        self._file_rows += len(rows)
+
+        if (self.roll_rows and self._file_rows >= self.roll_rows) or (
+            self.roll_seconds and time.monotonic() - self._rolled_at >= self.roll_seconds
+        ):
+            self._finalize()
+
+    def close(self) -> List[str]:
+        """
+        Finaliza o arquivo em andamento.
+
+        Returns:
+            Chaves S3 dos arquivos gravados
+        """
+        self._finalize()
+        return self.keys
+
+    def abort(self):
+        """Descarta o arquivo em andamento (os arquivos já finalizados permanecem)."""
+        if self._file is not None:
+            self._file.abort()
+            self.keys.pop()
+        self._writer, self._file = None, None
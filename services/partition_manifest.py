@@ -0,0 +1,182 @@
+import os
+import time
+import asyncio
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from services.aws_service import AWSService
+from services.executor import run_blocking
+
+
+# Bytes lidos do fim do arquivo na primeira tentativa (footers costumam ser bem menores)
+FOOTER_READ_BYTES = 64 * 1024
+PARQUET_MAGIC = b"PAR1"
+
+
+def read_parquet_metadata(s3_client, bucket: str, key: str, size: int) -> pq.FileMetaData:
+    """
+    Lê apenas o footer de um arquivo Parquet no S3 via GET com Range.
+
+    Uma requisição busca os últimos FOOTER_READ_BYTES; se o footer for maior,
+    uma segunda requisição busca exatamente o tamanho indicado no arquivo.
+
+    Args:
+        s3_client: Cliente boto3 do S3
+        bucket: Bucket do arquivo
+        key: Chave do arquivo
+        size: Tamanho do arquivo em bytes
+
+    Returns:
+        Metadados do Parquet (linhas, row groups, schema)
+    """
+    length = min(size, FOOTER_READ_BYTES)
+    tail = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{length}")["Body"].read()
+    if tail[-4:] != PARQUET_MAGIC:
+        raise ValueError(f"{key} não é um arquivo Parquet")
+
+    footer_length = int.from_bytes(tail[-8:-4], "little") + 8
+    if footer_length > len(tail):
+        tail = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{footer_length}")["Body"].read()
+
+    return pq.read_metadata(pa.BufferReader(tail[-footer_length:]))
+
+
+class PartitionManifest:
+    """
+    Manifest das partições `date=` dos dados coletados no S3.
+
+    Para cada partição: quantidade de arquivos, bytes e linhas (somadas dos
+    footers Parquet). Os footers ficam em cache por (chave, ETag), então
+    reconstruir o manifest só lê os arquivos novos; o manifest completo fica
+    em cache por PARTITION_MANIFEST_TTL segundos por intervalo de datas.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PartitionManifest, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.ttl = float(os.getenv("PARTITION_MANIFEST_TTL", "300"))
+            self._footer_rows: Dict[Tuple[str, str], int] = {}
+            self._manifests: Dict[Tuple[Optional[str], Optional[str], str], Tuple[float, Dict[str, Any]]] = {}
+            self._lock: Optional[asyncio.Lock] = None
+            self._lock_loop = None
+            self.initialized = True
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _read_rows(self, aws_service: AWSService, obj: Dict[str, Any]) -> Optional[int]:
+        try:
+            metadata = read_parquet_metadata(aws_service.s3_client, aws_service.bucket, obj["key"], obj["size"])
+            return metadata.num_rows
+        except Exception as e:
+            print(f"⚠️ Erro ao ler footer de {obj['key']}: {str(e)}")
+            return None
+
+    def build(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Lista as partições e monta o manifest (bloqueante).
+
+        Args:
+            start_date: Primeira data (inclusive, YYYY-MM-DD)
+            end_date: Última data (inclusive, YYYY-MM-DD)
+
+        Returns:
+            Manifest com totais e uma entrada por partição
+        """
+        aws_service = AWSService()
+        started = time.perf_counter()
+        objects = aws_service.list_objects(start_date, end_date)
+
+        parquet_files = [obj for date in objects for obj in objects[date] if obj["key"].endswith(".parquet")]
+        missing = [obj for obj in parquet_files if (obj["key"], obj["etag"]) not in self._footer_rows]
+        footer_errors = 0
+        if missing:
+            workers = min(len(missing), int(os.getenv("S3_LIST_CONCURRENCY", "16")))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-footer") as executor:
+                for obj, rows in zip(missing, executor.map(lambda obj: self._read_rows(aws_service, obj), missing)):
+                    if rows is None:
+                        footer_errors += 1
+                    else:
+                        self._footer_rows[(obj["key"], obj["etag"])] = rows
+
+        # Descarta footers de arquivos que não existem mais (ex.: após compactação)
+        live = {(obj["key"], obj["etag"]) for obj in parquet_files}
+        if start_date is None and end_date is None:
+            self._footer_rows = {key: rows for key, rows in self._footer_rows.items() if key in live}
+
+        partitions: List[Dict[str, Any]] = []
+        for date in sorted(objects):
+            files = [obj for obj in objects[date] if obj["key"].endswith(".parquet")]
+            rows = [self._footer_rows.get((obj["key"], obj["etag"])) for obj in files]
+            partitions.append({
+                "date": date,
+                "files": len(files),
+                "bytes": sum(obj["size"] for obj in files),
+                "rows": sum(r for r in rows if r is not None),
+                "rows_complete": all(r is not None for r in rows),
+                "last_modified": max(obj["last_modified"] for obj in files).isoformat() if files else None
+            })
+
+        return {
+            "bucket": aws_service.bucket,
+            "prefix": aws_service.prefix,
+            "start_date": start_date,
+            "end_date": end_date,
+            "generated_at": datetime.utcnow().isoformat(),
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "footers_read": len(missing),
+            "footer_errors": footer_errors,
+            "totals": {
+                "partitions": len(partitions),
+                "files": sum(p["files"] for p in partitions),
+                "bytes": sum(p["bytes"] for p in partitions),
+                "rows": sum(p["rows"] for p in partitions)
+            },
+            "partitions": partitions
+        }
+
+    async def get(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Retorna o manifest do intervalo, reconstruindo-o se o cache venceu.
+
+        Args:
+            start_date: Primeira data (inclusive, YYYY-MM-DD)
+            end_date: Última data (inclusive, YYYY-MM-DD)
+            refresh: Ignora o cache e relista o bucket
+
+        Returns:
+            Manifest das partições, com `cached` e `age_seconds`
+        """
+        aws_service = AWSService()
+        if not aws_service.is_configured():
+            raise ValueError("Serviço AWS não está configurado")
+
+        cache_key = (start_date, end_date, f"{aws_service.bucket}/{aws_service.prefix}")
+        async with self._get_lock():
+            cached = self._manifests.get(cache_key)
+            if cached and not refresh and time.monotonic() - cached[0] < self.ttl:
+                return {**cached[1], "cached": True, "age_seconds": round(time.monotonic() - cached[0], 1)}
+
+            manifest = await run_blocking(self.build, start_date, end_date)
+            self._manifests[cache_key] = (time.monotonic(), manifest)
+            return {**manifest, "cached": False, "age_seconds": 0.0}
+
+    def invalidate(self):
+        """Descarta os manifests em cache (os footers continuam válidos por ETag)."""
+        self._manifests.clear()
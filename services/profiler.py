@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem que pode ser ligado e desligado em produção.
+
+    Uma thread daemon lê a pilha de todas as threads (`sys._current_frames`)
+    a cada `interval` segundos e acumula as pilhas no formato "collapsed"
+    (uma linha `thread;arquivo:função;... contagem`), aceito por
+    flamegraph.pl e speedscope. Desligado, não há custo algum; ligado, o
+    custo é proporcional à frequência de amostragem, não ao tráfego.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.default_interval = float(os.getenv("PROFILER_INTERVAL_MS", "10")) / 1000
+            self.max_depth = int(os.getenv("PROFILER_MAX_DEPTH", "64"))
+            self._lock = threading.Lock()
+            self._stacks_lock = threading.Lock()
+            self._stop = threading.Event()
+            self._thread: Optional[threading.Thread] = None
+            self._stacks: Counter = Counter()
+            self.samples = 0
+            self.interval = self.default_interval
+            self.started_at: Optional[datetime] = None
+            self.stopped_at: Optional[datetime] = None
+            self.deadline: Optional[float] = None
+            self.initialized = True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, duration: Optional[float] = None) -> bool:
+        """
+        Inicia a amostragem, descartando as pilhas da execução anterior.
+
+        Args:
+            interval: Segundos entre amostras (padrão: PROFILER_INTERVAL_MS)
+            duration: Para sozinho após N segundos (None ou 0 = até `stop`)
+
+        Returns:
+            False se o profiler já estava rodando
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = interval or self.default_interval
+            self.deadline = time.monotonic() + duration if duration else None
+            self._stacks = Counter()
+            self.samples = 0
+            self.started_at = datetime.utcnow()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        print(f"✅ Profiler iniciado (intervalo {self.interval * 1000:.1f}ms)")
+        return True
+
+    def stop(self) -> bool:
+        """Para a amostragem (as pilhas coletadas continuam disponíveis)."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def _frame_label(self, frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            with self._stacks_lock:
+                self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                break
+            self._sample(own_id)
+        self.stopped_at = datetime.utcnow()
+        print(f"✅ Profiler parado ({self.samples} amostras)")
+
+    def collapsed(self) -> str:
+        """Pilhas acumuladas no formato collapsed (mais frequentes primeiro)."""
+        with self._stacks_lock:
+            stacks = self._stacks.copy()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "stopped_at": self.stopped_at.isoformat() if self.stopped_at else None,
+            "stops_in_seconds": round(max(0.0, self.deadline - time.monotonic()), 1)
+            if self.running and self.deadline is not None else None
+        }
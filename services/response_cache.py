@@ -0,0 +1,259 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:  # brotli é opcional
+    BROTLI_AVAILABLE = False
+
+
+def _accepted_encodings(request: Request) -> Dict[str, float]:
+    """Codificações aceitas pelo cliente com seus pesos (q)."""
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+class CachedBody:
+    """
+    Corpo de resposta pré-calculado: bytes, variantes comprimidas e validadores.
+
+    As variantes gzip/brotli são geradas uma única vez (só acima de
+    `min_compress` bytes), e o ETag fraco é o mesmo para todas, já que
+    representam o mesmo conteúdo.
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        media_type: str,
+        last_modified: Optional[datetime] = None,
+        min_compress: int = 1024
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.last_modified = (last_modified or datetime.now(timezone.utc)).replace(microsecond=0)
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= min_compress:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if BROTLI_AVAILABLE:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def _not_modified(self, request: Request) -> bool:
+        """Avalia If-None-Match (prioritário) e If-Modified-Since."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _encoding(self, request: Request) -> Optional[str]:
+        """Melhor variante aceita pelo cliente (brotli, depois gzip)."""
+        if not self.variants:
+            return None
+        accepted = _accepted_encodings(request)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return None
+
+    def response(self, request: Request, cache_control: str, status_code: int = 200) -> Response:
+        """
+        Resposta completa ou 304, com a melhor codificação aceita.
+
+        Args:
+            request: Requisição (validadores e Accept-Encoding)
+            cache_control: Valor do cabeçalho Cache-Control
+            status_code: Status da resposta completa
+        """
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if self._not_modified(request):
+            return Response(status_code=304, headers=headers)
+
+        encoding = self._encoding(request)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(self.variants[encoding], status_code, headers, media_type=self.media_type)
+        return Response(self.body, status_code, headers, media_type=self.media_type)
+
+
+class PageCache:
+    """
+    Páginas HTML renderizadas uma única vez e servidas com ETag, Last-Modified,
+    compressão e 304.
+
+    Os templates não dependem da requisição (os dados vêm das chamadas à
+    API no navegador), então a renderização do Jinja2 sai do caminho da
+    requisição. Se o arquivo do template mudar (mtime), a página é
+    renderizada de novo na próxima requisição.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, directory: Optional[str] = None):
+        if not hasattr(self, 'initialized'):
+            self.directory = Path(directory or Path(__file__).resolve().parent.parent / "templates")
+            self.env = Environment(loader=FileSystemLoader(str(self.directory)), autoescape=select_autoescape())
+            self.cache_control = os.getenv("PAGE_CACHE_CONTROL", "public, max-age=60")
+            self.min_compress = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+            self._pages: Dict[str, Tuple[float, CachedBody]] = {}
+            self.initialized = True
+
+    def _render(self, name: str) -> CachedBody:
+        path = self.directory / name
+        mtime = path.stat().st_mtime
+        cached = self._pages.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        html = self.env.get_template(name).render().encode("utf-8")
+        page = CachedBody(
+            html,
+            "text/html; charset=utf-8",
+            last_modified=datetime.fromtimestamp(mtime, timezone.utc),
+            min_compress=self.min_compress
+        )
+        self._pages[name] = (mtime, page)
+        return page
+
+    def prerender(self, *names: str):
+        """Renderiza as páginas antecipadamente (ex.: no startup)."""
+        for name in names:
+            self._render(name)
+
+    def response(self, request: Request, name: str) -> Response:
+        return self._render(name).response(request, self.cache_control)
+
+
+class StatusCache:
+    """
+    Cache de curta duração dos payloads de status (`/api/aws/status`, `/api/model/status`).
+
+    Cada payload é gerado no máximo uma vez por `ttl` segundos (chamadas
+    concorrentes compartilham a mesma geração) e servido com
+    `Cache-Control: max-age`, ETag e 304, de modo que o polling das páginas
+    não refaz o trabalho a cada requisição. `invalidate` descarta a entrada
+    quando o estado muda por uma ação do usuário (ex.: reconfigurar o AWS).
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.ttl = float(os.getenv("STATUS_CACHE_TTL", "2"))
+            self.min_compress = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+            self._entries: Dict[str, Tuple[float, CachedBody]] = {}
+            self._pending: Dict[str, asyncio.Future] = {}
+            self.hits = 0
+            self.misses = 0
+            self.initialized = True
+
+    def invalidate(self, key: Optional[str] = None):
+        """Descarta um payload (ou todos)."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def _get(self, key: str, producer: Callable[[], Awaitable[Dict[str, Any]]]) -> CachedBody:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            self.hits += 1
+            return entry[1]
+
+        # Single-flight: uma única geração por chave em andamento
+        pending = self._pending.get(key)
+        if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            payload = await producer()
+            body = CachedBody(
+                json.dumps(payload, default=str).encode("utf-8"),
+                "application/json",
+                min_compress=self.min_compress
+            )
+            if self.ttl > 0:
+                self._entries[key] = (time.monotonic() + self.ttl, body)
+            future.set_result(body)
+            return body
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # evita o aviso de exceção não observada
+            raise
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    async def response(
+        self,
+        request: Request,
+        key: str,
+        producer: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Response:
+        """
+        Payload de status em cache (ou recém-gerado) com validadores e 304.
+
+        Args:
+            request: Requisição (validadores e Accept-Encoding)
+            key: Identificador do payload
+            producer: Corrotina que gera o payload quando o cache expirou
+        """
+        body = await self._get(key, producer)
+        return body.response(request, f"private, max-age={int(self.ttl)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ttl_seconds": self.ttl, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
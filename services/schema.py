@@ -0,0 +1,101 @@
+import pyarrow as pa
+from datetime import datetime
+from typing import Dict, Any, Optional, Union
+
+
+# Colunas dos registros de estação, na ordem gravada nos arquivos Parquet
+LOCATION_COLUMNS = ["station", "country", "state", "city"]
+
+MEASUREMENT_COLUMNS = [
+    "pm25", "pm10", "no2", "so2", "co",
+    "temperature", "pressure", "humidity", "wind"
+]
+
+STATION_COLUMNS = ["date", *LOCATION_COLUMNS, *MEASUREMENT_COLUMNS, "aqi"]
+
+# Schema fixo dos arquivos Parquet de coleta: medições numéricas, localização
+# e AQI dictionary-encoded (valores muito repetidos) e data como timestamp
+STATION_SCHEMA = pa.schema(
+    [("date", pa.timestamp("us"))]
+    + [(name, pa.dictionary(pa.int32(), pa.string())) for name in LOCATION_COLUMNS]
+    + [(name, pa.float32()) for name in MEASUREMENT_COLUMNS]
+    + [("aqi", pa.dictionary(pa.int32(), pa.string()))]
+)
+
+# Textos usados pelo site quando a medição não está disponível
+_MISSING_VALUES = {"", "-", "--", "n/a", "na", "no data"}
+
+
+def parse_measurement(value: Union[str, float, int, None]) -> Optional[float]:
+    """
+    Converte o texto de uma medição (ex.: ' 12,5 ') para float.
+
+    Args:
+        value: Texto extraído da página, número ou None
+
+    Returns:
+        Valor numérico ou None se ausente/inválido
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = value.strip()
+    if text.lower() in _MISSING_VALUES:
+        return None
+
+    try:
+        return float(text.replace(",", "."))
+    except ValueError:
+        return None
+
+
+def normalize_record(record: Dict[str, Any], default_date: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Ajusta um registro de estação ao schema de gravação.
+
+    Args:
+        record: Registro produzido pelo scraper
+        default_date: Data usada quando o registro não tem `date`
+
+    Returns:
+        Registro com todas as colunas do schema, `date` como datetime e medições como float
+    """
+    row = {name: record.get(name) for name in STATION_COLUMNS}
+
+    date = row["date"] or default_date or datetime.utcnow()
+    if isinstance(date, str):
+        date = datetime.fromisoformat(date)
+    row["date"] = date
+
+    for name in MEASUREMENT_COLUMNS:
+        row[name] = parse_measurement(row[name])
+
+    return row
+
+
+def conform_table(table: pa.Table) -> pa.Table:
+    """
+    Converte uma tabela lida de arquivos antigos (medições como texto, sem
+    dictionary) para STATION_SCHEMA.
+
+    Args:
+        table: Tabela lida de um arquivo Parquet de coleta
+
+    Returns:
+        Tabela com o schema atual (a própria tabela se já estiver conforme)
+    """
+    if table.schema.equals(STATION_SCHEMA):
+        return table
+    # Arquivos gravados com outro tipo de índice no dictionary (ex.: aqi
+    # com int8) só precisam de um cast, sem reprocessar cada registro
+    if table.schema.names == STATION_SCHEMA.names and all(
+        field.type.value_type == expected.type.value_type
+        if pa.types.is_dictionary(field.type) and pa.types.is_dictionary(expected.type)
+        else field.type == expected.type
+        for field, expected in zip(table.schema, STATION_SCHEMA)
+    ):
+        return table.cast(STATION_SCHEMA)
+    rows = [normalize_record(row) for row in table.to_pylist()]
+    return pa.Table.from_pylist(rows, schema=STATION_SCHEMA)
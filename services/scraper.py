@@ -1,117 +1,528 @@
-from datetime import datetime
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional, Union
-import requests
+from typing import List, Dict, Any, Optional, Tuple, Callable, AsyncIterator
+from urllib.parse import urlsplit
+from concurrent.futures import ProcessPoolExecutor
 import asyncio
+import multiprocessing
+import os
+import random
+import time
+import httpx
+from services.metrics import SCRAPER_FAILURES, SCRAPER_FETCH_SECONDS, SCRAPER_PARSE_SECONDS, SCRAPER_RETRIES
+from services.station_index import StationIndex, StationLink
+from services.station_state import StationStateStore
+from services.station_parser import extract_station_links, parse_station_page, resolve_engine
+
+
+class _HostRateLimiter:
+    """Limita a taxa de requisições por host (intervalo mínimo entre requisições)"""
+
+    def __init__(self, rate_per_second: float):
+        self.min_interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, host: str):
+        """Aguarda até que o host possa receber uma nova requisição."""
+        if not self.min_interval:
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 class AirQualityScraper:
     """Serviço de scraping de dados de qualidade do ar"""
-    
+
     BASE_URL = "https://aqicn.org/map/world/pt"
-    
-    @staticmethod
-    def _get_value(soup: BeautifulSoup, element_id: str) -> Optional[str]:
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        backoff: Optional[float] = None,
+        parser: Optional[str] = None,
+        parse_workers: Optional[int] = None
+    ):
         """
-        Extrai valor de um elemento <td> pelo ID.
-        
+        Configura o crawler concorrente.
+
         Args:
-            soup: Objeto BeautifulSoup
-            element_id: ID do elemento
-            
+            concurrency: Número máximo de estações baixadas em paralelo
+            rate_limit: Requisições por segundo permitidas por host (0 desativa)
+            max_retries: Tentativas extras por estação em caso de falha transitória
+            timeout: Timeout (segundos) de cada requisição de estação
+            backoff: Atraso base (segundos) do backoff exponencial entre tentativas
+            parser: Motor de extração do HTML das estações (auto, lxml, strainer ou bs4)
+            parse_workers: Processos de parse no modo pipeline (0 faz o parse em uma thread)
+        """
+        self.concurrency = concurrency or int(os.getenv("SCRAPER_CONCURRENCY", "10"))
+        self.rate_limit = rate_limit if rate_limit is not None else float(os.getenv("SCRAPER_RATE_LIMIT", "5"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SCRAPER_MAX_RETRIES", "3"))
+        self.timeout = timeout or float(os.getenv("SCRAPER_TIMEOUT", "10"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("SCRAPER_BACKOFF", "0.5"))
+        self.parser = resolve_engine(parser)
+        self.parse_workers = parse_workers if parse_workers is not None else int(os.getenv("SCRAPER_PARSE_WORKERS", "0"))
+        self.crawl_stats: Dict[str, Any] = {}
+
+    def _extract_station_links(self, content: bytes) -> List[Tuple[str, str]]:
+        """
+        Extrai (nome, url) das estações a partir da página do mapa mundial.
+
+        Args:
+            content: HTML da página do mapa
+
         Returns:
-            Valor textual ou None
+            Lista de tuplas (nome da estação, URL)
         """
-        td = soup.find('td', {"id": element_id})
-        if td:
-            return td.text.strip()
-        return None
-    
-    def _parse_station_data(self, station_name: str, station_url: str) -> Dict[str, Any]:
+        return extract_station_links(content, self.parser)
+
+    def _parse_station_data(self, station_name: str, station_url: str, content: bytes) -> Dict[str, Any]:
         """
-        Realiza o scraping de uma estação específica.
-        
+        Extrai os dados de uma estação a partir do HTML da sua página.
+
         Args:
             station_name: Nome da estação
             station_url: URL da página da estação
-            
+            content: HTML da página da estação
+
         Returns:
             Dados formatados da estação
         """
-        response = requests.get(station_url, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extrair localização da URL
-        parts = station_url.split('/city/')[-1].split('/')
-        country = parts[0] if len(parts) > 0 else "N/A"
-        state = parts[1] if len(parts) > 1 else "N/A"
-        city = parts[2] if len(parts) > 2 else "N/A"
-        
-        # Extrair AQI
-        aqivalue = soup.find('div', class_='aqivalue')
-        aqi = aqivalue.attrs.get('title', "N/A") if aqivalue else "N/A"
-        
-        return {
-            'date': datetime.now().isoformat(),
-            'station': station_name,
-            'country': country,
-            'state': state,
-            'city': city,
-            'pm25': self._get_value(soup, 'cur_pm25'),
-            'pm10': self._get_value(soup, 'cur_pm10'),
-            'no2': self._get_value(soup, 'cur_no2'),
-            'so2': self._get_value(soup, 'cur_so2'),
-            'co': self._get_value(soup, 'cur_co'),
-            'temperature': self._get_value(soup, 'cur_t'),
-            'pressure': self._get_value(soup, 'cur_p'),
-            'humidity': self._get_value(soup, 'cur_h'),
-            'wind': self._get_value(soup, 'cur_w'),
-            'aqi': aqi
+        return parse_station_page(station_name, station_url, content, engine=self.parser)
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Cria o cliente HTTP compartilhado por todas as requisições de um crawl."""
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency
+            ),
+            follow_redirects=True
+        )
+
+    async def _fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        limiter: _HostRateLimiter,
+        timeout: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Baixa uma URL respeitando o rate limit do host, com retries e backoff exponencial.
+
+        Args:
+            client: Cliente HTTP compartilhado
+            url: URL a ser baixada
+            limiter: Rate limiter por host
+            timeout: Timeout específico da requisição (opcional)
+            headers: Cabeçalhos extras (ex.: validadores de requisição condicional)
+
+        Returns:
+            Resposta HTTP com status de sucesso (ou 304 em requisições condicionais)
+        """
+        host = urlsplit(url).netloc
+        attempt = 0
+
+        while True:
+            await limiter.acquire(host)
+            try:
+                response = await client.get(url, timeout=timeout or self.timeout, headers=headers)
+                if response.status_code == 304:
+                    return response
+                if response.status_code not in self.RETRY_STATUS:
+                    response.raise_for_status()
+                    return response
+                error: Exception = httpx.HTTPStatusError(
+                    f"HTTP {response.status_code}", request=response.request, response=response
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt >= self.max_retries:
+                raise error
+
+            # Backoff exponencial com jitter
+            SCRAPER_RETRIES.inc()
+            delay = self.backoff * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            attempt += 1
+
+    @staticmethod
+    def _station_failed(
+        station_name: str,
+        error: Exception,
+        on_station: Optional[Callable[[str, Optional[str]], None]] = None,
+        stage: str = "fetch"
+    ):
+        SCRAPER_FAILURES.inc(stage, type(error).__name__)
+        print(f"⚠️ Erro ao processar {station_name}: {str(error)}")
+        if on_station:
+            on_station(station_name, str(error) or type(error).__name__)
+
+    async def _fetch_station(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        limiter: _HostRateLimiter,
+        station_name: str,
+        station_url: str,
+        on_station: Optional[Callable[[str, Optional[str]], None]] = None,
+        state: Optional[StationStateStore] = None
+    ) -> Optional[bytes]:
+        """
+        Baixa o HTML de uma estação.
+
+        No modo incremental (`state`), a requisição é condicional e páginas
+        não modificadas contam como processadas sem passar pelo parse.
+
+        Returns:
+            HTML da página, ou None em caso de erro ou página não modificada
+        """
+        headers = state.validators(station_url) if state else None
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self._fetch(client, station_url, limiter, headers=headers)
+            except Exception as e:
+                SCRAPER_FETCH_SECONDS.observe(time.perf_counter() - started, "error")
+                self._station_failed(station_name, e, on_station)
+                return None
+            SCRAPER_FETCH_SECONDS.observe(
+                time.perf_counter() - started,
+                "not_modified" if response.status_code == 304 else "ok"
+            )
+
+        if state is not None and not state.check_response(
+            station_url,
+            response.status_code,
+            response.content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified")
+        ):
+            self.crawl_stats["unchanged"] += 1
+            if on_station:
+                on_station(station_name, None)
+            return None
+
+        return response.content
+
+    def _accept_record(
+        self,
+        station_name: str,
+        station_url: str,
+        data: Dict[str, Any],
+        on_station: Optional[Callable[[str, Optional[str]], None]] = None,
+        state: Optional[StationStateStore] = None
+    ) -> bool:
+        """Registra a estação processada e indica se a leitura deve ser entregue."""
+        if on_station:
+            on_station(station_name, None)
+        if state is not None and not state.check_reading(station_url, data):
+            self.crawl_stats["unchanged"] += 1
+            return False
+        self.crawl_stats["changed"] += 1
+        return True
+
+    def _plan_crawl(
+        self,
+        links: List[StationLink],
+        incremental: bool
+    ) -> Tuple[List[StationLink], Optional[StationStateStore]]:
+        """
+        Define as estações do crawl e zera as estatísticas em `crawl_stats`.
+
+        No modo incremental, apenas as estações cujo intervalo de verificação
+        venceu entram no crawl, em ordem de prioridade, e verificações
+        pendentes de um crawl anterior não confirmado são descartadas.
+        """
+        state = StationStateStore() if incremental else None
+        if state is not None:
+            state.discard()
+        scheduled, skipped = state.schedule(links) if state else (links, 0)
+        self.crawl_stats = {
+            "mode": "incremental" if incremental else "full",
+            "listed": len(links),
+            "scheduled": len(scheduled),
+            "skipped": skipped,
+            "unchanged": 0,
+            "changed": 0
         }
-    
-    async def scrape_all_stations(self) -> List[Dict[str, Any]]:
+        return scheduled, state
+
+    async def _scrape_station(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        limiter: _HostRateLimiter,
+        station_name: str,
+        station_url: str,
+        on_station: Optional[Callable[[str, Optional[str]], None]] = None,
+        state: Optional[StationStateStore] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Baixa e processa uma estação, retornando None em caso de erro ou leitura inalterada."""
+        content = await self._fetch_station(client, semaphore, limiter, station_name, station_url, on_station, state)
+        if content is None:
+            return None
+
+        started = time.perf_counter()
+        try:
+            # Sem pool de processos, o parse roda em uma thread para não
+            # travar os outros downloads nem as requisições da API
+            data = await asyncio.to_thread(self._parse_station_data, station_name, station_url, content)
+        except Exception as e:
+            self._station_failed(station_name, e, on_station, stage="parse")
+            if state is not None:
+                state.discard(station_url)
+            return None
+        finally:
+            SCRAPER_PARSE_SECONDS.observe(time.perf_counter() - started, "thread")
+
+        if not self._accept_record(station_name, station_url, data, on_station, state):
+            return None
+        return data
+
+    def _create_parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Cria o pool de processos de parse do crawl (None se o modo pipeline estiver desligado)."""
+        if self.parse_workers <= 0:
+            return None
+
+        # fork em um processo com threads (thread pool, uvicorn) pode herdar locks
+        # travados; forkserver/spawn iniciam os workers a partir de um processo limpo
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context(method))
+
+    async def _get_station_links(
+        self,
+        client: httpx.AsyncClient,
+        limiter: _HostRateLimiter
+    ) -> List[StationLink]:
+        """
+        Retorna o índice de estações, baixando o mapa mundial apenas se o cache venceu.
+
+        Com o índice vencido, o mapa é pedido com If-None-Match/If-Modified-Since;
+        um 304 renova o cache sem novo parse. O parse roda fora do event loop.
+        """
+        index = StationIndex()
+        links = index.get(self.BASE_URL)
+        if links is not None:
+            return links
+
+        async with index.get_lock():
+            # Outra coleta pode ter atualizado o índice enquanto esperávamos
+            links = index.get(self.BASE_URL)
+            if links is not None:
+                return links
+
+            response = await self._fetch(
+                client, self.BASE_URL, limiter, timeout=15, headers=index.validators(self.BASE_URL)
+            )
+            if response.status_code == 304:
+                return await asyncio.to_thread(index.mark_not_modified)
+
+            links = await asyncio.to_thread(self._extract_station_links, response.content)
+            return await asyncio.to_thread(
+                index.update,
+                self.BASE_URL,
+                links,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified")
+            )
+
+    async def scrape_all_stations(
+        self,
+        on_links: Optional[Callable[[int], None]] = None,
+        on_station: Optional[Callable[[str, Optional[str]], None]] = None,
+        incremental: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Realiza scraping de todas as estações disponíveis.
-        
+
+        As estações são baixadas de forma concorrente com um cliente HTTP
+        assíncrono compartilhado, sem bloquear o event loop.
+
+        Args:
+            on_links: Callback chamado com o total de estações encontradas
+            on_station: Callback chamado a cada estação processada (nome, erro ou None)
+            incremental: Verifica apenas estações vencidas e retorna só leituras
+                alteradas; as verificações ficam pendentes até o chamador gravar
+                os registros e chamar `StationStateStore().commit()`
+
         Returns:
-            Lista com dados de todas as estações
-        """
-        response = requests.get(self.BASE_URL, timeout=15)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Encontrar todos os links de estações
-        stations = soup.find_all('a')
-        results = []
-        
-        for station in stations:
-            station_name = station.text.strip()
-            station_url = station.get('href')
-            
-            # Filtrar apenas URLs válidas de estações
-            if station_url and 'city' in station_url and 'aqicn' in station_url:
-                try:
-                    data = self._parse_station_data(station_name, station_url)
-                    results.append(data)
-                except Exception as e:
-                    print(f"⚠️ Erro ao processar {station_name}: {str(e)}")
-                    continue
-        
-        return results
-    
+            Lista com dados de todas as estações (no modo pipeline, em ordem de conclusão)
+        """
+        if self.parse_workers > 0:
+            return [data async for data in self.iter_stations(on_links, on_station, incremental)]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = _HostRateLimiter(self.rate_limit)
+
+        async with self._create_client() as client:
+            links, state = self._plan_crawl(await self._get_station_links(client, limiter), incremental)
+            if on_links:
+                on_links(len(links))
+
+            results = await asyncio.gather(*(
+                self._scrape_station(client, semaphore, limiter, name, url, on_station, state)
+                for name, url, *_ in links
+            ))
+
+        return [data for data in results if data is not None]
+
+    async def iter_stations(
+        self,
+        on_links: Optional[Callable[[int], None]] = None,
+        on_station: Optional[Callable[[str, Optional[str]], None]] = None,
+        incremental: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Produz os dados das estações à medida que são coletados.
+
+        Os workers de download escrevem em uma fila limitada: se o consumidor
+        (ex.: o sink de Parquet) ficar para trás, o crawl desacelera em vez de
+        acumular resultados em memória.
+
+        Com `parse_workers` > 0 (modo pipeline), os downloads só enfileiram o
+        HTML bruto em uma segunda fila limitada, e um pool de processos faz o
+        parse em paralelo, liberando o event loop e usando vários núcleos.
+
+        No modo incremental, só as estações com verificação vencida são
+        baixadas (com requisições condicionais) e apenas as leituras que
+        mudaram desde a última coleta são produzidas; o resumo fica em
+        `crawl_stats`. As verificações ficam pendentes no StationStateStore
+        até o consumidor gravar os registros e chamar `commit()`; as de
+        estações interrompidas antes de a leitura ser produzida são descartadas.
+
+        Args:
+            on_links: Callback chamado com o total de estações encontradas
+            on_station: Callback chamado a cada estação processada (nome, erro ou None)
+            incremental: Verifica apenas estações vencidas e produz só leituras alteradas
+
+        Yields:
+            Dados de cada estação coletada com sucesso (em ordem de conclusão)
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = _HostRateLimiter(self.rate_limit)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        done = object()
+        # Estações verificadas cuja leitura ainda não chegou ao consumidor
+        unfinished = set()
+
+        async with self._create_client() as client:
+            links, state = self._plan_crawl(await self._get_station_links(client, limiter), incremental)
+            if on_links:
+                on_links(len(links))
+
+            pending: asyncio.Queue = asyncio.Queue()
+            for link in links:
+                pending.put_nowait(link)
+
+            pool = self._create_parse_pool()
+            # Mantém cada processo com uma página em parse e outra na fila
+            parsers_count = self.parse_workers * 2 if pool else 0
+            raw: asyncio.Queue = asyncio.Queue(maxsize=self.parse_workers * 4 if pool else 1)
+
+            async def fetcher():
+                while True:
+                    try:
+                        name, url, *_ = pending.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    unfinished.add(url)
+                    if pool is None:
+                        data = await self._scrape_station(client, semaphore, limiter, name, url, on_station, state)
+                        if data is None:
+                            unfinished.discard(url)
+                        else:
+                            await results.put((url, data))
+                    else:
+                        content = await self._fetch_station(client, semaphore, limiter, name, url, on_station, state)
+                        if content is None:
+                            unfinished.discard(url)
+                        else:
+                            await raw.put((name, url, content))
+                if pool is None:
+                    await results.put(done)
+
+            async def fetch_all():
+                await asyncio.gather(*(fetcher() for _ in range(self.concurrency)))
+                for _ in range(parsers_count):
+                    await raw.put(done)
+
+            async def parser():
+                loop = asyncio.get_running_loop()
+                while True:
+                    item = await raw.get()
+                    if item is done:
+                        break
+                    name, url, content = item
+                    started = time.perf_counter()
+                    try:
+                        data = await loop.run_in_executor(pool, parse_station_page, name, url, content, None, self.parser)
+                    except Exception as e:
+                        self._station_failed(name, e, on_station, stage="parse")
+                        if state is not None:
+                            state.discard(url)
+                        unfinished.discard(url)
+                        continue
+                    finally:
+                        # Inclui o envio ao processo de parse e o retorno do resultado
+                        SCRAPER_PARSE_SECONDS.observe(time.perf_counter() - started, "process")
+                    if self._accept_record(name, url, data, on_station, state):
+                        await results.put((url, data))
+                    else:
+                        unfinished.discard(url)
+                await results.put(done)
+
+            tasks = [asyncio.create_task(fetch_all())]
+            tasks += [asyncio.create_task(parser()) for _ in range(parsers_count)]
+            try:
+                remaining = parsers_count or self.concurrency
+                while remaining:
+                    item = await results.get()
+                    if item is done:
+                        remaining -= 1
+                    else:
+                        url, data = item
+                        unfinished.discard(url)
+                        yield data
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                if state is not None:
+                    for url in unfinished:
+                        state.discard(url)
+
     async def count_stations(self) -> int:
         """
         Conta o número de estações disponíveis.
-        
+
+        Com o índice em cache dentro do TTL, não acessa a rede.
+
         Returns:
             Número de estações encontradas
         """
-        response = requests.get(self.BASE_URL, timeout=15)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        stations = soup.find_all('a')
-        count = sum(
-            1 for station in stations
-            if station.get('href') and 'city' in station.get('href', '') and 'aqicn' in station.get('href', '')
-        )
-        
-        return count
\ No newline at end of file
+        links = StationIndex().get(self.BASE_URL)
+        if links is not None:
+            return len(links)
+
+        limiter = _HostRateLimiter(self.rate_limit)
+
+        async with self._create_client() as client:
+            links = await self._get_station_links(client, limiter)
+
+        return len(links)
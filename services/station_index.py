@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+from services.station_parser import parse_station_location
+
+
+class StationLink(NamedTuple):
+    """Estação listada no mapa mundial"""
+    name: str
+    url: str
+    country: str
+    state: str
+    city: str
+
+
+class StationIndex:
+    """
+    Cache do índice de estações (lista extraída do mapa mundial).
+
+    O índice fica em memória e em disco (STATION_INDEX_PATH) e é considerado
+    fresco por STATION_INDEX_TTL segundos. Depois disso, o mapa é revalidado
+    com uma requisição condicional (ETag / Last-Modified): se o site responder
+    304, o índice atual é mantido sem novo download nem parse.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StationIndex, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.path = Path(os.getenv("STATION_INDEX_PATH", ".cache/station_index.json"))
+            self.ttl = float(os.getenv("STATION_INDEX_TTL", "3600"))
+            self.source_url: Optional[str] = None
+            self.links: List[StationLink] = []
+            self.etag: Optional[str] = None
+            self.last_modified: Optional[str] = None
+            self.fetched_at = 0.0
+            self.hits = 0
+            self.refreshes = 0
+            self.revalidations = 0
+            self._lock: Optional[asyncio.Lock] = None
+            self._lock_loop = None
+            self._load_from_disk()
+            self.initialized = True
+
+    def _load_from_disk(self):
+        """Carrega o índice persistido, ignorando arquivos ausentes ou corrompidos."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.links = [StationLink(*station) for station in data["stations"]]
+            self.source_url = data["source_url"]
+            self.etag = data.get("etag")
+            self.last_modified = data.get("last_modified")
+            self.fetched_at = float(data["fetched_at"])
+            print(f"✅ Índice de estações carregado do disco ({len(self.links)} estações)")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Índice de estações em disco ignorado: {str(e)}")
+
+    def _save_to_disk(self):
+        """Grava o índice de forma atômica (arquivo temporário + rename)."""
+        data = {
+            "source_url": self.source_url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "stations": [list(link) for link in self.links]
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Erro ao salvar índice de estações: {str(e)}")
+
+    def get_lock(self) -> asyncio.Lock:
+        """Lock que garante uma única revalidação do índice por vez (por event loop)."""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def is_fresh(self, source_url: str) -> bool:
+        """Indica se o índice de `source_url` ainda está dentro do TTL."""
+        return (
+            self.source_url == source_url
+            and bool(self.links)
+            and time.time() - self.fetched_at < self.ttl
+        )
+
+    def get(self, source_url: str) -> Optional[List[StationLink]]:
+        """
+        Retorna o índice se estiver fresco (sem acesso à rede).
+
+        Args:
+            source_url: URL do mapa mundial
+
+        Returns:
+            Lista de estações ou None se o índice estiver vencido/ausente
+        """
+        if not self.is_fresh(source_url):
+            return None
+        self.hits += 1
+        return self.links
+
+    def validators(self, source_url: str) -> Dict[str, str]:
+        """Cabeçalhos da requisição condicional para revalidar o índice."""
+        if self.source_url != source_url or not self.links:
+            return {}
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def mark_not_modified(self) -> List[StationLink]:
+        """Registra uma revalidação 304: renova o TTL mantendo o índice atual."""
+        self.fetched_at = time.time()
+        self.revalidations += 1
+        self._save_to_disk()
+        return self.links
+
+    def update(
+        self,
+        source_url: str,
+        links: List[Tuple[str, str]],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> List[StationLink]:
+        """
+        Substitui o índice após um download completo do mapa (bloqueante: grava em disco).
+
+        Args:
+            source_url: URL do mapa mundial
+            links: Tuplas (nome, url) extraídas do mapa
+            etag: ETag da resposta
+            last_modified: Last-Modified da resposta
+
+        Returns:
+            Novo índice de estações
+        """
+        self.links = [StationLink(name, url, *parse_station_location(url)) for name, url in links]
+        self.source_url = source_url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+        self.refreshes += 1
+        self._save_to_disk()
+        return self.links
+
+    def invalidate(self):
+        """Força a revalidação na próxima consulta."""
+        self.fetched_at = 0.0
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado do cache do índice de estações."""
+        age = time.time() - self.fetched_at if self.fetched_at else None
+        return {
+            "stations": len(self.links),
+            "source_url": self.source_url,
+            "fetched_at": datetime.fromtimestamp(self.fetched_at).isoformat() if self.fetched_at else None,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "ttl_seconds": self.ttl,
+            "fresh": self.is_fresh(self.source_url) if self.source_url else False,
+            "etag": self.etag,
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "revalidations": self.revalidations
+        }
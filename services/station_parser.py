@@ -0,0 +1,241 @@
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from bs4 import BeautifulSoup, SoupStrainer
+from services.schema import parse_measurement
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:  # lxml é opcional
+    LXML_AVAILABLE = False
+
+
+# Campo do registro -> id do <td> com o valor atual na página da estação
+FIELD_IDS = {
+    "pm25": "cur_pm25",
+    "pm10": "cur_pm10",
+    "no2": "cur_no2",
+    "so2": "cur_so2",
+    "co": "cur_co",
+    "temperature": "cur_t",
+    "pressure": "cur_p",
+    "humidity": "cur_h",
+    "wind": "cur_w"
+}
+
+ENGINES = ("auto", "lxml", "strainer", "bs4")
+
+_LXML_XPATH = (
+    "//td[starts-with(@id, 'cur_')]"
+    " | //div[contains(concat(' ', normalize-space(@class), ' '), ' aqivalue ')]"
+)
+
+# Restringe o parse do BeautifulSoup às únicas tags que interessam
+_STRAINER = SoupStrainer(["td", "div"])
+
+# Links de estação no mapa mundial (mesmo filtro do scraper original)
+_LINKS_XPATH = "//a[contains(@href, 'city') and contains(@href, 'aqicn')]"
+_LINKS_STRAINER = SoupStrainer("a", href=True)
+
+
+def _get_value(soup: BeautifulSoup, element_id: str) -> Optional[str]:
+    """
+    Extrai valor de um elemento <td> pelo ID.
+
+    Args:
+        soup: Objeto BeautifulSoup
+        element_id: ID do elemento
+
+    Returns:
+        Valor textual ou None
+    """
+    td = soup.find('td', {"id": element_id})
+    if td:
+        return td.text.strip()
+    return None
+
+
+def _extract_bs4(content: bytes) -> Tuple[Dict[str, Optional[str]], str]:
+    """Parser original: árvore completa e uma busca por campo."""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    aqivalue = soup.find('div', class_='aqivalue')
+    aqi = aqivalue.attrs.get('title', "N/A") if aqivalue else "N/A"
+
+    return {element_id: _get_value(soup, element_id) for element_id in FIELD_IDS.values()}, aqi
+
+
+def _extract_strainer(content: bytes) -> Tuple[Dict[str, Optional[str]], str]:
+    """Parse limitado a <td>/<div> com SoupStrainer e uma única varredura."""
+    soup = BeautifulSoup(content, 'html.parser', parse_only=_STRAINER)
+
+    values: Dict[str, Optional[str]] = {}
+    aqi = None
+    for element in soup.find_all(["td", "div"]):
+        if element.name == "td":
+            element_id = element.get("id")
+            if element_id and element_id.startswith("cur_") and element_id not in values:
+                values[element_id] = element.text.strip()
+        elif aqi is None and "aqivalue" in element.get("class", ()):
+            aqi = element.attrs.get('title', "N/A")
+
+    return values, aqi or "N/A"
+
+
+def _lxml_root(content: bytes):
+    """Árvore lxml do HTML; sem charset declarado o lxml assume latin-1, então tenta UTF-8 antes (como o bs4)."""
+    try:
+        return lxml.html.fromstring(content.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        # ValueError: string com declaração de encoding XML
+        return lxml.html.fromstring(content)
+
+
+def _extract_lxml(content: bytes) -> Tuple[Dict[str, Optional[str]], str]:
+    """Parse em C com lxml e um único XPath para todos os campos."""
+    root = _lxml_root(content)
+
+    values: Dict[str, Optional[str]] = {}
+    aqi = None
+    for element in root.xpath(_LXML_XPATH):
+        if element.tag == "td":
+            element_id = element.get("id")
+            if element_id not in values:
+                values[element_id] = element.text_content().strip()
+        elif aqi is None:
+            aqi = element.get("title", "N/A")
+
+    return values, aqi or "N/A"
+
+
+_EXTRACTORS = {
+    "bs4": _extract_bs4,
+    "strainer": _extract_strainer,
+    "lxml": _extract_lxml
+}
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """
+    Resolve o motor de extração (SCRAPER_PARSER: auto, lxml, strainer ou bs4).
+
+    `auto` usa lxml quando instalado e, caso contrário, o BeautifulSoup
+    limitado por SoupStrainer.
+    """
+    engine = (engine or os.getenv("SCRAPER_PARSER", "auto")).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Parser desconhecido: {engine}. Opções: {', '.join(ENGINES)}")
+    if engine == "auto" or (engine == "lxml" and not LXML_AVAILABLE):
+        return "lxml" if LXML_AVAILABLE else "strainer"
+    return engine
+
+
+def extract_station_fields(content: bytes, engine: Optional[str] = None) -> Tuple[Dict[str, Optional[str]], str]:
+    """
+    Extrai os valores `cur_*` e o AQI de uma página de estação.
+
+    Se o motor rápido falhar ou não encontrar nenhum campo, o parser
+    original (BeautifulSoup completo) é usado como fallback.
+
+    Args:
+        content: HTML da página da estação
+        engine: Motor de extração (padrão: SCRAPER_PARSER)
+
+    Returns:
+        Tupla (valores por id do <td>, AQI)
+    """
+    engine = resolve_engine(engine)
+
+    if engine != "bs4":
+        try:
+            values, aqi = _EXTRACTORS[engine](content)
+            if values or aqi != "N/A":
+                return values, aqi
+        except Exception:
+            pass
+
+    return _extract_bs4(content)
+
+
+def extract_station_links(content: bytes, engine: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Extrai (nome, url) das estações a partir da página do mapa mundial.
+
+    Args:
+        content: HTML da página do mapa
+        engine: Motor de extração (padrão: SCRAPER_PARSER)
+
+    Returns:
+        Lista de tuplas (nome da estação, URL)
+    """
+    engine = resolve_engine(engine)
+
+    if engine == "lxml":
+        root = _lxml_root(content)
+        return [(a.text_content().strip(), a.get("href")) for a in root.xpath(_LINKS_XPATH)]
+
+    soup = BeautifulSoup(content, 'html.parser', parse_only=_LINKS_STRAINER if engine == "strainer" else None)
+    links = []
+    for station in soup.find_all('a'):
+        station_url = station.get('href')
+
+        # Filtrar apenas URLs válidas de estações
+        if station_url and 'city' in station_url and 'aqicn' in station_url:
+            links.append((station.text.strip(), station_url))
+
+    return links
+
+
+def parse_station_location(station_url: str) -> Tuple[str, str, str]:
+    """
+    Extrai (país, estado, cidade) da URL de uma estação (/city/<país>/<estado>/<cidade>).
+
+    Args:
+        station_url: URL da página da estação
+
+    Returns:
+        Tupla (país, estado, cidade), com "N/A" nas partes ausentes
+    """
+    parts = station_url.split('/city/')[-1].split('/')
+    country = parts[0] if len(parts) > 0 else "N/A"
+    state = parts[1] if len(parts) > 1 else "N/A"
+    city = parts[2] if len(parts) > 2 else "N/A"
+    return country, state, city
+
+
+def parse_station_page(
+    station_name: str,
+    station_url: str,
+    content: bytes,
+    date: Optional[datetime] = None,
+    engine: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Monta o registro de uma estação a partir do HTML da sua página.
+
+    Args:
+        station_name: Nome da estação
+        station_url: URL da página da estação
+        content: HTML da página da estação
+        date: Data da coleta (padrão: agora)
+        engine: Motor de extração (padrão: SCRAPER_PARSER)
+
+    Returns:
+        Dados formatados da estação
+    """
+    values, aqi = extract_station_fields(content, engine)
+
+    # Extrair localização da URL
+    country, state, city = parse_station_location(station_url)
+
+    # Medições já convertidas para número (schema em services/schema.py)
+    return {
+        'date': date or datetime.now(),
+        'station': station_name,
+        'country': country,
+        'state': state,
+        'city': city,
+        **{field: parse_measurement(values.get(element_id)) for field, element_id in FIELD_IDS.items()},
+        'aqi': aqi
+    }
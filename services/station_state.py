@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from services.station_index import StationLink
+
+
+class StationStateStore:
+    """
+    Impressões digitais por estação para a coleta incremental.
+
+    Para cada URL de estação guarda os validadores HTTP (ETag, Last-Modified),
+    o hash do HTML e o hash da última leitura gravada, além de um intervalo
+    de verificação adaptativo: estações que mudam a cada visita passam a ser
+    verificadas com mais frequência (intervalo cai pela metade) e estações
+    paradas, com menos (intervalo cresce 50%), entre STATION_POLL_MIN e
+    STATION_POLL_MAX segundos.
+
+    As verificações de uma coleta ficam pendentes em memória: `schedule`,
+    `validators` e o estado persistido só enxergam o que foi confirmado com
+    `commit`, chamado depois que os registros chegam ao S3. Se a gravação
+    falhar, `discard` descarta as pendências e as leituras são coletadas de
+    novo na próxima execução. O estado confirmado é persistido em
+    STATION_STATE_PATH.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StationStateStore, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.path = Path(os.getenv("STATION_STATE_PATH", ".cache/station_state.json"))
+            self.min_interval = float(os.getenv("STATION_POLL_MIN", "600"))
+            self.max_interval = float(os.getenv("STATION_POLL_MAX", "21600"))
+            self._states: Dict[str, Dict[str, Any]] = {}
+            self._pending: Dict[str, Dict[str, Any]] = {}
+            self._load_from_disk()
+            self.initialized = True
+
+    def _load_from_disk(self):
+        """Carrega o estado persistido, ignorando arquivos ausentes ou corrompidos."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._states = json.load(f)["stations"]
+            print(f"✅ Estado incremental carregado do disco ({len(self._states)} estações)")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Estado incremental em disco ignorado: {str(e)}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cópia do estado para gravação fora do event loop."""
+        return {"stations": {url: dict(state) for url, state in self._states.items()}}
+
+    def save(self, snapshot: Optional[Dict[str, Any]] = None):
+        """Grava o estado de forma atômica (bloqueante)."""
+        data = snapshot or self.snapshot()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Erro ao salvar estado incremental: {str(e)}")
+
+    def schedule(self, links: List[StationLink], now: Optional[float] = None) -> Tuple[List[StationLink], int]:
+        """
+        Seleciona e ordena as estações que devem ser verificadas agora.
+
+        Estações nunca vistas vêm primeiro; as demais, das mais atrasadas
+        (em proporção ao próprio intervalo) para as menos atrasadas.
+
+        Args:
+            links: Índice de estações
+            now: Instante de referência (padrão: agora)
+
+        Returns:
+            Tupla (estações a verificar em ordem de prioridade, estações puladas)
+        """
+        now = now or time.time()
+        due = []
+        for position, link in enumerate(links):
+            state = self._states.get(link.url)
+            if state is None:
+                due.append((float("-inf"), position, link))
+                continue
+            overdue = now - (state["last_checked"] + state["interval"])
+            if overdue >= 0:
+                due.append((-overdue / max(state["interval"], 1.0), position, link))
+
+        due.sort()
+        return [link for _, _, link in due], len(links) - len(due)
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Cabeçalhos da requisição condicional para a página da estação."""
+        state = self._states.get(url)
+        headers = {}
+        if state and state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state and state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def _state(self, url: str) -> Dict[str, Any]:
+        """Cópia pendente do estado da estação, alterada durante a coleta."""
+        state = self._pending.get(url)
+        if state is None:
+            committed = self._states.get(url)
+            state = self._pending[url] = dict(committed) if committed else {
+                "etag": None,
+                "last_modified": None,
+                "body_hash": None,
+                "reading_hash": None,
+                "last_checked": 0.0,
+                "last_changed": None,
+                "interval": self.min_interval,
+                "checks": 0,
+                "changes": 0
+            }
+        return state
+
+    def commit(self) -> int:
+        """
+        Confirma as verificações pendentes (após a gravação dos registros).
+
+        Returns:
+            Número de estações atualizadas
+        """
+        pending, self._pending = self._pending, {}
+        self._states.update(pending)
+        return len(pending)
+
+    def discard(self, url: Optional[str] = None):
+        """
+        Descarta as verificações pendentes de uma estação ou de todas.
+
+        Args:
+            url: Estação cuja leitura não será gravada (padrão: todas)
+        """
+        if url is None:
+            self._pending.clear()
+        else:
+            self._pending.pop(url, None)
+
+    def _observe(self, state: Dict[str, Any], changed: bool):
+        """Registra uma verificação e ajusta o intervalo até a próxima."""
+        now = time.time()
+        state["last_checked"] = now
+        state["checks"] += 1
+        if changed:
+            state["last_changed"] = now
+            state["changes"] += 1
+            state["interval"] = max(self.min_interval, state["interval"] / 2)
+        else:
+            state["interval"] = min(self.max_interval, state["interval"] * 1.5)
+
+    def check_response(
+        self,
+        url: str,
+        status_code: int,
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> bool:
+        """
+        Avalia a resposta HTTP de uma estação.
+
+        Returns:
+            False se a página não mudou (304 ou HTML idêntico) e não precisa de
+            parse; True se ela deve ser processada
+        """
+        state = self._state(url)
+        if status_code == 304:
+            self._observe(state, changed=False)
+            return False
+
+        state["etag"] = etag
+        state["last_modified"] = last_modified
+        body_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+        if body_hash == state["body_hash"]:
+            self._observe(state, changed=False)
+            return False
+
+        state["body_hash"] = body_hash
+        return True
+
+    def check_reading(self, url: str, record: Dict[str, Any]) -> bool:
+        """
+        Compara a leitura extraída com a última gravada (ignorando a data da coleta).
+
+        Returns:
+            True se a leitura mudou e deve ser gravada
+        """
+        state = self._state(url)
+        reading = sorted((key, value) for key, value in record.items() if key != "date")
+        reading_hash = hashlib.blake2b(repr(reading).encode(), digest_size=16).hexdigest()
+
+        changed = reading_hash != state["reading_hash"]
+        state["reading_hash"] = reading_hash
+        self._observe(state, changed)
+        return changed
+
+    def get_status(self) -> Dict[str, Any]:
+        """Resumo do estado incremental."""
+        now = time.time()
+        intervals = [state["interval"] for state in self._states.values()]
+        return {
+            "stations": len(self._states),
+            "due_now": sum(1 for state in self._states.values() if state["last_checked"] + state["interval"] <= now),
+            "min_interval_seconds": self.min_interval,
+            "max_interval_seconds": self.max_interval,
+            "mean_interval_seconds": round(sum(intervals) / len(intervals), 1) if intervals else None
+        }